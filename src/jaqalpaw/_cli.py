@@ -29,6 +29,32 @@ def main(argv=sys.argv[1:]):
         action="store_true",
         help="Measure the time to generate the output waveform.",
     )
+    parser.add_argument(
+        "--stats",
+        dest="stats",
+        action="store_true",
+        help="Report the time spent in each compile phase and compile counters.",
+    )
+    parser.add_argument(
+        "--trace",
+        dest="trace",
+        default=None,
+        metavar="FILE",
+        help="Write the compile phases as Chrome trace event JSON to FILE.",
+    )
+    parser.add_argument(
+        "--memory",
+        dest="memory",
+        action="store_true",
+        help="Report the memory used by each compile phase and the size of "
+        "the compiler's data structures (slow).",
+    )
+    parser.add_argument(
+        "--lut-report",
+        dest="lut_report",
+        action="store_true",
+        help="Report the LUT usage and largest gates of each channel.",
+    )
     parser.add_argument(
         "--debug-traces",
         "-d",
@@ -57,9 +83,17 @@ def main(argv=sys.argv[1:]):
 
     try:
         start = time.time()
-        cc = CircuitCompiler(file=filename, code_literal=txt)
-        cc.compile()
-        code = b"".join(qqq for q in cc.bytecode(0xFF) for qq in q for qqq in qq)
+        cc = CircuitCompiler(
+            file=filename,
+            code_literal=txt,
+            stats=ns.stats or ns.trace is not None,
+            profile_memory=ns.memory,
+        )
+        cc.compile(pack_sequence=False)
+        if ns.suppress:
+            code = None
+        else:
+            code = b"".join(cc.iter_bytecode(0xFF))
         stop = time.time()
     except Exception as ex:
         if ns.debug:
@@ -82,4 +116,18 @@ def main(argv=sys.argv[1:]):
         sys.stderr.write(f"time: {stop-start}\n")
 
     if ns.output:
-        sys.stdout.buffer.write(code)
+        if code is None:
+            cc.write_bytecode(sys.stdout.buffer, 0xFF)
+        else:
+            sys.stdout.buffer.write(code)
+
+    if ns.stats or ns.memory:
+        sys.stderr.write(cc.stats.report() + "\n")
+
+    if ns.trace is not None:
+        cc.stats.write_trace(ns.trace)
+
+    if ns.lut_report:
+        from .compiler.lut_allocator import format_lut_report
+
+        sys.stderr.write(format_lut_report(cc.lut_report()) + "\n")
@@ -0,0 +1,114 @@
+from collections import OrderedDict
+
+from .pulse_binarization import pulse_encoder
+
+# ######################################################## #
+# ------------- Process Wide Binarization Cache ---------- #
+# ######################################################## #
+
+
+class BinarizationCache:
+    """Keeps the binarized words of pulses, keyed by (digest, bypass) where
+    digest is the content digest of the PulseData, so equal pulses share
+    their words whichever compiler (or PulseData object) they come from.
+    The total size of the cached words is kept below max_bytes by evicting
+    the least recently used entries. The lists of words are shared between
+    all the pulses that use them and must not be modified."""
+
+    def __init__(self, max_bytes=1 << 26):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __repr__(self):
+        return (
+            f"BinarizationCache(entries: {len(self.entries)}, bytes: {self.bytes}, "
+            f"hits: {self.hits}, misses: {self.misses}, evictions: {self.evictions})"
+        )
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        """Return the cached words for key, or None if they aren't cached"""
+        words = self.entries.get(key)
+        if words is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return words
+
+    def put(self, key, words):
+        """Store words under key, then evict old entries if needed"""
+        old_words = self.entries.pop(key, None)
+        if old_words is not None:
+            self.bytes -= sum(map(len, old_words))
+        self.entries[key] = words
+        self.bytes += sum(map(len, words))
+        self.evict()
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in
+        max_bytes"""
+        while self.bytes > self.max_bytes and self.entries:
+            _, words = self.entries.popitem(last=False)
+            self.bytes -= sum(map(len, words))
+            self.evictions += 1
+
+    def resize(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.evict()
+
+    def clear(self):
+        """Drop all entries, the hit, miss and eviction counts are kept"""
+        self.entries.clear()
+        self.bytes = 0
+
+    def binarize(self, pd, bypass=False):
+        """Return the words of the PulseData pd, binarizing it if needed"""
+        key = (pd.digest, bypass)
+        words = self.get(key)
+        if words is None:
+            words = pulse_encoder.encode(pd, bypass=bypass)
+            self.put(key, words)
+        return words
+
+    def binarize_many(self, pulse_data_list, bypass=False):
+        """Return the words of each PulseData in pulse_data_list. The pulses
+        that aren't cached are binarized together by the pulse encoder"""
+        keys = [(pd.digest, bypass) for pd in pulse_data_list]
+        found = dict()
+        missing = dict()
+        for key, pd in zip(keys, pulse_data_list):
+            if key in found or key in missing:
+                self.hits += 1
+                continue
+            words = self.get(key)
+            if words is None:
+                missing[key] = pd
+            else:
+                found[key] = words
+        for key, words in zip(
+            missing, pulse_encoder.encode_many(list(missing.values()), bypass=bypass)
+        ):
+            self.put(key, words)
+            found[key] = words
+        return [found[key] for key in keys]
+
+    @property
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self.entries),
+            "bytes": self.bytes,
+        }
+
+
+# Cache shared by all PulseData objects, and so by all CircuitCompilers
+binarization_cache = BinarizationCache()
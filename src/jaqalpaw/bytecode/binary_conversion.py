@@ -1,6 +1,8 @@
 from functools import reduce
 
-from .encoding_parameters import ENDIANNESS
+import numpy as np
+
+from .encoding_parameters import ENDIANNESS, MAXLEN
 from jaqalpaw.utilities.parameters import CLOCK_FREQUENCY, MAXAMP
 
 
@@ -23,6 +25,48 @@ def map_to_bytes(data, bytenum=5):
         raise
 
 
+def signed_field_array(values, bytenum=5):
+    """Convert values to an int64 array, truncating floats towards zero like
+    int(). OverflowError is raised if a value doesn't fit in a signed field of
+    bytenum bytes, as it is for map_to_bytes"""
+    values = np.asarray(values)
+    if values.dtype.kind == "f":
+        values = np.trunc(values)
+    elif values.dtype.kind not in "iu":
+        values = np.array([int(v) for v in values.ravel()]).reshape(values.shape)
+    limit = 1 << (8 * bytenum - 1)
+    out_of_range = ~((values >= -limit) & (values < limit))
+    if np.any(out_of_range):
+        raise OverflowError(
+            f"Data doesn't fit in signed {8 * bytenum} bit fields: "
+            f"{values[out_of_range].tolist()}"
+        )
+    return values.astype(np.int64)
+
+
+def pack_words(fields, metadata, bytenum=5):
+    """Pack rows of signed integer fields (shape [N, M]) and the unsigned
+    metadata of each row into a uint8[N, MAXLEN] array, with each row laid
+    out like map_to_bytes(row) followed by the metadata padding bytes"""
+    fields = signed_field_array(fields, bytenum)
+    nwords, nfields = fields.shape
+    num_padbytes = MAXLEN - nfields * bytenum
+    metadata = np.asarray(metadata, dtype=np.uint64)
+    if np.any(metadata >> np.uint64(8 * num_padbytes)):
+        raise OverflowError(f"Metadata doesn't fit in {num_padbytes} bytes")
+    words = np.empty((nwords, MAXLEN), dtype=np.uint8)
+    # The low bytes of a little endian two's complement int64 hold the field
+    field_bytes = np.ascontiguousarray(fields, dtype="<i8").view(np.uint8)
+    field_bytes = field_bytes.reshape(nwords, nfields, 8)
+    words[:, : nfields * bytenum] = field_bytes[:, :, :bytenum].reshape(
+        nwords, nfields * bytenum
+    )
+    meta_bytes = np.ascontiguousarray(metadata, dtype="<u8").view(np.uint8)
+    meta_bytes = meta_bytes.reshape(nwords, 8)
+    words[:, nfields * bytenum :] = meta_bytes[:, :num_padbytes]
+    return words
+
+
 def map_from_bytes(d, bytenum=5):
     return [
         int.from_bytes(
@@ -76,3 +120,51 @@ def convert_amp_full(ampw):
     convf = int(ampw / MAXAMP * ((1 << 16) - 1))
     fw1 = convf << 23
     return fw1
+
+
+# ######################################################## #
+# --------------- Array Parameter Conversion ------------- #
+# ######################################################## #
+
+# The array conversions give the same values as mapping the scalar conversions
+# over each element. The arithmetic is done in float64 like the scalar
+# versions, and the results are int64 unless they don't fit, in which case
+# they are Python ints in an object array.
+
+
+def exact_int_array(values):
+    """Convert an array of integral floats to int64, or to an object array
+    of Python ints if any of them don't fit in int64"""
+    if not np.all(np.abs(values) < 2.0**63):
+        return np.array([int(v) for v in values.ravel()], dtype=object).reshape(
+            values.shape
+        )
+    return values.astype(np.int64)
+
+
+def convert_freq_full_array(frqw):
+    """Array version of convert_freq_full"""
+    frqw = np.asarray(frqw, dtype=float)
+    return exact_int_array(np.rint(frqw / CLOCK_FREQUENCY * (1 << 40)))
+
+
+def convert_phase_full_array(phsw):
+    """Array version of convert_phase_full"""
+    phsw = np.asarray(phsw, dtype=float)
+    return exact_int_array(np.rint(phsw / 360.0 * (1 << 40)))
+
+
+def convert_phase_full_mod_2pi_array(phsw):
+    """Array version of convert_phase_full_mod_2pi"""
+    phsw = np.asarray(phsw, dtype=float)
+    # np.remainder takes the sign of the divisor, like Python's %
+    phsw = np.where(np.abs(phsw) >= 360.0, np.remainder(phsw, 360.0), phsw)
+    phsw = np.where(phsw >= 180, phsw - 360, np.where(phsw < -180, phsw + 360, phsw))
+    return exact_int_array(np.rint(phsw / 360.0 * (1 << 40)))
+
+
+def convert_amp_full_array(ampw):
+    """Array version of convert_amp_full"""
+    ampw = np.asarray(ampw, dtype=float)
+    # Shifting the truncated value by 23 bits is exact in float64
+    return exact_int_array(np.trunc(ampw / MAXAMP * ((1 << 16) - 1)) * (1 << 23))
@@ -1,3 +1,7 @@
+from itertools import groupby
+
+import numpy as np
+
 from jaqalpaw.utilities.exceptions import CircuitCompilerException
 from jaqalpaw.bytecode.encoding_parameters import (
     DMA_MUX_LSB,
@@ -25,6 +29,8 @@ from jaqalpaw.bytecode.encoding_parameters import (
 )
 
 from jaqalpaw.bytecode.binary_conversion import int_to_bytes, bytes_to_int
+from jaqalpaw.bytecode.word_buffer import WORD_SIZE
+from jaqalpaw.utilities.datatypes import Loop
 
 
 def address_is_invalid(addr, allowed_address_bits):
@@ -59,9 +65,8 @@ def generate_gate_addr_range_LUT(FullGateList):
     return IRGLUT, SLUT, GLUT
 
 
-def program_PLUT(lut, ch=0):
-    """Generate programming data for the PLUT"""
-    plut_PROG_list = []
+def iterate_PLUT_words(lut, ch=0):
+    """Generate programming data for the PLUT as integer words"""
     for data, addr in lut.items():
         if address_is_invalid(addr, PLUTW):
             raise CircuitCompilerException(
@@ -72,13 +77,11 @@ def program_PLUT(lut, ch=0):
         intdata |= (ch & PER_BOARD_CH_MASK) << DMA_MUX_LSB
         intdata |= PROGPLUT << PROG_MODE_LSB
         intdata |= addr << PLUT_ADDR_LSB
-        plut_PROG_list.append(int_to_bytes(intdata))
-    return plut_PROG_list
+        yield intdata
 
 
-def program_SLUT(lut, ch=0):
-    """Generate programming data for the SLUT"""
-    slut_PROG_list = []
+def iterate_SLUT_words(lut, ch=0):
+    """Generate programming data for the SLUT as integer words"""
     current_byte = 0
     byte_count = 0
     BYTELIM = SLUT_BYTECNT
@@ -92,7 +95,7 @@ def program_SLUT(lut, ch=0):
             current_byte |= (ch & PER_BOARD_CH_MASK) << DMA_MUX_LSB
             current_byte |= PROGSLUT << PROG_MODE_LSB
             current_byte |= BYTELIM << SLUT_BYTECNT_LSB
-            slut_PROG_list.append(int_to_bytes(current_byte))
+            yield current_byte
             current_byte = 0
             byte_count = 0
         current_byte <<= SLUTW + PLUTW
@@ -101,13 +104,11 @@ def program_SLUT(lut, ch=0):
     current_byte |= (ch & PER_BOARD_CH_MASK) << DMA_MUX_LSB
     current_byte |= PROGSLUT << PROG_MODE_LSB
     current_byte |= byte_count << SLUT_BYTECNT_LSB
-    slut_PROG_list.append(int_to_bytes(current_byte))
-    return slut_PROG_list
+    yield current_byte
 
 
-def program_GLUT(lut, ch=0):
-    """Generate programming data for the GLUT"""
-    glut_PROG_list = []
+def iterate_GLUT_words(lut, ch=0):
+    """Generate programming data for the GLUT as integer words"""
     current_byte = 0
     byte_count = 0
     BYTELIM = GLUT_BYTECNT
@@ -121,7 +122,7 @@ def program_GLUT(lut, ch=0):
             current_byte |= (ch & PER_BOARD_CH_MASK) << DMA_MUX_LSB
             current_byte |= PROGGLUT << PROG_MODE_LSB
             current_byte |= byte_count << GLUT_BYTECNT_LSB
-            glut_PROG_list.append(int_to_bytes(current_byte))
+            yield current_byte
             current_byte = 0
             byte_count = 0
         current_byte <<= 2 * SLUTW + GPRGW
@@ -130,11 +131,156 @@ def program_GLUT(lut, ch=0):
     current_byte |= (ch & PER_BOARD_CH_MASK) << DMA_MUX_LSB
     current_byte |= PROGGLUT << PROG_MODE_LSB
     current_byte |= byte_count << GLUT_BYTECNT_LSB
-    glut_PROG_list.append(int_to_bytes(current_byte))
-    return glut_PROG_list
+    yield current_byte
 
 
-def tag_gseq_metadata(gseq, current_byte, byte_count, ch, wait_for_ancilla):
+def packed_word_count(num_entries, entries_per_word):
+    """Number of programming words needed for a SLUT or GLUT, which always
+    emit at least one (possibly empty) word"""
+    return max(1, -(-num_entries // entries_per_word))
+
+
+def program_words(words, out=None):
+    """Return integer words as a list of 32 byte words, or append them to out
+    (a WordBuffer) and return out"""
+    if out is None:
+        return list(map(int_to_bytes, words))
+    out.extend_ints(words)
+    return out
+
+
+# Tables with fewer entries than this are packed entry by entry, which is
+# faster than setting up the array operations for a few words
+MIN_BULK_ENTRIES = 128
+
+# Number of gate ids packed at a time by the bulk gate sequence packer, which
+# bounds the memory used for expanding loops
+GSEQ_CHUNK_SIZE = 1 << 16
+
+
+def program_array(words, out=None):
+    """Return a uint8 array of words with shape (N, 32) as a list of 32 byte
+    words, or append them to out (a WordBuffer) and return out"""
+    if out is None:
+        data = words.tobytes()
+        return [data[n : n + WORD_SIZE] for n in range(0, len(data), WORD_SIZE)]
+    out.extend_array(words)
+    return out
+
+
+def pack_bit_fields(word_index, slots, values, width, nwords, nslots):
+    """Pack unsigned fields of width bits into nwords little endian 256 bit
+    words, returned as a uint8 array with shape (nwords, 32). Each word has
+    nslots fields starting from bit 0, and values[n] goes in field slots[n]
+    of word word_index[n]. Empty fields are zero"""
+    # Smallest little endian unsigned type that holds a field
+    dtype = "<u2" if width <= 16 else "<u4" if width <= 32 else "<u8"
+    fields = np.zeros((nwords, nslots), dtype=dtype)
+    fields[word_index, slots] = values
+    field_bits = np.unpackbits(
+        fields.view(np.uint8).reshape(nwords, nslots, -1), axis=2, bitorder="little"
+    )
+    bits = np.zeros((nwords, 8 * WORD_SIZE), dtype=np.uint8)
+    bits[:, : nslots * width] = field_bits[:, :, :width].reshape(nwords, nslots * width)
+    return np.packbits(bits, axis=1, bitorder="little")
+
+
+def metadata_array(metadata, index):
+    """Words holding the integer metadata[i] for each i in index, as a uint8
+    array with shape (len(index), 32)"""
+    table = np.frombuffer(b"".join(map(int_to_bytes, metadata)), dtype=np.uint8)
+    return table.reshape(len(metadata), WORD_SIZE)[index]
+
+
+def check_addresses(addrs, allowed_address_bits, lut_name):
+    invalid = np.flatnonzero(addrs & ((1 << allowed_address_bits) - 1) != addrs)
+    if len(invalid):
+        addr = int(addrs[invalid[0]])
+        raise CircuitCompilerException(
+            f"{lut_name} programming error, address {addr} ({bin(addr)}) "
+            f"exceeds maximum width of {allowed_address_bits}"
+        )
+
+
+def pack_table_words(values, width, entries_per_word, prog_mode, bytecnt_lsb, ch):
+    """Pack the entries of a SLUT or GLUT like iterate_SLUT_words and
+    iterate_GLUT_words, where each word is filled from its most significant
+    entry down, so the last entry of a word is in its lowest bits"""
+    nentries = len(values)
+    nwords = packed_word_count(nentries, entries_per_word)
+    word_index = np.arange(nentries) // entries_per_word
+    last_count = nentries - entries_per_word * (nwords - 1)
+    counts = np.full(nwords, entries_per_word)
+    counts[-1] = last_count
+    slots = counts[word_index] - 1 - np.arange(nentries) % entries_per_word
+    words = pack_bit_fields(word_index, slots, values, width, nwords, entries_per_word)
+    metadata = [
+        (ch & PER_BOARD_CH_MASK) << DMA_MUX_LSB
+        | prog_mode << PROG_MODE_LSB
+        | count << bytecnt_lsb
+        for count in (entries_per_word, last_count)
+    ]
+    words |= metadata_array(metadata, (counts == last_count).astype(int))
+    return words
+
+
+def pack_SLUT_words(addrs, data, ch=0):
+    """Pack the SLUT (MMAP) entries mapping each address in addrs to the PLUT
+    address in data into programming words, returned as a uint8 array with
+    shape (N, 32). The words are the same as those of iterate_SLUT_words"""
+    addrs = np.asarray(addrs, dtype=np.int64)
+    data = np.asarray(data, dtype=np.int64)
+    check_addresses(addrs, SLUTW, "MMAP LUT")
+    return pack_table_words(
+        (addrs << PLUTW) | data,
+        SLUTW + PLUTW,
+        SLUT_BYTECNT,
+        PROGSLUT,
+        SLUT_BYTECNT_LSB,
+        ch,
+    )
+
+
+def pack_GLUT_words(addrs, starts, stops, ch=0):
+    """Pack the GLUT entries mapping each gate address in addrs to its range
+    of SLUT addresses (starts to stops) into programming words, returned as a
+    uint8 array with shape (N, 32). The words are the same as those of
+    iterate_GLUT_words"""
+    addrs = np.asarray(addrs, dtype=np.int64)
+    check_addresses(addrs, GPRGW, "GLUT")
+    return pack_table_words(
+        (addrs << (2 * SLUTW))
+        | (np.asarray(stops, dtype=np.int64) << SLUTW)
+        | np.asarray(starts, dtype=np.int64),
+        2 * SLUTW + GPRGW,
+        GLUT_BYTECNT,
+        PROGGLUT,
+        GLUT_BYTECNT_LSB,
+        ch,
+    )
+
+
+def program_PLUT(lut, ch=0, out=None):
+    """Generate programming data for the PLUT"""
+    return program_words(iterate_PLUT_words(lut, ch), out)
+
+
+def program_SLUT(lut, ch=0, out=None):
+    """Generate programming data for the SLUT"""
+    if len(lut) < MIN_BULK_ENTRIES:
+        return program_words(iterate_SLUT_words(lut, ch), out)
+    return program_array(pack_SLUT_words(list(lut), list(lut.values()), ch), out)
+
+
+def program_GLUT(lut, ch=0, out=None):
+    """Generate programming data for the GLUT"""
+    if len(lut) < MIN_BULK_ENTRIES:
+        return program_words(iterate_GLUT_words(lut, ch), out)
+    starts, stops = zip(*lut.values())
+    return program_array(pack_GLUT_words(list(lut), starts, stops, ch), out)
+
+
+def gseq_metadata(current_byte, byte_count, ch, wait_for_ancilla):
     """Gate sequence words pack a series of gate identifiers used for lookup
     in the GLUT. Because these gate ids are small, we can fit multiple into
     a single transfer. This function sets the metadata for indicating the
@@ -145,36 +291,58 @@ def tag_gseq_metadata(gseq, current_byte, byte_count, ch, wait_for_ancilla):
         3) A gate sequence that is a continuation of the previous ancilla result
 
     """
+    current_byte |= wait_for_ancilla.value << ANCILLA_WAIT_LSB
+    current_byte |= (ch & PER_BOARD_CH_MASK) << DMA_MUX_LSB
+    current_byte |= 1 << GSEQ_ENABLE_LSB
+    current_byte |= byte_count << GSEQ_BYTECNT_LSB
+    return current_byte
+
+
+def tag_gseq_metadata(gseq, current_byte, byte_count, ch, wait_for_ancilla):
+    """Apply the gate sequence metadata with gseq_metadata and append the
+    word to gseq if it contains any gate ids"""
     if byte_count:
-        current_byte |= wait_for_ancilla.value << ANCILLA_WAIT_LSB
-        current_byte |= (ch & PER_BOARD_CH_MASK) << DMA_MUX_LSB
-        current_byte |= 1 << GSEQ_ENABLE_LSB
-        current_byte |= byte_count << GSEQ_BYTECNT_LSB
-        gseq.append(int_to_bytes(current_byte))
+        gseq.append(
+            int_to_bytes(gseq_metadata(current_byte, byte_count, ch, wait_for_ancilla))
+        )
+
+
+def iterate_gate_sequence(glist):
+    """Iterate over a gate sequence, lazily expanding any nested Loop objects
+    by replaying the body of the loop for each repetition"""
+    for g in glist:
+        if isinstance(g, Loop):
+            for _ in range(g.repeats):
+                yield from iterate_gate_sequence(g)
+        else:
+            yield g
 
 
-def gate_sequence_bytes(glist, ch=0):
-    """Generate gate sequence data that is input into the LUT module"""
-    gseq = []
+def iterate_gate_sequence_words(glist, ch=0):
+    """Lazily pack a gate sequence into gate sequence words, which are yielded
+    as integers as soon as they're filled. The gate sequence can contain Loop
+    objects, which are expanded as they're packed"""
     current_byte = 0
     byte_count = 0
     BYTELIM = GSEQ_BYTECNT
     wait_for_ancilla = GateSequenceMode.standard
-    for g in glist:
+    for g in iterate_gate_sequence(glist):
         if g & (1 << ANCILLA_COMPILER_TAG_BIT):
             if wait_for_ancilla == GateSequenceMode.standard:
-                tag_gseq_metadata(gseq, current_byte, byte_count, ch, wait_for_ancilla)
+                if byte_count:
+                    yield gseq_metadata(current_byte, byte_count, ch, wait_for_ancilla)
                 current_byte = 0
                 byte_count = 0
                 wait_for_ancilla = GateSequenceMode.start_branch
         else:
             if wait_for_ancilla != GateSequenceMode.standard:
-                tag_gseq_metadata(gseq, current_byte, byte_count, ch, wait_for_ancilla)
+                if byte_count:
+                    yield gseq_metadata(current_byte, byte_count, ch, wait_for_ancilla)
                 current_byte = 0
                 byte_count = 0
             wait_for_ancilla = GateSequenceMode.standard
         if byte_count >= BYTELIM:  # or use_previous_ancilla:
-            tag_gseq_metadata(gseq, current_byte, byte_count, ch, wait_for_ancilla)
+            yield gseq_metadata(current_byte, byte_count, ch, wait_for_ancilla)
             current_byte = 0
             byte_count = 0
             if wait_for_ancilla != GateSequenceMode.standard:
@@ -182,5 +350,255 @@ def gate_sequence_bytes(glist, ch=0):
                     wait_for_ancilla = GateSequenceMode.continue_branch
         current_byte |= (g & ((1 << GLUTW) - 1)) << (GLUTW * byte_count)
         byte_count += 1
-    tag_gseq_metadata(gseq, current_byte, byte_count, ch, wait_for_ancilla)
-    return gseq
+    if byte_count:
+        yield gseq_metadata(current_byte, byte_count, ch, wait_for_ancilla)
+
+
+def iterate_gate_sequence_bytes(glist, ch=0):
+    """Lazily generate the 32 byte gate sequence words for glist"""
+    return map(int_to_bytes, iterate_gate_sequence_words(glist, ch))
+
+
+def gate_sequence_length(glist):
+    """Number of gate ids in a gate sequence once its loops are expanded"""
+    return sum(
+        g.repeats * gate_sequence_length(g) if isinstance(g, Loop) else 1 for g in glist
+    )
+
+
+def run_word_count(length):
+    """Number of gate sequence words packed for a run of gate ids that are all
+    tagged or all untagged"""
+    return -(-length // GSEQ_BYTECNT)
+
+
+def join_gate_sequence_runs(first, second):
+    """Join the run summaries (see gate_sequence_runs) of two consecutive
+    parts of a gate sequence"""
+    if first is None:
+        return second
+    if second is None:
+        return first
+    first_run, first_words, last_run = first
+    next_run, second_words, second_last_run = second
+    if last_run[0] == next_run[0]:
+        joined = (last_run[0], last_run[1] + next_run[1])
+        if first_words is None and second_words is None:
+            return (joined, None, joined)
+        if first_words is None:
+            return (joined, second_words, second_last_run)
+        if second_words is None:
+            return (first_run, first_words, joined)
+        return (
+            first_run,
+            first_words + run_word_count(joined[1]) + second_words,
+            second_last_run,
+        )
+    # Words after the first run of first and before the last run of second
+    words = 0
+    if first_words is not None:
+        words += first_words + run_word_count(last_run[1])
+    if second_words is not None:
+        words += run_word_count(next_run[1]) + second_words
+    return (first_run, words, second_last_run)
+
+
+def gate_run_key(g):
+    """Whether a gate id has the ancilla tag, or None for a Loop"""
+    if isinstance(g, Loop):
+        return None
+    return bool(g & (1 << ANCILLA_COMPILER_TAG_BIT))
+
+
+def gate_sequence_runs(glist):
+    """Summarize the runs of tagged and untagged gate ids in a gate sequence,
+    without expanding its loops, as (first run, words, last run). Each run is
+    a (tagged, length) tuple and words is the number of words packed for the
+    runs in between, or None if the whole sequence is a single run (which is
+    then both the first and last run). An empty sequence gives None"""
+    summary = None
+    for tagged, group in groupby(glist, key=gate_run_key):
+        if tagged is None:
+            for loop in group:
+                # Repeat the loop body by joining doubled copies of it
+                body = gate_sequence_runs(loop)
+                repeats = loop.repeats
+                while repeats:
+                    if repeats & 1:
+                        summary = join_gate_sequence_runs(summary, body)
+                    body = join_gate_sequence_runs(body, body)
+                    repeats >>= 1
+        else:
+            run = (tagged, sum(1 for _ in group))
+            summary = join_gate_sequence_runs(summary, (run, None, run))
+    return summary
+
+
+def gate_sequence_word_count(glist):
+    """Number of words packed for a gate sequence, found without expanding
+    its loops"""
+    summary = gate_sequence_runs(glist)
+    if summary is None:
+        return 0
+    first_run, words, last_run = summary
+    if words is None:
+        return run_word_count(first_run[1])
+    return run_word_count(first_run[1]) + words + run_word_count(last_run[1])
+
+
+def expand_gate_sequence(glist):
+    """Gate ids of a gate sequence as an int64 array, with any nested Loop
+    objects expanded"""
+    # Scanning the types finds the loops without a Python level loop over
+    # every gate id
+    types = list(map(type, glist))
+    parts = []
+    start = 0
+    for _ in range(types.count(Loop)):
+        n = types.index(Loop, start)
+        parts.append(np.array(glist[start:n], dtype=np.int64))
+        parts.append(np.tile(expand_gate_sequence(glist[n]), glist[n].repeats))
+        start = n + 1
+    parts.append(np.array(glist[start:], dtype=np.int64))
+    return np.concatenate(parts)
+
+
+def pack_gate_sequence_words(gids, ch=0, continued=False):
+    """Pack an array of gate ids into gate sequence words, returned as a
+    uint8 array with shape (N, 32). The words, including their
+    GateSequenceMode, are the same as those of iterate_gate_sequence_words:
+    a word never mixes gate ids with and without the ancilla tag, and the
+    first word of each run of tagged ids starts a branch while the rest of
+    the run continues it. If continued is True, gids continue a run of
+    tagged ids from a previous call, so their first word doesn't start a
+    branch"""
+    gids = np.asarray(gids, dtype=np.int64)
+    ngates = len(gids)
+    if not ngates:
+        return np.zeros((0, WORD_SIZE), dtype=np.uint8)
+    tagged = (gids & (1 << ANCILLA_COMPILER_TAG_BIT)) != 0
+    run_starts = np.flatnonzero(np.concatenate(([True], tagged[1:] != tagged[:-1])))
+    run_index = np.zeros(ngates, dtype=np.int64)
+    run_index[run_starts[1:]] = 1
+    position = np.arange(ngates) - run_starts[np.cumsum(run_index)]
+    slots = position % GSEQ_BYTECNT
+    word_starts = np.flatnonzero(slots == 0)
+    word_index = np.cumsum(slots == 0) - 1
+    counts = np.diff(np.append(word_starts, ngates))
+    starts_branch = position[word_starts] == 0
+    starts_branch[0] &= not continued
+    modes = np.where(
+        tagged[word_starts],
+        np.where(
+            starts_branch,
+            GateSequenceMode.start_branch.value,
+            GateSequenceMode.continue_branch.value,
+        ),
+        GateSequenceMode.standard.value,
+    )
+    words = pack_bit_fields(
+        word_index,
+        slots,
+        gids & ((1 << GLUTW) - 1),
+        GLUTW,
+        len(word_starts),
+        GSEQ_BYTECNT,
+    )
+    kinds, index = np.unique(modes * (GSEQ_BYTECNT + 1) + counts, return_inverse=True)
+    metadata = [
+        gseq_metadata(
+            0,
+            int(kind) % (GSEQ_BYTECNT + 1),
+            ch,
+            GateSequenceMode(int(kind) // (GSEQ_BYTECNT + 1)),
+        )
+        for kind in kinds
+    ]
+    words |= metadata_array(metadata, index.ravel())
+    return words
+
+
+def iterate_gate_sequence_arrays(glist, size=GSEQ_CHUNK_SIZE):
+    """Yield the gate ids of a gate sequence as int64 arrays, in order. Loops
+    are expanded without holding more than about size of their gate ids at
+    once, so memory doesn't grow with the number of repetitions"""
+    types = list(map(type, glist))
+    start = 0
+    for _ in range(types.count(Loop)):
+        n = types.index(Loop, start)
+        if n > start:
+            yield np.array(glist[start:n], dtype=np.int64)
+        loop = glist[n]
+        length = gate_sequence_length(loop)
+        if length * loop.repeats <= size:
+            yield np.tile(expand_gate_sequence(loop), loop.repeats)
+        elif length <= size:
+            # Whole iterations of the loop body are tiled up to size ids
+            per_chunk = size // length
+            chunk = np.tile(expand_gate_sequence(loop), per_chunk)
+            full_chunks, remainder = divmod(loop.repeats, per_chunk)
+            for _ in range(full_chunks):
+                yield chunk
+            if remainder:
+                yield chunk[: remainder * length]
+        else:
+            for _ in range(loop.repeats):
+                yield from iterate_gate_sequence_arrays(loop, size)
+        start = n + 1
+    if start < len(glist):
+        yield np.array(glist[start:], dtype=np.int64)
+
+
+def iterate_gate_sequence_chunks(glist, ch=0):
+    """Pack a gate sequence into gate sequence words in bulk, GSEQ_CHUNK_SIZE
+    gate ids at a time, yielding uint8 arrays with shape (N, 32). Together
+    the arrays hold the same words as iterate_gate_sequence_words"""
+    pending = []
+    npending = 0
+    continued = False
+    for gids in iterate_gate_sequence_arrays(glist):
+        pending.append(gids)
+        npending += len(gids)
+        if npending < GSEQ_CHUNK_SIZE:
+            continue
+        gids = np.concatenate(pending)
+        # The last word might be continued by the next gate ids, so it's
+        # packed with the next chunk. It starts a whole number of words
+        # into the last run of tagged or untagged ids
+        tagged = (gids & (1 << ANCILLA_COMPILER_TAG_BIT)) != 0
+        changes = np.flatnonzero(tagged[1:] != tagged[:-1])
+        run_start = changes[-1] + 1 if len(changes) else 0
+        split = run_start + (len(gids) - 1 - run_start) // GSEQ_BYTECNT * GSEQ_BYTECNT
+        yield pack_gate_sequence_words(gids[:split], ch, continued)
+        continued = split > run_start or (run_start == 0 and continued)
+        pending = [gids[split:]]
+        npending = len(gids) - split
+    if npending:
+        yield pack_gate_sequence_words(np.concatenate(pending), ch, continued)
+
+
+def gate_sequence_bytes(glist, ch=0, out=None):
+    """Generate gate sequence data that is input into the LUT module. The gate
+    sequence can contain Loop objects, which are expanded as they're packed.
+    Long sequences are packed in bulk, a chunk at a time"""
+    if gate_sequence_length(glist) < MIN_BULK_ENTRIES:
+        return program_words(iterate_gate_sequence_words(glist, ch), out)
+    if out is None:
+        words = []
+        for chunk in iterate_gate_sequence_chunks(glist, ch):
+            words.extend(program_array(chunk))
+        return words
+    for chunk in iterate_gate_sequence_chunks(glist, ch):
+        program_array(chunk, out)
+    return out
+
+
+def iterate_gate_sequence_word_lists(glist, ch=0):
+    """Lazily generate the 32 byte gate sequence words for glist, yielding
+    them in lists. Long sequences are packed in bulk a chunk at a time, so
+    each list holds the words of at most GSEQ_CHUNK_SIZE gate ids"""
+    if gate_sequence_length(glist) < MIN_BULK_ENTRIES:
+        yield program_words(iterate_gate_sequence_words(glist, ch))
+        return
+    for chunk in iterate_gate_sequence_chunks(glist, ch):
+        yield program_array(chunk)
@@ -7,6 +7,11 @@ from .binary_conversion import (
     convert_to_bytes,
     map_to_bytes,
     convert_phase_full_mod_2pi,
+    convert_freq_full_array,
+    convert_amp_full_array,
+    convert_phase_full_array,
+    convert_phase_full_mod_2pi_array,
+    pack_words,
 )
 from .encoding_parameters import (
     MAXLEN,
@@ -31,18 +36,24 @@ from .encoding_parameters import (
 
 from jaqalpaw.utilities.helper_functions import delist
 from jaqalpaw.utilities.datatypes import Discrete, Mixed
+from jaqalpaw.utilities.instrumentation import event_counters
 
 from itertools import zip_longest
+from math import log2
+from operator import attrgetter
 
+from .spline_engine import fit_natural_spline, is_unit_spaced
 from .spline_mapping import cs_mapper_int, cs_mapper_int_auto_shift
 
 # ######################################################## #
 # ------------------ PulseData Encoding ------------------ #
 # ######################################################## #
 
+# Number of metadata bytes after the five 40 bit fields of a word
+NUM_PADBYTES = MAXLEN - 5 * 5
 
-def apply_metadata(
-    bytelist,
+
+def metadata_bits(
     modtype=0,
     bypass=False,
     waittrig=False,
@@ -58,10 +69,10 @@ def apply_metadata(
     inv_frame0_mask=0,
     inv_frame1_mask=0,
     ind=0,
+    num_padbytes=NUM_PADBYTES,
 ):
-    """Apply all metadata bits based on input flags, for splines, certain metadata bits are applied only
-    with the first pulse such as waittrig, and rst_frame_mask"""
-    num_padbytes = MAXLEN - len(bytelist)
+    """Return the metadata bits that fill the num_padbytes bytes at the end of
+    a word as an integer. See apply_metadata"""
     metadata = shift_len << (num_padbytes * 8 - 8)
     if bypass:
         metadata |= 7 << (num_padbytes * 8 - 11)
@@ -97,12 +108,106 @@ def apply_metadata(
         else:  # normal parameters
             sync = 1 << SYNC_FLAG_LSB_LOC if (sync_mask & tone_mask) else 0
         metadata |= waitbit | sync | clr_frame | apply_at_eof
-    modbyte = int(np.log2(modtype)) << (num_padbytes * 8 - 3)
+    modbyte = int(log2(modtype)) << (num_padbytes * 8 - 3)
     metadata |= modbyte
+    return metadata
+
+
+def apply_metadata(
+    bytelist,
+    modtype=0,
+    bypass=False,
+    waittrig=False,
+    shift_len=0,
+    sync_mask=0,
+    enable_mask=0,
+    fb_enable_mask=0,
+    channel=0,
+    apply_at_end_mask=0,
+    rst_frame_mask=0,
+    fwd_frame0_mask=0,
+    fwd_frame1_mask=0,
+    inv_frame0_mask=0,
+    inv_frame1_mask=0,
+    ind=0,
+):
+    """Apply all metadata bits based on input flags, for splines, certain metadata bits are applied only
+    with the first pulse such as waittrig, and rst_frame_mask"""
+    num_padbytes = MAXLEN - len(bytelist)
+    metadata = metadata_bits(
+        modtype=modtype,
+        bypass=bypass,
+        waittrig=waittrig,
+        shift_len=shift_len,
+        sync_mask=sync_mask,
+        enable_mask=enable_mask,
+        fb_enable_mask=fb_enable_mask,
+        channel=channel,
+        apply_at_end_mask=apply_at_end_mask,
+        rst_frame_mask=rst_frame_mask,
+        fwd_frame0_mask=fwd_frame0_mask,
+        fwd_frame1_mask=fwd_frame1_mask,
+        inv_frame0_mask=inv_frame0_mask,
+        inv_frame1_mask=inv_frame1_mask,
+        ind=ind,
+        num_padbytes=num_padbytes,
+    )
     padbytes = convert_to_bytes(metadata, bytenum=num_padbytes, signed=False)
     return bytelist + padbytes
 
 
+# Parameters with fewer segments than this are packed word by word, which is
+# faster than setting up the array operations for a handful of words
+MIN_PACKED_SEGMENTS = 8
+
+
+def pack_segments(fields, shift_len=0, header=None, **kwargs):
+    """Pack the five 40 bit fields of every segment of a parameter with their
+    metadata and return the (concatenated bytes, list of words) form returned
+    by generate_bytes. Only the first segment gets the metadata bits that
+    apply at the start of a pulse, and shift_len can be given for each
+    segment. The fields are given as an [N, 5] array, which is packed into a
+    uint8[N, 32] array by pack_words, or as a list of rows if there are fewer
+    than MIN_PACKED_SEGMENTS segments. The metadata of the first and the
+    following segments can be given as a header, (first_metadata, metadata)
+    as precomputed by a PulseEncoder, otherwise it is computed from kwargs"""
+    nwords = len(fields)
+    if header is None:
+        first_metadata = metadata_bits(ind=0, **kwargs)
+        metadata = metadata_bits(ind=1, **kwargs)
+    else:
+        first_metadata, metadata = header
+    if not isinstance(shift_len, list):
+        shift_len = [shift_len] * nwords
+    shift_lsb = NUM_PADBYTES * 8 - 8
+    if nwords < MIN_PACKED_SEGMENTS:
+        final_data = [
+            map_to_bytes([int(v) for v in row])
+            + convert_to_bytes(
+                (first_metadata if n == 0 else metadata) | (shift << shift_lsb),
+                bytenum=NUM_PADBYTES,
+                signed=False,
+            )
+            for n, (row, shift) in enumerate(zip(fields, shift_len))
+        ]
+        return b"".join(final_data), final_data
+    metadata = np.full(nwords, metadata, dtype=np.uint64)
+    metadata[0] = first_metadata
+    metadata |= np.asarray(shift_len, dtype=np.uint64) << np.uint64(shift_lsb)
+    final_bytes = pack_words(fields, metadata).tobytes()
+    final_data = [
+        final_bytes[n : n + MAXLEN] for n in range(0, len(final_bytes), MAXLEN)
+    ]
+    return final_bytes, final_data
+
+
+def segment_waits(wait, nwords):
+    """Duration of each segment, given a single duration or a list"""
+    if isinstance(wait, list):
+        return wait[:nwords]
+    return [wait] * nwords
+
+
 def generate_bytes(
     coeffs,
     xdata,
@@ -121,43 +226,43 @@ def generate_bytes(
     fwd_frame1_mask=0,
     inv_frame0_mask=0,
     inv_frame1_mask=0,
+    header=None,
 ):
     """Generate binary data for contiguous, spline pulses. Used when pulse()
-    is called and a parameter is specified by a typle"""
-    final_data = []
-    final_bytes = b""
-    for n, x in enumerate(xdata):
-        if modtype & (FRMROT0 | FRMROT1) and n != 0:
-            v0 = 0
-        else:
-            v0 = int(coeffs[3, n])
-        v1 = int(coeffs[2, n])
-        v2 = int(coeffs[1, n])
-        v3 = int(coeffs[0, n])
-        v4 = int(wait) if not isinstance(wait, list) else int(wait[n])
-        shift_bits = shift_len if not isinstance(shift_len, list) else shift_len[n]
-        bytelist = map_to_bytes([v0, v1, v2, v3, v4])
-        fullbytes = apply_metadata(
-            bytelist,
-            modtype=modtype,
-            bypass=bypass,
-            waittrig=waittrig,
-            shift_len=shift_bits,
-            sync_mask=sync_mask,
-            enable_mask=enable_mask,
-            fb_enable_mask=fb_enable_mask,
-            channel=channel,
-            apply_at_end_mask=apply_at_end_mask,
-            rst_frame_mask=rst_frame_mask,
-            fwd_frame0_mask=fwd_frame0_mask,
-            fwd_frame1_mask=fwd_frame1_mask,
-            inv_frame0_mask=inv_frame0_mask,
-            inv_frame1_mask=inv_frame1_mask,
-            ind=n,
-        )
-        final_bytes = final_bytes + fullbytes
-        final_data.append(fullbytes)
-    return final_bytes, final_data
+    is called and a parameter is specified by a typle. All segments are
+    packed at once with pack_segments"""
+    nwords = len(xdata)
+    waits = segment_waits(wait, nwords)
+    # Coefficient rows are in reverse order of the fields
+    if nwords < MIN_PACKED_SEGMENTS:
+        fields = coeffs[3::-1, :nwords].T.tolist()
+        for row, w in zip(fields, waits):
+            row.append(w)
+    else:
+        fields = np.column_stack((coeffs[3::-1, :nwords].T, waits))
+    if modtype & (FRMROT0 | FRMROT1):
+        for row in fields[1:]:
+            row[0] = 0
+    if isinstance(shift_len, list):
+        shift_len = shift_len[:nwords]
+    return pack_segments(
+        fields,
+        shift_len=shift_len,
+        modtype=modtype,
+        bypass=bypass,
+        waittrig=waittrig,
+        sync_mask=sync_mask,
+        enable_mask=enable_mask,
+        fb_enable_mask=fb_enable_mask,
+        channel=channel,
+        apply_at_end_mask=apply_at_end_mask,
+        rst_frame_mask=rst_frame_mask,
+        fwd_frame0_mask=fwd_frame0_mask,
+        fwd_frame1_mask=fwd_frame1_mask,
+        inv_frame0_mask=inv_frame0_mask,
+        inv_frame1_mask=inv_frame1_mask,
+        header=header,
+    )
 
 
 def generate_pulse_bytes(
@@ -177,38 +282,36 @@ def generate_pulse_bytes(
     fwd_frame1_mask=0,
     inv_frame0_mask=0,
     inv_frame1_mask=0,
+    header=None,
 ):
     """Generate binary data for contiguous, discrete pulses. Used when pulse()
-    is called and a parameter is specified by a list"""
-    final_data = []
-    final_bytes = b""
-    for n, x in enumerate(xdata):
-        v0 = int(coeffs[n])
-        v1 = 0
-        v2 = 0
-        v3 = 0
-        v4 = int(wait) if not isinstance(wait, list) else int(wait[n])
-        bytelist = map_to_bytes([v0, v1, v2, v3, v4])
-        fullbytes = apply_metadata(
-            bytelist,
-            modtype=modtype,
-            bypass=bypass,
-            waittrig=waittrig,
-            sync_mask=sync_mask,
-            enable_mask=enable_mask,
-            fb_enable_mask=fb_enable_mask,
-            channel=channel,
-            apply_at_end_mask=apply_at_end_mask,
-            rst_frame_mask=rst_frame_mask,
-            fwd_frame0_mask=fwd_frame0_mask,
-            fwd_frame1_mask=fwd_frame1_mask,
-            inv_frame0_mask=inv_frame0_mask,
-            inv_frame1_mask=inv_frame1_mask,
-            ind=n,
-        )
-        final_bytes = final_bytes + fullbytes
-        final_data.append(fullbytes)
-    return final_bytes, final_data
+    is called and a parameter is specified by a list. All segments are packed
+    at once with pack_segments"""
+    nwords = len(xdata)
+    waits = segment_waits(wait, nwords)
+    if nwords < MIN_PACKED_SEGMENTS:
+        fields = [[v0, 0, 0, 0, w] for v0, w in zip(coeffs[:nwords], waits)]
+    else:
+        fields = np.zeros((nwords, 5))
+        fields[:, 0] = coeffs[:nwords]
+        fields[:, 4] = waits
+    return pack_segments(
+        fields,
+        modtype=modtype,
+        bypass=bypass,
+        waittrig=waittrig,
+        sync_mask=sync_mask,
+        enable_mask=enable_mask,
+        fb_enable_mask=fb_enable_mask,
+        channel=channel,
+        apply_at_end_mask=apply_at_end_mask,
+        rst_frame_mask=rst_frame_mask,
+        fwd_frame0_mask=fwd_frame0_mask,
+        fwd_frame1_mask=fwd_frame1_mask,
+        inv_frame0_mask=inv_frame0_mask,
+        inv_frame1_mask=inv_frame1_mask,
+        header=header,
+    )
 
 
 def generate_spline_bytes(
@@ -230,6 +333,7 @@ def generate_spline_bytes(
     fwd_frame1_mask=0,
     inv_frame0_mask=0,
     inv_frame1_mask=0,
+    header=None,
 ):
     """Generates spline coefficients, remaps them for a pdq spline and gets the corresponding byte data."""
     if pulse_mode:
@@ -250,23 +354,28 @@ def generate_spline_bytes(
             inv_frame0_mask=inv_frame0_mask,
             inv_frame1_mask=inv_frame1_mask,
             channel=channel,
+            header=header,
         )
     else:
-        cs = CubicSpline(
-            xs, ys, bc_type=((2, 0.0), (2, 0.0))
-        )  # set for a natural spline
+        event_counters["spline_fits"] += 1
+        if is_unit_spaced(xs):
+            spline_coeffs = fit_natural_spline(ys)
+        else:
+            spline_coeffs = CubicSpline(
+                xs, ys, bc_type=((2, 0.0), (2, 0.0))
+            ).c  # set for a natural spline
         if modtype in (PHSMOD0, PHSMOD1, FRMROT0, FRMROT1):
             apply_phase_mask = True
         else:
             apply_phase_mask = False
         if shift_len < 0:
             modified_coeff_table, shift_len_fin = cs_mapper_int_auto_shift(
-                cs.c, nsteps=nsteps, apply_phase_mask=apply_phase_mask
+                spline_coeffs, nsteps=nsteps, apply_phase_mask=apply_phase_mask
             )
         else:
             shift_len_fin = shift_len
             modified_coeff_table = cs_mapper_int(
-                cs.c, nsteps=nsteps, shift_len=shift_len
+                spline_coeffs, nsteps=nsteps, shift_len=shift_len
             )
         outbytes, final_byte_list = generate_bytes(
             modified_coeff_table,
@@ -286,50 +395,254 @@ def generate_spline_bytes(
             inv_frame0_mask=inv_frame0_mask,
             inv_frame1_mask=inv_frame1_mask,
             channel=channel,
+            header=header,
         )
     return final_byte_list
 
 
-def generate_single_pulse_bytes(
-    coeff,
-    wait,
-    modtype=0,
-    waittrig=False,
-    bypass=False,
-    sync_mask=0,
-    enable_mask=0,
-    fb_enable_mask=0,
-    channel=0,
-    apply_at_end_mask=0,
-    rst_frame_mask=0,
-    fwd_frame0_mask=0,
-    fwd_frame1_mask=0,
-    inv_frame0_mask=0,
-    inv_frame1_mask=0,
-):
-    """prints out coefficient data with wait times in between.
-    pow gives an overall scale factor to the data of 2**pow,
-    and converts the coefficients to integers"""
-    bytelist = map_to_bytes(
-        [int(coeff), 0, 0, 0, int(wait)]
-    )  # v0, v1, v2, v3, duration
-    final_bytes = apply_metadata(
-        bytelist,
-        modtype=modtype,
-        bypass=bypass,
-        waittrig=waittrig,
-        sync_mask=sync_mask,
-        enable_mask=enable_mask,
-        fb_enable_mask=fb_enable_mask,
-        channel=channel,
-        apply_at_end_mask=apply_at_end_mask,
-        rst_frame_mask=rst_frame_mask,
-        fwd_frame0_mask=fwd_frame0_mask,
-        fwd_frame1_mask=fwd_frame1_mask,
-        inv_frame0_mask=inv_frame0_mask,
-        inv_frame1_mask=inv_frame1_mask,
+# Parameters of a pulse in the order they are binarized, with their modulation
+# type and the functions that convert their discrete and spline values
+PARAMETER_ENCODINGS = (
+    ("freq0", FRQMOD0, convert_freq_full, convert_freq_full),
+    ("amp0", AMPMOD0, convert_amp_full, convert_amp_full),
+    ("phase0", PHSMOD0, convert_phase_full_mod_2pi, convert_phase_full),
+    ("freq1", FRQMOD1, convert_freq_full, convert_freq_full),
+    ("amp1", AMPMOD1, convert_amp_full, convert_amp_full),
+    ("phase1", PHSMOD1, convert_phase_full_mod_2pi, convert_phase_full),
+    ("framerot0", FRMROT0, convert_phase_full_mod_2pi, convert_phase_full),
+    ("framerot1", FRMROT1, convert_phase_full_mod_2pi, convert_phase_full),
+)
+
+# Flags that determine the metadata of a pulse, in the order they are given
+# to PulseEncoder.encode_parameters
+PULSE_FLAGS = (
+    "channel",
+    "bypass",
+    "waittrig",
+    "sync_mask",
+    "enable_mask",
+    "fb_enable_mask",
+    "apply_at_end_mask",
+    "rst_frame_mask",
+    "fwd_frame0_mask",
+    "fwd_frame1_mask",
+    "inv_frame0_mask",
+    "inv_frame1_mask",
+)
+
+# Flags that only apply at the start of a pulse, and are cleared for all but
+# the first part of Mixed data
+START_FLAGS = frozenset(
+    ("waittrig", "sync_mask", "apply_at_end_mask", "rst_frame_mask")
+)
+
+# The v1, v2 and v3 fields of a word with a constant value
+ZERO_FIELDS = bytes(15)
+
+# Location of the 40 bit duration field in a word
+DURATION_OFFSET = 4 * 5
+DURATION_END = DURATION_OFFSET + 5
+
+# Maximum number of constant pulse templates kept by a PulseEncoder
+TEMPLATE_CACHE_SIZE = 1 << 14
+
+# Array versions of the conversions in PARAMETER_ENCODINGS, used for parameters
+# with at least MIN_ARRAY_CONVERSION points. Below that, mapping the scalar
+# conversions is faster
+array_conversions = {
+    convert_freq_full: convert_freq_full_array,
+    convert_amp_full: convert_amp_full_array,
+    convert_phase_full: convert_phase_full_array,
+    convert_phase_full_mod_2pi: convert_phase_full_mod_2pi_array,
+}
+MIN_ARRAY_CONVERSION = 24
+
+parameter_getter = attrgetter(*(encoding[0] for encoding in PARAMETER_ENCODINGS))
+flag_getter = attrgetter(*PULSE_FLAGS[2:])
+
+
+def continuation_flags(flags):
+    return tuple(
+        False if name in START_FLAGS else flag for name, flag in zip(PULSE_FLAGS, flags)
+    )
+
+
+def interleave_words(bytelist):
+    """Interleave the words of each parameter so that the parameters are
+    updated together, with the longest parameters last"""
+    return list(
+        filter(
+            len,
+            [
+                m
+                for i in zip_longest(*sorted(bytelist, key=len), fillvalue=b"")
+                for m in i
+            ],
+        )
     )
-    return final_bytes, [final_bytes]
+
+
+class PulseEncoder:
+    """Binarizes pulses, reusing the metadata of each combination of
+    modulation type and flags (see PULSE_FLAGS) that has been encoded before.
+    headers maps (modtype, *flags) -> (first_metadata, metadata, padbytes),
+    the metadata bits of the first word and the following words of a
+    parameter and the metadata bytes of a word holding a constant value.
+
+    Pulses whose parameters are all constant only differ in their duration
+    once the parameters and flags are known, so their words are kept as
+    templates split around the duration field. templates maps
+    (parameters, flags) -> list of (bytes before, bytes after the duration)
+    for each word, and a pulse with a new duration is binarized by joining
+    each pair with the new duration. At most TEMPLATE_CACHE_SIZE templates
+    are kept, the oldest are dropped first."""
+
+    def __init__(self):
+        self.headers = dict()
+        self.templates = dict()
+
+    def __repr__(self):
+        return (
+            f"PulseEncoder(headers: {len(self.headers)}, "
+            f"templates: {len(self.templates)})"
+        )
+
+    def header(self, modtype, flags):
+        key = (modtype, *flags)
+        header = self.headers.get(key)
+        if header is None:
+            kwargs = dict(zip(PULSE_FLAGS, flags))
+            first_metadata = metadata_bits(modtype=modtype, ind=0, **kwargs)
+            header = (
+                first_metadata,
+                metadata_bits(modtype=modtype, ind=1, **kwargs),
+                convert_to_bytes(first_metadata, bytenum=NUM_PADBYTES, signed=False),
+            )
+            self.headers[key] = header
+        return header
+
+    def encode_parameter(self, encoding, data, dur, flags):
+        """Return the list of words for the data of a single parameter. If
+        the parameter contains Mixed data, the words of each part are
+        concatenated."""
+        _, modtype, convert_discrete, convert_spline = encoding
+        n_points = 1 if not hasattr(data, "__iter__") else len(data)
+        if isinstance(data, Mixed):
+            # If parameter contains mixed data, we need to calculate different
+            # combinations of Spline, Discrete, and constant parameters. Here,
+            # the durations are split evenly (timing errors evenly distributed)
+            # and calculated separately for each type, then concatenated.
+            raw_dur = np.round(np.linspace(0, dur, n_points + 1))
+            words = []
+            for i, (d, subdur) in enumerate(zip(data, np.diff(raw_dur))):
+                words.extend(
+                    self.encode_parameter(
+                        encoding,
+                        d,
+                        subdur,
+                        flags if i == 0 else continuation_flags(flags),
+                    )
+                )
+            return words
+        if n_points > 1:
+            pulsemode = isinstance(data, Discrete)
+            convert = convert_discrete if pulsemode else convert_spline
+            # raw_cycles specifies the actual time grid, distributing
+            # rounding errors must have one more point for pulse mode
+            # step_list is the time per point on the non-uniform grid
+            raw_cycles = np.round(np.linspace(0, dur, n_points + 1 * pulsemode))
+            step_list = list(np.diff(raw_cycles))
+            if min(step_list) < 4:
+                raise Exception(
+                    "Step size needs to be at least 4 clock cycles, or 10 ns!"
+                )
+            if n_points < MIN_ARRAY_CONVERSION:
+                ydata = np.array(list(map(convert, data)))
+            else:
+                ydata = array_conversions[convert](data)
+            first_metadata, metadata, _ = self.header(modtype, flags)
+            # xdata needs to have unit spacing to work well with the
+            # pdq spline mapping even when data is nonuniform
+            return generate_spline_bytes(
+                np.arange(n_points),
+                ydata,
+                step_list,
+                pulse_mode=pulsemode,
+                modtype=modtype,
+                shift_len=-1,
+                header=(first_metadata, metadata),
+                **dict(zip(PULSE_FLAGS, flags)),
+            )
+        _, _, padbytes = self.header(modtype, flags)
+        # v0, v1, v2, v3, duration
+        return [
+            convert_to_bytes(int(convert_discrete(delist(data))))
+            + ZERO_FIELDS
+            + convert_to_bytes(int(dur))
+            + padbytes
+        ]
+
+    def template(self, parameters, flags):
+        """Template of the words of a pulse with constant parameters, see
+        PulseEncoder"""
+        key = (parameters, flags)
+        template = self.templates.get(key)
+        if template is None:
+            template = [
+                (word[:DURATION_OFFSET], word[DURATION_END:])
+                for encoding, data in zip(PARAMETER_ENCODINGS, parameters)
+                for word in self.encode_parameter(encoding, data, 0, flags)
+            ]
+            if len(self.templates) >= TEMPLATE_CACHE_SIZE:
+                # Dicts keep insertion order, so this drops the oldest template
+                del self.templates[next(iter(self.templates))]
+            self.templates[key] = template
+        else:
+            event_counters["pulse_template_hits"] += 1
+        return template
+
+    def encode_parameters(self, dur, parameters, flags):
+        """Binarize a pulse given the data of each parameter, in the order of
+        PARAMETER_ENCODINGS, and a tuple of flags in the order of PULSE_FLAGS"""
+        if not any(hasattr(data, "__iter__") for data in parameters):
+            # Every parameter is a single word, so the words are in the order
+            # of PARAMETER_ENCODINGS and only the duration is left to fill in
+            duration = convert_to_bytes(int(dur))
+            return [
+                head + duration + tail
+                for head, tail in self.template(tuple(parameters), flags)
+            ]
+        return interleave_words(
+            [
+                self.encode_parameter(encoding, data, dur, flags)
+                for encoding, data in zip(PARAMETER_ENCODINGS, parameters)
+            ]
+        )
+
+    def encode(self, pd, bypass=False):
+        """Binarize a PulseData object"""
+        return self.encode_parameters(
+            pd.dur + pd.delay,
+            parameter_getter(pd),
+            (pd.channel & 0b111, bypass, *flag_getter(pd)),
+        )
+
+    def encode_many(self, pulse_data_list, bypass=False):
+        """Binarize each PulseData object in pulse_data_list and return their
+        lists of words in the same order. Equal pulses are only binarized
+        once, and share the same list of words"""
+        encoded = dict()
+        words = []
+        for pd in pulse_data_list:
+            pd_words = encoded.get(pd)
+            if pd_words is None:
+                pd_words = encoded[pd] = self.encode(pd, bypass)
+            words.append(pd_words)
+        return words
+
+
+# Encoder used by pulse() and PulseData.binarize
+pulse_encoder = PulseEncoder()
 
 
 def binarize_parameter(
@@ -354,104 +667,34 @@ def binarize_parameter(
     """This function is responsible for determining which method to use for
     generating the associated bytecode for a pulse with a specific parameter
     type. If mixed modulation types are used, it recursively descends the input
-    data and returns a flattened byte list."""
-    bytelist = []
+    data and returns a flattened byte list. mpdict[modt] describes the
+    parameter with its "modtype", "convertFunc" ({"discrete": function,
+    "spline": function}) and "enabled" entries. The words are generated by
+    pulse_encoder.encode_parameter"""
     if not mpdict[modt]["enabled"]:
-        return bytelist
-    n_points = 1 if not hasattr(data, "__iter__") else len(data)
-    if isinstance(data, Mixed):
-        # If parameter contains mixed data, we need to calculate different
-        # combinations of Spline, Discrete, and constant parameters. Here, the
-        # durations are split evenly (timing errors evenly distributed) and
-        # calculated separately for each type, then concatenated.
-        raw_dur = np.round(np.linspace(0, dur, n_points + 1))
-        subdurlist = list(np.diff(raw_dur))
-        for i, d in enumerate(data):
-            subdur = subdurlist[i]
-            bytelist.extend(
-                binarize_parameter(
-                    modt,
-                    mpdict,
-                    data=d,
-                    dur=subdur,
-                    waittrig=waittrig if i == 0 else False,
-                    bypass=bypass,
-                    sync_mask=sync_mask if i == 0 else False,
-                    enable_mask=enable_mask,
-                    fb_enable_mask=fb_enable_mask,
-                    apply_at_end_mask=apply_at_end_mask if i == 0 else False,
-                    rst_frame_mask=rst_frame_mask if i == 0 else False,
-                    fwd_frame0_mask=fwd_frame0_mask,
-                    fwd_frame1_mask=fwd_frame1_mask,
-                    inv_frame0_mask=inv_frame0_mask,
-                    inv_frame1_mask=inv_frame1_mask,
-                    DDS=DDS,
-                )
-            )
-        return bytelist
-    if n_points > 1:
-        pulsemode = isinstance(data, Discrete)
-
-        # xdata needs to have unit spacing to work well with the
-        # pdq spline mapping even when data is nonuniform
-        xdata = [i for i in range(n_points)]
-        ydata = list(
-            map(
-                mpdict[modt]["convertFunc"]["discrete" if pulsemode else "spline"],
-                data,
-            )
-        )
-
-        # raw_cycles specifies the actual time grid, distributing
-        # rounding errors must have one more point for pulse mode
-        # step_list is the time per point on the non-uniform grid
-        raw_cycles = np.round(np.linspace(0, dur, n_points + 1 * pulsemode))
-        step_list = list(np.diff(raw_cycles))
-        if min(step_list) < 4:
-            raise Exception("Step size needs to be at least 4 clock cycles, or 10 ns!")
-
-        bytelist.extend(
-            generate_spline_bytes(
-                np.array(xdata),
-                np.array(ydata),
-                step_list,
-                pulse_mode=pulsemode,
-                modtype=mpdict[modt]["modtype"],
-                shift_len=-1,
-                waittrig=waittrig,
-                bypass=bypass,
-                sync_mask=sync_mask,
-                enable_mask=enable_mask,
-                fb_enable_mask=fb_enable_mask,
-                apply_at_end_mask=apply_at_end_mask,
-                rst_frame_mask=rst_frame_mask,
-                fwd_frame0_mask=fwd_frame0_mask,
-                fwd_frame1_mask=fwd_frame1_mask,
-                inv_frame0_mask=inv_frame0_mask,
-                inv_frame1_mask=inv_frame1_mask,
-                channel=DDS,
-            )
-        )
-    else:
-        lbytes, _ = generate_single_pulse_bytes(
-            mpdict[modt]["convertFunc"]["discrete"](delist(data)),
-            dur,
-            modtype=mpdict[modt]["modtype"],
-            waittrig=waittrig,
-            bypass=bypass,
-            sync_mask=sync_mask,
-            enable_mask=enable_mask,
-            fb_enable_mask=fb_enable_mask,
-            apply_at_end_mask=apply_at_end_mask,
-            rst_frame_mask=rst_frame_mask,
-            fwd_frame0_mask=fwd_frame0_mask,
-            fwd_frame1_mask=fwd_frame1_mask,
-            inv_frame0_mask=inv_frame0_mask,
-            inv_frame1_mask=inv_frame1_mask,
-            channel=DDS,
-        )
-        bytelist.append(lbytes)
-    return bytelist
+        return []
+    convert_funcs = mpdict[modt]["convertFunc"]
+    encoding = (
+        modt,
+        mpdict[modt]["modtype"],
+        convert_funcs["discrete"],
+        convert_funcs["spline"],
+    )
+    flags = (
+        DDS,
+        bypass,
+        waittrig,
+        sync_mask,
+        enable_mask,
+        fb_enable_mask,
+        apply_at_end_mask,
+        rst_frame_mask,
+        fwd_frame0_mask,
+        fwd_frame1_mask,
+        inv_frame0_mask,
+        inv_frame1_mask,
+    )
+    return pulse_encoder.encode_parameter(encoding, data, dur, flags)
 
 
 def pulse(
@@ -478,109 +721,21 @@ def pulse(
     bypass=False,
 ):
     """Generates the binary data that needs to be uploaded to the chip from a set of input parameters"""
-    DDS &= 0b111
-    mpdict = {
-        "freq0": {
-            "modtype": FRQMOD0,
-            "data": freq0,
-            "convertFunc": {"discrete": convert_freq_full, "spline": convert_freq_full},
-            "enabled": True,
-        },
-        "freq1": {
-            "modtype": FRQMOD1,
-            "data": freq1,
-            "convertFunc": {"discrete": convert_freq_full, "spline": convert_freq_full},
-            "enabled": True,
-        },
-        "amp0": {
-            "modtype": AMPMOD0,
-            "data": amp0,
-            "convertFunc": {"discrete": convert_amp_full, "spline": convert_amp_full},
-            "enabled": True,
-        },
-        "amp1": {
-            "modtype": AMPMOD1,
-            "data": amp1,
-            "convertFunc": {"discrete": convert_amp_full, "spline": convert_amp_full},
-            "enabled": True,
-        },
-        "phase0": {
-            "modtype": PHSMOD0,
-            "data": phase0,
-            "convertFunc": {
-                "discrete": convert_phase_full_mod_2pi,
-                "spline": convert_phase_full,
-            },
-            "enabled": True,
-        },
-        "phase1": {
-            "modtype": PHSMOD1,
-            "data": phase1,
-            "convertFunc": {
-                "discrete": convert_phase_full_mod_2pi,
-                "spline": convert_phase_full,
-            },
-            "enabled": True,
-        },
-        "framerot0": {
-            "modtype": FRMROT0,
-            "data": framerot0,
-            "convertFunc": {
-                "discrete": convert_phase_full_mod_2pi,
-                "spline": convert_phase_full,
-            },
-            "enabled": True,
-        },
-        "framerot1": {
-            "modtype": FRMROT1,
-            "data": framerot1,
-            "convertFunc": {
-                "discrete": convert_phase_full_mod_2pi,
-                "spline": convert_phase_full,
-            },
-            "enabled": True,
-        },
-    }
-    modlist = [
-        "freq0",
-        "amp0",
-        "phase0",
-        "freq1",
-        "amp1",
-        "phase1",
-        "framerot0",
-        "framerot1",
-    ]
-    bytelist = []
-    for modt in modlist:
-        bytelist.append(
-            binarize_parameter(
-                modt,
-                mpdict,
-                data=mpdict[modt]["data"],
-                dur=dur,
-                waittrig=waittrig,
-                bypass=bypass,
-                sync_mask=sync_mask,
-                enable_mask=enable_mask,
-                fb_enable_mask=fb_enable_mask,
-                apply_at_end_mask=apply_at_end_mask,
-                rst_frame_mask=rst_frame_mask,
-                fwd_frame0_mask=fwd_frame0_mask,
-                fwd_frame1_mask=fwd_frame1_mask,
-                inv_frame0_mask=inv_frame0_mask,
-                inv_frame1_mask=inv_frame1_mask,
-                DDS=DDS,
-            )
-        )
-    splist = list(
-        filter(
-            len,
-            [
-                m
-                for i in zip_longest(*sorted(bytelist, key=len), fillvalue=b"")
-                for m in i
-            ],
-        )
+    return pulse_encoder.encode_parameters(
+        dur,
+        (freq0, amp0, phase0, freq1, amp1, phase1, framerot0, framerot1),
+        (
+            DDS & 0b111,
+            bypass,
+            waittrig,
+            sync_mask,
+            enable_mask,
+            fb_enable_mask,
+            apply_at_end_mask,
+            rst_frame_mask,
+            fwd_frame0_mask,
+            fwd_frame1_mask,
+            inv_frame0_mask,
+            inv_frame1_mask,
+        ),
     )
-    return splist
@@ -0,0 +1,144 @@
+from functools import lru_cache
+from hashlib import blake2b
+
+import numpy as np
+
+from jaqalpaw.utilities.instrumentation import event_counters
+
+# ######################################################## #
+# ------------ Unit Spaced Natural Spline Fits ----------- #
+# ######################################################## #
+
+# Splines are always fit to knots at x = 0, 1, 2, ... with natural boundary
+# conditions (zero second derivative at both ends), so the tridiagonal system
+# for the slopes at the knots only depends on the number of knots. The system
+# is eliminated in the same order as LAPACK's gtsv, which is what scipy's
+# CubicSpline uses, so the coefficients are identical to CubicSpline(xs, ys,
+# bc_type=((2, 0.0), (2, 0.0))).c without the overhead of building a
+# CubicSpline object for every fit.
+
+# Maximum number of fits kept in spline_cache
+SPLINE_CACHE_SIZE = 1 << 14
+
+# Maps a digest of the knot values -> spline coefficients
+spline_cache = dict()
+
+
+@lru_cache(maxsize=None)
+def natural_spline_factors(n):
+    """Return the elimination multipliers and the pivots (diagonal of U) of
+    the slope system of a natural spline through n unit spaced knots. The
+    system is diagonally dominant, so gtsv never interchanges rows"""
+    pivots = [2.0] + [4.0] * (n - 2) + [2.0]
+    multipliers = []
+    for i in range(n - 1):
+        m = 1.0 / pivots[i]
+        pivots[i + 1] = pivots[i + 1] - m * 1.0
+        multipliers.append(m)
+    return multipliers, pivots
+
+
+def slope_system_rhs(ys):
+    """Right hand side of the slope system for the knot values ys, with knots
+    along the first axis"""
+    slope = np.diff(ys, axis=0)
+    rhs = np.empty(ys.shape)
+    rhs[0] = 3 * slope[0]
+    rhs[1:-1] = 3 * (slope[:-1] + slope[1:])
+    rhs[-1] = 3 * slope[-1]
+    return slope, rhs
+
+
+def hermite_coefficients(ys, slope, dydx):
+    """Polynomial coefficients of each segment in the form of
+    CubicSpline.c, given the knot values, the slope between knots and the
+    derivative at each knot, with knots along the first axis"""
+    t = dydx[:-1] + dydx[1:] - 2 * slope
+    return np.stack((t, (slope - dydx[:-1]) - t, dydx[:-1], ys[:-1]))
+
+
+def natural_spline_coefficients(ys):
+    """Coefficients of the natural spline through ys at x = 0, 1, 2, ... in
+    the form of CubicSpline.c (shape [4, len(ys) - 1])"""
+    ys = np.asarray(ys, dtype=float)
+    n = len(ys)
+    multipliers, pivots = natural_spline_factors(n)
+    slope, rhs = slope_system_rhs(ys)
+    # The recurrences are sequential, and are faster with Python floats than
+    # with numpy scalars
+    b = rhs.tolist()
+    for i in range(n - 1):
+        b[i + 1] = b[i + 1] - multipliers[i] * b[i]
+    b[n - 1] = b[n - 1] / pivots[n - 1]
+    for i in range(n - 2, -1, -1):
+        b[i] = (b[i] - b[i + 1]) / pivots[i]
+    return hermite_coefficients(ys, slope, np.array(b))
+
+
+def natural_spline_coefficients_batch(ys):
+    """Fit natural splines to every row of ys (shape [B, n]) at once, and
+    return the coefficients with shape [B, 4, n - 1]"""
+    ys = np.asarray(ys, dtype=float).T
+    n = len(ys)
+    multipliers, pivots = natural_spline_factors(n)
+    slope, b = slope_system_rhs(ys)
+    for i in range(n - 1):
+        b[i + 1] = b[i + 1] - multipliers[i] * b[i]
+    b[n - 1] = b[n - 1] / pivots[n - 1]
+    for i in range(n - 2, -1, -1):
+        b[i] = (b[i] - b[i + 1]) / pivots[i]
+    return hermite_coefficients(ys, slope, b).transpose(2, 0, 1)
+
+
+def knot_digest(ys):
+    return blake2b(ys.tobytes(), digest_size=16).digest()
+
+
+def cache_fit(key, coeffs):
+    if len(spline_cache) >= SPLINE_CACHE_SIZE:
+        # Dicts keep insertion order, so this drops the oldest fit
+        del spline_cache[next(iter(spline_cache))]
+    coeffs.setflags(write=False)
+    spline_cache[key] = coeffs
+
+
+def fit_natural_spline(ys):
+    """Return the (read only) coefficients of the natural spline through ys
+    at x = 0, 1, 2, ..., reusing the fit of previous knots with the same
+    values"""
+    ys = np.ascontiguousarray(ys, dtype=float)
+    key = knot_digest(ys)
+    coeffs = spline_cache.get(key)
+    if coeffs is None:
+        coeffs = natural_spline_coefficients(ys)
+        cache_fit(key, coeffs)
+    else:
+        event_counters["spline_cache_hits"] += 1
+    return coeffs
+
+
+def fit_natural_splines(knot_lists):
+    """Fit natural splines to each array of knot values in knot_lists, and
+    return their coefficients in the same order. Fits that aren't cached are
+    solved together, in one batch for each number of knots"""
+    knot_lists = [np.ascontiguousarray(ys, dtype=float) for ys in knot_lists]
+    keys = [knot_digest(ys) for ys in knot_lists]
+    pending = dict()
+    for key, ys in zip(keys, knot_lists):
+        if key in spline_cache:
+            event_counters["spline_cache_hits"] += 1
+        else:
+            pending.setdefault(len(ys), dict())[key] = ys
+    fits = {key: spline_cache[key] for key in keys if key in spline_cache}
+    for batch in pending.values():
+        for key, coeffs in zip(
+            batch, natural_spline_coefficients_batch(list(batch.values()))
+        ):
+            coeffs = np.array(coeffs)
+            cache_fit(key, coeffs)
+            fits[key] = coeffs
+    return [fits[key] for key in keys]
+
+
+def is_unit_spaced(xs):
+    return len(xs) > 1 and bool(np.all(np.diff(xs) == 1))
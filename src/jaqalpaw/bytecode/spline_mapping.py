@@ -5,30 +5,44 @@ import numpy as np
 # ######################################################## #
 
 
+def time_step_powers(nsteps, nsegments):
+    """First three powers of the time step of each spline segment as arrays.
+    The powers are taken with Python floats, so they match the per-segment
+    scalar calculation exactly"""
+    if np.ndim(nsteps) == 0:
+        nsteps = [nsteps] * nsegments
+    tsteps = [1 / n for n in nsteps]
+    return (
+        np.array(tsteps, dtype=float),
+        np.array([t**2 for t in tsteps], dtype=float),
+        np.array([t**3 for t in tsteps], dtype=float),
+    )
+
+
+def pdq_coefficients(interp_table, nsteps):
+    """Map the spline coefficients of every segment (column) for accumulator
+    based reconstruction, without any bit shift applied. The ordering of rows
+    is the same as the default output of scipy's cubic spline coefficients,
+    where the index is inversely related to the order of each coefficient"""
+    tstep, tstep2, tstep3 = time_step_powers(nsteps, interp_table.shape[1])
+    return (
+        6 * interp_table[0] * tstep3,
+        2 * interp_table[1] * tstep2 + 6 * interp_table[0] * tstep3,
+        interp_table[2] * tstep + interp_table[1] * tstep2 + interp_table[0] * tstep3,
+    )
+
+
 def cs_mapper_int(interp_table, nsteps=409625, shift_len=16):
     """Map spline coefficients into representation that
     can be used for accumulator based reconstruction.
     Convert the data to integers for hardware and bitshift
     higher order coefficients for better resolution"""
     new_coeffs = np.zeros(interp_table.shape)
-    for i in range(interp_table.shape[1]):
-        tstep = 1 / nsteps if not isinstance(nsteps, list) else 1 / nsteps[i]
-        new_coeffs[3, i] = float(interp_table[3, i])
-        new_coeffs[2, i] = float(
-            (
-                interp_table[2, i] * tstep
-                + interp_table[1, i] * tstep**2
-                + interp_table[0, i] * tstep**3
-            )
-            * (1 << shift_len)
-        )
-        new_coeffs[1, i] = float(
-            (2 * interp_table[1, i] * tstep**2 + 6 * interp_table[0, i] * tstep**3)
-            * (1 << (shift_len * 2))
-        )
-        new_coeffs[0, i] = float(
-            (6 * interp_table[0, i] * tstep**3) * (1 << (shift_len * 3))
-        )
+    coeff0, coeff1, coeff2 = pdq_coefficients(interp_table, nsteps)
+    new_coeffs[3] = interp_table[3]
+    new_coeffs[2] = coeff2 * (1 << shift_len)
+    new_coeffs[1] = coeff1 * (1 << (shift_len * 2))
+    new_coeffs[0] = coeff0 * (1 << (shift_len * 3))
     return new_coeffs
 
 
@@ -36,60 +50,52 @@ def cs_mapper_int_auto_shift(interp_table, nsteps, apply_phase_mask=False):
     """Map spline coefficients into representation that
     can be used for accumulator based reconstruction.
     This variation automatically determines the optimal
-    bit shift for a given set of spline coefficients"""
+    bit shift for a given set of spline coefficients.
+    All segments are mapped at once, with results that are
+    identical to mapping each segment with integer arithmetic"""
     new_coeffs = np.zeros(interp_table.shape)
-    shift_len_list = []
-    for i in range(interp_table.shape[1]):
-        tstep = 1 / nsteps[i]
-
-        # initial pdq mapping, ordering is the same as the default output
-        # of scipy's cubic spline coefficients, where index is inversely
-        # related to the order of each coefficient.
-        if apply_phase_mask:
-            new_coeffs[3, i] = (
-                (int(interp_table[3, i]) & 0xFFFFFFFFFF) ^ 0x8000000000
-            ) - 0x8000000000
-        else:
-            new_coeffs[3, i] = int(interp_table[3, i])
-        new_coeffs[2, i] = (
-            interp_table[2, i] * tstep
-            + interp_table[1, i] * tstep**2
-            + interp_table[0, i] * tstep**3
-        )
-        new_coeffs[1, i] = (
-            2 * interp_table[1, i] * tstep**2 + 6 * interp_table[0, i] * tstep**3
-        )
-        new_coeffs[0, i] = 6 * interp_table[0, i] * tstep**3
-
-        # coefficients have been mapped for PDQ interpolation, but the
-        # higher order coefficients may be resolution limited. The data
-        # can be bit-shifted on chip, and the shift is calculated here
+    # int() truncates towards zero, and the truncated value is exactly
+    # representable, so trunc gives the same value as a float
+    new_coeffs[3] = np.trunc(interp_table[3])
+    if apply_phase_mask:
+        # Wrap to a signed 40 bit value. Floored division by a power of two
+        # is exact, so this matches masking the integer value
+        new_coeffs[3] = np.mod(new_coeffs[3], float(1 << 40))
+        new_coeffs[3, new_coeffs[3] >= 1 << 39] -= float(1 << 40)
+    new_coeffs[0], new_coeffs[1], new_coeffs[2] = pdq_coefficients(interp_table, nsteps)
 
-        # number of significant bits for higher order terms
-        sig_bits = np.log2(np.abs(new_coeffs[:-1, i]) + 1e-23)
+    # coefficients have been mapped for PDQ interpolation, but the
+    # higher order coefficients may be resolution limited. The data
+    # can be bit-shifted on chip, and the shift is calculated here
 
-        # number of shift bits is applied in multiples of N for Nth order coefficients, so
-        # the overhead (or unused) bits are divided by the coefficient order. The shift is
-        # applied to all non-zeroth order coefficients, so the maximum shift is determined
-        # from the minimum overhead with multiples taken into account. The parameter width
-        # is 40 bits, but is signed, so 39 sets the number of unsigned data bits. The shift
-        # word is encoded in 5 bits, allowing for a maximum shift of 31. The data is written
-        # to varying length words in fabric, where the word size is 40+16*N. However, if the
-        # pulse time is long, more sensitivity is needed and the bit shift can exceed the
-        # number of overhead bits when the coefficients are very small
-        shift_len = int(
-            min(min([(39 - v) / (i + 1) for i, v in enumerate(reversed(sig_bits))]), 31)
-        )
+    # number of significant bits for higher order terms
+    sig_bits = np.log2(np.abs(new_coeffs[:-1]) + 1e-23)
 
-        # re-map coefficients with bit shift, bit shift is applied as 2**(shift*N) as opposed
-        # to simply bit-shifting the coefficients as in int(val)<<(shift*N). This is done in
-        # order to get more resolution on the LSBs, which accumulate over many clock cycles
-        new_coeffs[2, i] = int(new_coeffs[2, i] * (1 << shift_len))
-        new_coeffs[1, i] = int(new_coeffs[1, i] * (1 << (shift_len * 2)))
-        new_coeffs[0, i] = int(new_coeffs[0, i] * (1 << (shift_len * 3)))
+    # number of shift bits is applied in multiples of N for Nth order coefficients, so
+    # the overhead (or unused) bits are divided by the coefficient order. The shift is
+    # applied to all non-zeroth order coefficients, so the maximum shift is determined
+    # from the minimum overhead with multiples taken into account. The parameter width
+    # is 40 bits, but is signed, so 39 sets the number of unsigned data bits. The shift
+    # word is encoded in 5 bits, allowing for a maximum shift of 31. The data is written
+    # to varying length words in fabric, where the word size is 40+16*N. However, if the
+    # pulse time is long, more sensitivity is needed and the bit shift can exceed the
+    # number of overhead bits when the coefficients are very small
+    overhead = np.minimum(
+        np.minimum((39 - sig_bits[2]) / 1, (39 - sig_bits[1]) / 2),
+        (39 - sig_bits[0]) / 3,
+    )
+    shift_lens = np.trunc(np.minimum(overhead, 31)).astype(np.int64)
+    if np.any(shift_lens < 0):
+        raise ValueError("negative shift count")
 
-        # shift_len can vary for every coefficient, so a list of shift parameters is passed
-        # along with the coefficients for metadata tagging
-        shift_len_list.append(shift_len)
+    # re-map coefficients with bit shift, bit shift is applied as 2**(shift*N) as opposed
+    # to simply bit-shifting the coefficients as in int(val)<<(shift*N). This is done in
+    # order to get more resolution on the LSBs, which accumulate over many clock cycles.
+    # Scaling by an exact power of two and truncating matches int(val * (1 << shift*N))
+    new_coeffs[2] = np.trunc(new_coeffs[2] * np.ldexp(1.0, shift_lens))
+    new_coeffs[1] = np.trunc(new_coeffs[1] * np.ldexp(1.0, 2 * shift_lens))
+    new_coeffs[0] = np.trunc(new_coeffs[0] * np.ldexp(1.0, 3 * shift_lens))
 
-    return new_coeffs, shift_len_list
+    # shift_len can vary for every coefficient, so a list of shift parameters is passed
+    # along with the coefficients for metadata tagging
+    return new_coeffs, shift_lens.tolist()
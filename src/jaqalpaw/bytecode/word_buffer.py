@@ -0,0 +1,124 @@
+import struct
+
+import numpy as np
+
+from .encoding_parameters import ENDIANNESS
+
+# ######################################################## #
+# --------------- Contiguous Word Buffers ---------------- #
+# ######################################################## #
+
+WORD_SIZE = 32  # bytes per 256 bit transfer word
+
+# Integer words are written as four 64 bit lanes, so no bytes object is
+# created for each word. The lanes are ordered to match ENDIANNESS
+LANE_MASK = (1 << 64) - 1
+LANE_SHIFTS = (0, 64, 128, 192) if ENDIANNESS == "little" else (192, 128, 64, 0)
+LANE_ORDER = "<" if ENDIANNESS == "little" else ">"
+LANE_DTYPE = np.dtype(LANE_ORDER + "u8")
+WORD_STRUCT = struct.Struct(LANE_ORDER + "4Q")
+
+
+class WordBuffer:
+    """A single preallocated bytearray that holds a series of 32 byte transfer
+    words back to back. Words are written in place, so building the output for
+    a board doesn't create a bytes object per word, and the result can be
+    handed off as one memoryview (or NumPy array) without copying.
+
+    The buffer grows by doubling if more words are appended than it was sized
+    for. Views returned by view() and as_array() export the underlying buffer,
+    so they should be taken once the buffer has been filled."""
+
+    def __init__(self, capacity=0):
+        self.data = bytearray(capacity * WORD_SIZE)
+        self.nwords = 0
+
+    def __len__(self):
+        return self.nwords
+
+    def __repr__(self):
+        return f"WordBuffer(words: {self.nwords}, capacity: {self.capacity})"
+
+    @property
+    def capacity(self):
+        """Number of words that fit in the buffer without reallocating"""
+        return len(self.data) // WORD_SIZE
+
+    @property
+    def nbytes(self):
+        return self.nwords * WORD_SIZE
+
+    def reserve(self, nwords):
+        """Make room for at least nwords more words"""
+        required = (self.nwords + nwords) * WORD_SIZE
+        if required > len(self.data):
+            self.data.extend(bytes(max(required, 2 * len(self.data)) - len(self.data)))
+
+    def append_int(self, intdata):
+        """Write an integer word into the next free slot"""
+        if self.nbytes >= len(self.data):
+            self.reserve(max(1, self.nwords))
+        WORD_STRUCT.pack_into(
+            self.data,
+            self.nbytes,
+            *(intdata >> shift & LANE_MASK for shift in LANE_SHIFTS),
+        )
+        self.nwords += 1
+
+    def append(self, word):
+        """Copy a 32 byte word into the next free slot"""
+        if len(word) != WORD_SIZE:
+            raise ValueError(f"Expected a {WORD_SIZE} byte word, got {len(word)}")
+        if self.nbytes >= len(self.data):
+            self.reserve(max(1, self.nwords))
+        offset = self.nbytes
+        self.data[offset : offset + WORD_SIZE] = word
+        self.nwords += 1
+
+    def extend_ints(self, words):
+        """Write a series of integer words into the next free slots. Each lane
+        of all the words is set with one array assignment"""
+        words = list(words)
+        if not words:
+            return
+        self.reserve(len(words))
+        lanes = np.frombuffer(
+            self.data, dtype=LANE_DTYPE, count=4 * len(words), offset=self.nbytes
+        )
+        for n, shift in enumerate(LANE_SHIFTS):
+            lanes[n::4] = [intdata >> shift & LANE_MASK for intdata in words]
+        self.nwords += len(words)
+
+    def extend(self, words):
+        for word in words:
+            self.append(word)
+
+    def extend_array(self, words):
+        """Copy a uint8 NumPy array of words with shape (N, 32) into the next
+        free slots"""
+        self.reserve(len(words))
+        np.frombuffer(
+            self.data, dtype=np.uint8, count=words.size, offset=self.nbytes
+        ).reshape(words.shape)[:] = words
+        self.nwords += len(words)
+
+    def extend_interleaved(self, arrays):
+        """Copy the words of several uint8 arrays with shape (N, 32) in the
+        order given by zip_longest: the first word of each array, then the
+        second word of each array that has one, and so on"""
+        if not arrays:
+            return
+        rounds = np.concatenate([np.arange(len(words)) for words in arrays])
+        order = np.argsort(rounds, kind="stable")
+        self.extend_array(np.concatenate(arrays)[order])
+
+    def view(self):
+        """memoryview of the words written so far"""
+        return memoryview(self.data)[: self.nbytes]
+
+    def as_array(self):
+        """The words written so far as a uint8 NumPy array of shape (N, 32),
+        sharing memory with the buffer"""
+        return np.frombuffer(self.data, dtype=np.uint8, count=self.nbytes).reshape(
+            self.nwords, WORD_SIZE
+        )
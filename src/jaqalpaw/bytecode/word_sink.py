@@ -0,0 +1,88 @@
+import os
+from itertools import islice
+
+# ######################################################## #
+# ---------------- Streaming Word Output ----------------- #
+# ######################################################## #
+
+# Maximum number of words handed to a single (scatter-gather) write call.
+# This is kept at or below the usual IOV_MAX of 1024 for writev/sendmsg.
+WRITE_BATCH_SIZE = 1024
+if hasattr(os, "sysconf"):
+    try:
+        WRITE_BATCH_SIZE = min(WRITE_BATCH_SIZE, os.sysconf("SC_IOV_MAX"))
+    except (ValueError, OSError):
+        pass
+
+
+def batch_words(words, batch_size=WRITE_BATCH_SIZE):
+    """Group an iterable of words into lists of at most batch_size words"""
+    words = iter(words)
+    while True:
+        batch = list(islice(words, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def get_fileno(sink):
+    """Return the file descriptor backing sink, or None if there isn't one"""
+    try:
+        return sink.fileno()
+    except (AttributeError, OSError, ValueError):
+        # io.UnsupportedOperation is a subclass of OSError and ValueError
+        return None
+
+
+def writev_all(fd, buffers):
+    """Write all buffers to a file descriptor with a scatter-gather write,
+    completing any partial write with sequential writes"""
+    total = sum(map(len, buffers))
+    written = os.writev(fd, buffers)
+    if written < total:
+        remainder = memoryview(b"".join(buffers))[written:]
+        while remainder:
+            remainder = remainder[os.write(fd, remainder) :]
+    return total
+
+
+def sendmsg_all(sock, buffers):
+    """Send all buffers on a socket with a scatter-gather send, completing
+    any partial send with sendall"""
+    total = sum(map(len, buffers))
+    sent = sock.sendmsg(buffers)
+    if sent < total:
+        sock.sendall(memoryview(b"".join(buffers))[sent:])
+    return total
+
+
+def write_joined(sink, buffers):
+    """Write all buffers to a file-like object as a single write call"""
+    data = b"".join(buffers)
+    sink.write(data)
+    return len(data)
+
+
+def write_words(sink, words, batch_size=WRITE_BATCH_SIZE):
+    """Write an iterable of words (bytes-like objects) to sink as they are
+    produced and return the total number of bytes written. Words are written
+    in batches of batch_size, so at most one batch is held in memory.
+
+    sink can be a socket, which is written with sendmsg, or a file-like
+    object. File-like objects backed by a file descriptor are flushed and then
+    written with os.writev where it's available, and any other object with a
+    write method (e.g. io.BytesIO) receives each batch joined into one write"""
+    if hasattr(sink, "sendmsg"):
+        write_batch = lambda batch: sendmsg_all(sink, batch)
+    else:
+        fd = get_fileno(sink) if hasattr(os, "writev") else None
+        if fd is not None:
+            if hasattr(sink, "flush"):
+                sink.flush()
+            write_batch = lambda batch: writev_all(fd, batch)
+        else:
+            write_batch = lambda batch: write_joined(sink, batch)
+    nbytes = 0
+    for batch in batch_words(words, batch_size):
+        nbytes += write_batch(batch)
+    return nbytes
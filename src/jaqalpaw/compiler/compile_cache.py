@@ -0,0 +1,183 @@
+import inspect
+import os
+import pickle
+import sys
+import tempfile
+from hashlib import blake2b
+from pathlib import Path
+
+import jaqalpaw
+
+# ######################################################## #
+# ---------------- On-Disk Compile Cache ----------------- #
+# ######################################################## #
+
+CACHE_SUFFIX = ".jpc"
+
+
+def pulse_definition_source(pulse_definition):
+    """Return the source of every module that contributes a class to the
+    pulse definition's MRO, so edits to the gate pulse file (or a base class
+    it inherits from) change the cache key"""
+    cls = (
+        pulse_definition
+        if isinstance(pulse_definition, type)
+        else type(pulse_definition)
+    )
+    sources = []
+    for klass in cls.__mro__:
+        module = sys.modules.get(klass.__module__)
+        if module is None or klass.__module__ == "builtins":
+            continue
+        try:
+            sources.append(inspect.getsource(module))
+        except (OSError, TypeError):
+            sources.append(f"{klass.__module__}.{klass.__qualname__}")
+    return "\n".join(sources)
+
+
+def remove_file(path):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def override_repr(override_dict):
+    if not override_dict:
+        return "None"
+    return repr(sorted(override_dict.items(), key=lambda kv: str(kv[0])))
+
+
+def compile_cache_key(
+    jaqal_source,
+    pulse_definition,
+    override_dict=None,
+    pd_override_dict=None,
+    global_delay=None,
+    num_channels=8,
+    options=None,
+):
+    """Digest of everything that determines the compiled output of a circuit.
+    options holds any compiler settings that change the output"""
+    digest = blake2b(digest_size=20)
+    if isinstance(jaqal_source, str):
+        jaqal_source = jaqal_source.encode()
+    for part in (
+        jaqalpaw.__version__.encode(),
+        jaqal_source,
+        pulse_definition_source(pulse_definition).encode(),
+        override_repr(override_dict).encode(),
+        override_repr(pd_override_dict).encode(),
+        repr(global_delay).encode(),
+        repr(num_channels).encode(),
+        override_repr(options).encode(),
+    ):
+        # Length prefixes keep the boundaries between parts unambiguous
+        digest.update(len(part).to_bytes(8, "little"))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+class CompileCache:
+    """Stores compiled output on disk in files named by a content hash of the
+    inputs (see compile_cache_key). The total size of the cache directory is
+    kept below max_bytes by evicting the least recently used entries, where
+    the modification time of an entry is refreshed whenever it's read.
+
+    Entries are stored with pickle and unpickled when they're read, so the
+    cache directory must be trusted: loading an entry written by someone else
+    can run arbitrary code. Don't put the cache in a shared location."""
+
+    def __init__(self, directory, max_bytes=1 << 30):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __repr__(self):
+        return (
+            f"CompileCache({str(self.directory)!r}, hits: {self.hits}, "
+            f"misses: {self.misses}, evictions: {self.evictions})"
+        )
+
+    def path(self, key):
+        return self.directory / (key + CACHE_SUFFIX)
+
+    def entries(self):
+        return list(self.directory.glob("*" + CACHE_SUFFIX))
+
+    def entry_stats(self):
+        """(stat result, path) of each entry, skipping entries that are
+        removed by another process while they're listed"""
+        entries = []
+        for path in self.entries():
+            try:
+                entries.append((path.stat(), path))
+            except FileNotFoundError:
+                pass
+        return entries
+
+    def get(self, key):
+        """Return the cached value for key, or None if it isn't cached"""
+        path = self.path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception:
+            # Truncated, corrupt or stale entries are treated as misses and
+            # dropped
+            self.misses += 1
+            remove_file(path)
+            return None
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """Store value under key, then evict old entries if needed"""
+        fd, tmpname = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmpname, self.path(key))
+        except BaseException:
+            remove_file(tmpname)
+            raise
+        self.evict()
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in
+        max_bytes"""
+        entries = self.entry_stats()
+        total = sum(st.st_size for st, _ in entries)
+        for st, path in sorted(entries, key=lambda e: e[0].st_mtime_ns):
+            if total <= self.max_bytes:
+                break
+            remove_file(path)
+            total -= st.st_size
+            self.evictions += 1
+
+    def clear(self):
+        for path in self.entries():
+            remove_file(path)
+
+    @property
+    def size(self):
+        return sum(st.st_size for st, _ in self.entry_stats())
+
+    @property
+    def stats(self):
+        entries = self.entry_stats()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(entries),
+            "bytes": sum(st.st_size for st, _ in entries),
+        }
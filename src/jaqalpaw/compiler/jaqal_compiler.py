@@ -4,25 +4,61 @@ from itertools import zip_longest
 
 from jaqalpaw.ir.circuit_constructor import CircuitConstructor
 from jaqalpaw.ir.gate_slice import GateSlice
-from jaqalpaw.ir.pulse_data import PulseData
+from jaqalpaw.ir.pulse_data import PulseData, binarize_many, gate_digest
 from jaqalpaw.bytecode.lut_programming import (
     program_PLUT,
     program_SLUT,
     program_GLUT,
     gate_sequence_bytes,
+    gate_sequence_length,
+    gate_sequence_word_count,
+    iterate_gate_sequence,
+    iterate_gate_sequence_word_lists,
+    packed_word_count,
 )
-from .time_ordering import timesort_bytelist
+from jaqalpaw.bytecode.word_buffer import WordBuffer
+from jaqalpaw.bytecode.word_sink import write_words
+from jaqalpaw.bytecode.binarization_cache import binarization_cache
+from .time_ordering import decode_word, iterate_timesorted_streams, timesort_bytelist
+from .lut_allocator import LUTAllocator, merge_lut_image
+from .shot_index import ShotIndex
+from .compile_cache import CompileCache, compile_cache_key
+from ..ir.circuit_constructor_visitor import populate_gate_slice
 from jaqalpaw.utilities.datatypes import Loop, to_clock_cycles, Branch, Case
 from jaqalpaw.utilities.exceptions import CircuitCompilerException
+from jaqalpaw.utilities.instrumentation import CompileStats, event_counters
 from jaqalpaw.utilities.parameters import CLKFREQ
 from jaqalpaw.bytecode.encoding_parameters import (
     ANCILLA_COMPILER_TAG_BIT,
     ANCILLA_STATE_LSB,
+    GLUTW,
+    GPRGW,
+    PLUTW,
+    SLUTW,
+    SLUT_BYTECNT,
+    GLUT_BYTECNT,
 )
-from ..ir.circuit_constructor_visitor import populate_gate_slice
 
 flatten = lambda x: [y for l in x for y in l]
 
+# Number of shot indices for which partial gate sequence data is kept
+PARTIAL_SEQUENCE_CACHE_SIZE = 16
+
+
+class SequenceBins(dict):
+    """The GSEQ_bin of a CircuitCompiler, {channel: gate sequence words}.
+    Looking up a channel whose sequence wasn't packed by compile() packs it
+    with pack(channel), so GSEQ_bin[ch] always gives the words, while
+    "ch in GSEQ_bin" tells whether the sequence has been packed yet"""
+
+    def __init__(self, pack, *args):
+        super().__init__(*args)
+        self.pack = pack
+
+    def __missing__(self, ch):
+        return self.pack(ch)
+
+
 # ######################################################## #
 # ---------- Convert GateSlice IR to Bytecode ------------ #
 # ######################################################## #
@@ -41,6 +77,11 @@ class CircuitCompiler(CircuitConstructor):
         pulse_definition=None,
         global_delay=None,
         code_literal=None,
+        compile_cache=None,
+        previous_lut_image=None,
+        share_mmap=False,
+        stats=None,
+        profile_memory=False,
     ):
         super().__init__(num_channels, pulse_definition)
         self.file = file
@@ -50,26 +91,49 @@ class CircuitCompiler(CircuitConstructor):
         self.gate_hash_recurrence = defaultdict(lambda: defaultdict(int))
         self.gate_sequence_hashes = defaultdict(list)
         self.gate_sequence_ids = defaultdict(list)
+        self.shot_boundary_gids = defaultdict(set)
+        self.shot_indices = dict()
+        self.partial_GSEQ_bin_cache = dict()
         self.ordered_gate_identifiers = dict()
         self.final_byte_dict = defaultdict(list)
         self.programming_data = list()
         self.sequence_data = list()
-        self.PLUT_data = defaultdict(list)
+        self.lut_allocators = dict()
+        self.PLUT_data = defaultdict(dict)
         self.MMAP_data = defaultdict(dict)
         self.GLUT_data = defaultdict(dict)
         self.PLUT_bin = defaultdict(list)
         self.MMAP_bin = defaultdict(list)
         self.GLUT_bin = defaultdict(list)
-        self.GSEQ_bin = defaultdict(list)
+        # Maps channel -> gate sequence words, only for the channels whose
+        # sequence has been packed (see sequence_bin)
+        self.GSEQ_bin = SequenceBins(self.sequence_bin)
         self.override_dict = override_dict
         self.pd_override_dict = pd_override_dict
         self.compiled = False
+        # Set when the last compile was loaded from the compile cache
+        self.cache_hit = False
+        # Set once words_emitted has been counted for the last compile
+        self.words_counted = False
+        self.gate_cache = None
         self.delay_settings = None
         self.set_global_delay(global_delay)
-        self.initialize_gate_name = "prepare_all"
+        if compile_cache is not None and not isinstance(compile_cache, CompileCache):
+            compile_cache = CompileCache(compile_cache)
+        self.compile_cache = compile_cache
+        self.previous_lut_image = previous_lut_image
+        self.share_mmap = share_mmap
+        # stats can be a CompileStats, or True to create one. profile_memory
+        # also traces the memory used by each phase (see CompileStats)
+        if stats is True or (profile_memory and not stats):
+            stats = CompileStats(memory=profile_memory)
+        elif profile_memory:
+            stats.memory = True
+        self.stats = stats or None
         self.import_gate_pulses()
 
     def set_global_delay(self, global_delay=None):
+        self.global_delay = global_delay
         if global_delay is None:
             self.delay_settings = None
         else:
@@ -87,19 +151,17 @@ class CircuitCompiler(CircuitConstructor):
         for s in slices:
             if isinstance(s, Loop):
                 for _ in range(s.repeats):
-                    self.recursive_append(s, appendto)
+                    self.recursive_append_and_expand(s, appendto)
             elif isinstance(s, list):
-                self.recursive_append(s, appendto)
+                self.recursive_append_and_expand(s, appendto)
             else:
                 appendto.append(s)
 
     def recursive_append(self, slices, appendto):
-        """Walk nested lists but don't expand loops"""
+        """Walk nested lists but don't expand loops, the body of each Loop is
+        only appended once"""
         for s in slices:
-            if isinstance(s, Loop):
-                for _ in range(s.repeats):
-                    self.recursive_append(s, appendto)
-            elif isinstance(s, list):
+            if isinstance(s, list):
                 self.recursive_append(s, appendto)
             else:
                 appendto.append(s)
@@ -107,19 +169,13 @@ class CircuitCompiler(CircuitConstructor):
     def binarize_circuit(self, bypass=False):
         """Generate binary representation of all PulseData objects.
         Used primarily"""
-        if not self.compiled:
-            self.construct_circuit(
-                self.file,
-                override_dict=self.override_dict,
-                pd_override_dict=self.pd_override_dict,
-            )
+        self.construct_if_needed()
         self.binary_data = defaultdict(list)
         circ_main = GateSlice(num_channels=self.channel_num)
         self.recursive_append_and_expand(self.slice_list, circ_main)
         self.apply_delays(self.delay_settings, circ_main=circ_main)
         for ch, pd_list in circ_main.channel_data.items():
-            for pd in pd_list:
-                self.binary_data[ch].append(pd.binarize(bypass=bypass))
+            self.binary_data[ch] = binarize_many(pd_list, bypass=bypass)
         return self.binary_data
 
     def apply_delays(self, delay_settings=None, circ_main=None):
@@ -139,14 +195,53 @@ class CircuitCompiler(CircuitConstructor):
 
     def streaming_data(self, channels=None):
         """Generate the binary data for direct streaming (bypass mode)"""
-        self.binarize_circuit(bypass=True)
+        return list(self.iter_streaming_data(channels))
+
+    def bypass_streams(self, slices, ch, streams, decoded_words):
+        """Binarize the data on channel ch in bypass mode without expanding
+        Loops. Words are appended to streams, which maps (channel, modulation
+        type) to a list of (duration, word) tuples, and the body of each Loop
+        is binarized once and appended as a Loop of the same form"""
+        for s in slices:
+            if isinstance(s, Loop):
+                inner_streams = defaultdict(list)
+                self.bypass_streams(s, ch, inner_streams, decoded_words)
+                for k, v in inner_streams.items():
+                    streams[k].append(Loop(v, repeats=s.repeats))
+            elif isinstance(s, list):
+                self.bypass_streams(s, ch, streams, decoded_words)
+            else:
+                for pd in s.channel_data[ch]:
+                    for word in pd.binarize(bypass=True):
+                        if word not in decoded_words:
+                            decoded_words[word] = decode_word(word)
+                        chan, mod_type, dur = decoded_words[word]
+                        streams[chan, mod_type].append((dur, word))
+
+    def iter_streaming_data(self, channels=None):
+        """Yield the binary data for direct streaming (bypass mode) in the same
+        order as streaming_data. Each Loop body is binarized once and replayed
+        as the words are consumed, so memory use doesn't grow with the number
+        of loop iterations"""
+        self.construct_if_needed()
+        self.apply_delays(self.delay_settings)
         if channels is None:
             channels = list(range(self.channel_num))
-        bytelist = []
+        # Maps (channel, modulation type) -> list of streams, one per channel
+        # in channels, which are replayed back to back
+        streams = defaultdict(list)
+        decoded_words = dict()
         for ch in channels:
-            bytelist.extend(self.binary_data[ch])
-        sorted_bytelist = timesort_bytelist(flatten(bytelist))
-        return sorted_bytelist
+            channel_streams = defaultdict(list)
+            self.bypass_streams(self.slice_list, ch, channel_streams, decoded_words)
+            for k, v in channel_streams.items():
+                streams[k].append(v)
+        return iterate_timesorted_streams(streams)
+
+    def write_streaming_data(self, sink, channels=None):
+        """Stream the output of iter_streaming_data to a file-like object or
+        socket. Returns the number of bytes written"""
+        return write_words(sink, self.iter_streaming_data(channels))
 
     def walk_slice(self, slice_obj, gate_hashes, reps=1, addr_offset=0):
         """Recursively walk through a list of slice objects, including Loops,
@@ -211,26 +306,45 @@ class CircuitCompiler(CircuitConstructor):
         sequenced is captured by walk_slice.
         """
         if isinstance(slice_obj, GateSlice):
-            for ch, gate_pd_list in slice_obj.channel_data.items():
-                # We've arrived at a GateSlice (which is type defaultdict(list))
-                # Each key is a channel, and each list contains the binarized
-                # pulse data associated with the "gate" to be run on each
-                # channel for this slice. Hashes of each gate are calculated
-                # and used to give the gates a unique fingerprint, then the
-                # gate data is stored in self.unique_gates, the number of calls
-                # to the gate is tracked in self.gate_hash_recurrence and
-                # the sequence of gates is tracked as a list of gate hashes
-                # which are later sorted and given specific addresses in the
-                # gate sequencer LUTs.
-                new_key = hash(tuple(gate_pd_list))
-                # Taking the hash of a tuple adds a factor of 2 speedup for the
-                # whole compilation. However, this leads to a small (~1/3e11)
-                # chance of a hash collision. The setdefault method in
-                # conjunction with the assertion gives comparable performance
-                # but with hash collision detection. If a hash collision occurs,
-                # the hash() call in new_key can be removed.
-                gate_pd_ref = self.unique_gates[ch].setdefault(new_key, gate_pd_list)
-                assert gate_pd_ref == gate_pd_list
+            # GateSlices are shared between occurrences of the same gate (see
+            # CircuitConstructorVisitor), so the gate keys of each slice are
+            # computed once and then looked up by the id of the slice.
+            gate_keys = self.slice_gate_keys.get(id(slice_obj))
+            if gate_keys is None:
+                gate_keys = []
+                for ch, gate_pd_list in slice_obj.channel_data.items():
+                    # We've arrived at a GateSlice (which is type
+                    # defaultdict(list)). Each key is a channel, and each list
+                    # contains the binarized pulse data associated with the
+                    # "gate" to be run on each channel for this slice. Hashes of
+                    # each gate are calculated and used to give the gates a
+                    # unique fingerprint, then the gate data is stored in
+                    # self.unique_gates.
+                    # Each PulseData caches a 128 bit digest of its parameters,
+                    # so the key of a gate is a digest of those digests. The
+                    # digest is wide enough that collisions can be ignored, so
+                    # gates are identified without comparing their PulseData
+                    # field by field.
+                    new_key = gate_digest(gate_pd_list)
+                    unique_gates = self.unique_gates[ch]
+                    if new_key not in unique_gates:
+                        unique_gates[new_key] = gate_pd_list
+                        # Each unique gate needs its own gate id, so fail
+                        # before anything is binarized if they can't be
+                        # addressed
+                        if len(unique_gates) > 1 << GLUTW:
+                            raise CircuitCompilerException(
+                                f"Too many unique gates on channel {ch}: more "
+                                f"than {1 << GLUTW} gate ids ({GLUTW} bits) "
+                                f"are needed"
+                            )
+                    gate_keys.append((ch, new_key))
+                self.slice_gate_keys[id(slice_obj)] = gate_keys
+            for ch, new_key in gate_keys:
+                # The number of calls to the gate is tracked in
+                # self.gate_hash_recurrence and the sequence of gates is
+                # tracked as a list of gate hashes which are later sorted and
+                # given specific addresses in the gate sequencer LUTs.
                 self.gate_hash_recurrence[ch][new_key] += reps
                 # gate_hashes stores a list of sequential hashes that need to be
                 # run for a gate sequence. However, because walk_slice might be
@@ -238,6 +352,8 @@ class CircuitCompiler(CircuitConstructor):
                 # tracked separately so the mapping of keys for a branch can be
                 # handled correctly
                 gate_hashes[ch].append((addr_offset, new_key))
+                if slice_obj.shot_boundary:
+                    self.shot_boundary_hashes[ch].add(new_key)
         elif isinstance(slice_obj, Loop):
             # Loops contain data that is highly redundant, and only needs to be
             # walked once to acquire unique gate information.
@@ -250,8 +366,10 @@ class CircuitCompiler(CircuitConstructor):
                     addr_offset=addr_offset,
                 )
             for k, v in inner_gate_hashes.items():
-                # only repeat the gate ids after walking a Loop
-                gate_hashes[k].extend(v * slice_obj.repeats)
+                # The repetition is kept as a Loop of hashes rather than
+                # unrolled, so memory scales with the size of the circuit
+                # text and not with the number of executed gates.
+                gate_hashes[k].append(Loop(v, repeats=slice_obj.repeats))
         elif isinstance(slice_obj, Branch):
             # Branches require a different return type to indicate
             # that extra programming steps must be performed.
@@ -303,13 +421,19 @@ class CircuitCompiler(CircuitConstructor):
         it contains a sequence of hashes to be run. walk_slice also sets data
         in self.gate_hash_recurrence to check for frequency of calls to a
         particular gate."""
-        branch_index_counter = defaultdict(int)
-        self.branches = defaultdict(lambda: defaultdict(lambda: defaultdict(list)))
+        self.branches = defaultdict(dict)
+        self.branch_gate_ids = defaultdict(dict)
+        self.branch_index_states = defaultdict(dict)
         self.unique_gates = defaultdict(dict)
         self.gate_hash_recurrence = defaultdict(lambda: defaultdict(int))
         self.gate_sequence_hashes = defaultdict(list)
         self.gate_sequence_ids = defaultdict(list)
+        self.shot_boundary_hashes = defaultdict(set)
+        # Maps id(GateSlice) -> [(channel, gate hash), ...] while walking the
+        # slices, which are all kept alive by self.slice_list in the meantime
+        self.slice_gate_keys = dict()
         self.walk_slice(self.slice_list, gate_hashes=self.gate_sequence_hashes)
+        self.slice_gate_keys = dict()
         self.ordered_gate_identifiers = dict()
         for ch in range(self.channel_num):
             self.ordered_gate_identifiers[ch] = dict()
@@ -354,107 +478,529 @@ class CircuitCompiler(CircuitConstructor):
             #
             #                   (0,1,2), (3,4,5), (6,7,8)
             #
-            # If a branch has redundancies that match all possible cases, then
-            # a linear sequence won't be necessary. In other words, the first
-            # sequence could have a form of (0,1,0), in which case the second
-            # sequence above could start from a lower index -> (2,3,4) or a
-            # sequence could be reused all together. However, this optimization
-            # has not yet been worked in.
-            self.gate_sequence_ids[ch] = []
-            for hash_or_branch in self.gate_sequence_hashes[ch]:
-                # The list of sequential hashes has a special exception where
-                # the return type is a branch, because a branch contains a
-                # collection of hashes that need to be equivalent across all
-                # possible ancilla states.
-                if isinstance(hash_or_branch, Branch):
-                    branch_gate_sequence_ids = []
-                    for case_index, case_gate_hashes in enumerate(hash_or_branch):
-                        for sub_gate_id, (offset_addr, gate_hash) in enumerate(
-                            case_gate_hashes
-                        ):
-                            if sub_gate_id == 0:
-                                initlen = sum(
-                                    len(self.branches[ch][branch_idx][offset_addr])
-                                    for branch_idx in range(branch_index_counter[ch])
-                                )
-                            if case_index == 0:
-                                branch_gate_sequence_ids.append(
-                                    (sub_gate_id + initlen)
-                                    | (1 << ANCILLA_COMPILER_TAG_BIT)
-                                )
-                            self.branches[ch][branch_index_counter[ch]][
-                                offset_addr
-                            ].append(inverted_ordered_gids[gate_hash])
-                    self.gate_sequence_ids[ch].extend(branch_gate_sequence_ids)
-                    branch_index_counter[ch] += 1
-                else:
-                    self.gate_sequence_ids[ch].append(
-                        inverted_ordered_gids[hash_or_branch[1]]
+            # However, a branch with the same gates for every case as a
+            # previous branch reuses the previous range, and the range for a
+            # new branch can overlap the ranges of previous branches listing
+            # the same ancilla states wherever the overlapping GLUT addresses
+            # are unused or already map to the same gates (see
+            # allocate_branch_range). So if the second branch above is a
+            # repeat of the first, the sequences become
+            #
+            #                   (0,1,2), (0,1,2), (3,4,5)
+            #
+            self.gate_sequence_ids[ch] = self.map_gate_sequence(
+                ch, self.gate_sequence_hashes[ch], inverted_ordered_gids
+            )
+            self.shot_boundary_gids[ch] = {
+                inverted_ordered_gids[h] for h in self.shot_boundary_hashes[ch]
+            }
+        self.build_shot_indices()
+
+    def build_shot_indices(self):
+        """Index the start of each shot in the gate sequence of each channel
+        for resuming a sequence with partial_sequence_bytecode"""
+        self.partial_GSEQ_bin_cache = dict()
+        self.shot_indices = {
+            ch: ShotIndex(self.gate_sequence_ids[ch], self.shot_boundary_gids[ch])
+            for ch in range(self.channel_num)
+        }
+
+    def map_gate_sequence(self, ch, hash_sequence, inverted_ordered_gids):
+        """Convert a sequence of gate hashes from walk_slice to the numeric gate
+        ids used for sequencing. Loops are preserved as Loop objects containing
+        the gate ids of a single iteration, and are only expanded when the gate
+        sequence is packed by gate_sequence_bytes."""
+        gate_sequence_ids = []
+        for hash_or_branch in hash_sequence:
+            # The list of sequential hashes has a special exception where
+            # the return type is a branch, because a branch contains a
+            # collection of hashes that need to be equivalent across all
+            # possible ancilla states.
+            if isinstance(hash_or_branch, Loop):
+                gate_sequence_ids.append(
+                    Loop(
+                        self.map_gate_sequence(
+                            ch, hash_or_branch, inverted_ordered_gids
+                        ),
+                        repeats=hash_or_branch.repeats,
                     )
+                )
+            elif isinstance(hash_or_branch, Branch):
+                # Map the address offset of each case to its gate ids
+                cases = dict()
+                for case_gate_hashes in hash_or_branch:
+                    # Case sequences are stored in the GLUT, so any loops
+                    # within a case must be unrolled
+                    for offset_addr, gate_hash in iterate_gate_sequence(
+                        case_gate_hashes
+                    ):
+                        cases.setdefault(offset_addr, []).append(
+                            inverted_ordered_gids[gate_hash]
+                        )
+                start_index = self.allocate_branch_range(ch, cases)
+                gate_sequence_ids.extend(
+                    (start_index + sub_gate_id) | (1 << ANCILLA_COMPILER_TAG_BIT)
+                    for sub_gate_id in range(max(map(len, cases.values()), default=0))
+                )
+            else:
+                gate_sequence_ids.append(inverted_ordered_gids[hash_or_branch[1]])
+        return gate_sequence_ids
+
+    def allocate_branch_range(self, ch, cases):
+        """Choose the starting index of the gate ids streamed for a branch,
+        where cases maps the address offset of each case to its gate ids. The
+        GLUT address TAG | offset | (start index + n) holds the nth gate of a
+        case, and self.branch_gate_ids tracks the gate id assigned to each of
+        these addresses (without the TAG bit) for programming the GLUT.
+
+        A branch with the same cases as a previous branch reuses its start
+        index. Otherwise, the lowest start index is used for which every
+        address the branch needs is either unused or already holds the same
+        gate id. Cases shorter than the longest case reserve their remaining
+        addresses, since the same number of ids is streamed for every case.
+
+        The readout can give an ancilla state that a branch doesn't list, so
+        the streamed ids of a branch are only shared with branches that list
+        the same states. self.branch_index_states tracks the offsets of the
+        states listed by the branches streaming each index, and branches with
+        different states use separate indices."""
+        key = tuple(sorted((offset, tuple(gids)) for offset, gids in cases.items()))
+        if key in self.branches[ch]:
+            return self.branches[ch][key]
+        length = max(map(len, cases.values()), default=0)
+        states = frozenset(cases)
+        index_states = self.branch_index_states[ch]
+        # Unprogrammed addresses that are streamed for shorter cases
+        reserved = -1
+        entries = [
+            (offset + n, gids[n] if n < len(gids) else reserved)
+            for offset, gids in cases.items()
+            for n in range(length)
+        ]
+        assigned = self.branch_gate_ids[ch]
+        for start_index in range((1 << ANCILLA_STATE_LSB) - length + 1):
+            if all(
+                index_states.get(start_index + n, states) == states
+                for n in range(length)
+            ) and all(
+                assigned.get(start_index + addr, gid) == gid for addr, gid in entries
+            ):
+                break
+        else:
+            raise CircuitCompilerException(
+                f"Not enough GLUT addresses for branch on channel {ch}: "
+                f"{len(self.branches[ch])} branches are already assigned and "
+                f"{length} gates can't be placed within {1 << ANCILLA_STATE_LSB} "
+                f"addresses"
+            )
+        for addr, gid in entries:
+            assigned[start_index + addr] = gid
+        for n in range(length):
+            index_states[start_index + n] = states
+        self.branches[ch][key] = start_index
+        return start_index
 
     def generate_lookup_tables(self):
         """Construct the LUT data in an intermediate representation. The outputs
-        are in a human readable format with the exception of the raw pulse data"""
-        self.PLUT_data = defaultdict(list)
+        are in a human readable format with the exception of the raw pulse data.
+        Address assignment is handled by a LUTAllocator for each channel, and
+        PLUT_data, MMAP_data and GLUT_data reference the allocator's tables.
+
+        PLUT_data[ch] is a dict {pulse word: PLUT address}, not a list of
+        pulse words indexed by address as in earlier versions, since the
+        addresses aren't contiguous when allocating against a LUT image. The
+        address of a word is PLUT_data[ch][word] rather than
+        PLUT_data[ch].index(word), and the words in address order are
+        sorted(PLUT_data[ch], key=PLUT_data[ch].get).
+
+        If previous_lut_image is set, addresses are assigned to reuse as much
+        of the previously programmed LUTs as possible. If share_mmap is set,
+        gates with overlapping PLUT address lists share MMAP entries. A
+        CircuitCompilerException is raised as soon as a LUT overflows."""
+        self.lut_allocators = dict()
+        self.PLUT_data = defaultdict(dict)
         self.MMAP_data = defaultdict(dict)
         self.GLUT_data = defaultdict(dict)
         for ch in range(self.channel_num):
-            gid = 0
-            addr = 0
-            for k, v in sorted(self.ordered_gate_identifiers[ch].items()):
-                gate_start_addr = addr
-                for pd in self.unique_gates[ch][v]:
-                    pd_bin = pd.binarize()
-                    for pdb in pd_bin:
-                        if pdb not in self.PLUT_data[ch]:
-                            self.PLUT_data[ch].append(pdb)
-                        self.MMAP_data[ch][addr] = self.PLUT_data[ch].index(pdb)
-                        addr += 1
-                gate_end_addr = addr - 1
-                self.GLUT_data[ch][gid] = (gate_start_addr, gate_end_addr)
-                gid += 1
+            allocator = LUTAllocator(
+                ch,
+                image=(
+                    None
+                    if self.previous_lut_image is None
+                    else self.previous_lut_image.get(ch)
+                ),
+                # The MMAP can only be checked once it's shared
+                check_mmap=not self.share_mmap,
+            )
+            gates = sorted(self.ordered_gate_identifiers[ch].items())
+            if self.previous_lut_image is not None:
+                # All the words are retained before any are placed, so a new
+                # word can't take the image address of a word added later
+                allocator.retain_words(
+                    pdb
+                    for _, gate_hash in gates
+                    for pd in self.unique_gates[ch][gate_hash]
+                    for pdb in pd.binarize()
+                )
+            for gid, gate_hash in gates:
+                allocator.add_gate(
+                    gid,
+                    (
+                        pdb
+                        for pd in self.unique_gates[ch][gate_hash]
+                        for pdb in pd.binarize()
+                    ),
+                )
+            if self.share_mmap:
+                allocator.share_mmap()
+            self.lut_allocators[ch] = allocator
+            self.PLUT_data[ch] = allocator.PLUT
+            self.MMAP_data[ch] = allocator.MMAP
+            self.GLUT_data[ch] = allocator.GLUT
         for ch in range(self.channel_num):
-            startind = 0
-            for branch in self.branches[ch].values():
-                maxlen = 0
-                for state, glist in branch.items():
-                    maxlen = max(len(glist), maxlen)
-                    gind = 0
-                    for subgid in glist:
-                        self.GLUT_data[ch][
-                            (startind + state + gind) | (1 << ANCILLA_COMPILER_TAG_BIT)
-                        ] = self.GLUT_data[ch][subgid]
-                        gind += 1
-                startind += maxlen
-
-    def generate_programming_data(self):
-        """Convert the LUT programming IR representations to bytecode"""
+            for addr, subgid in sorted(self.branch_gate_ids[ch].items()):
+                if subgid >= 0:
+                    self.lut_allocators[ch].alias_gate(
+                        addr | (1 << ANCILLA_COMPILER_TAG_BIT), subgid
+                    )
+
+    def programming_tables(self, ch):
+        """Return the (PLUT, MMAP, GLUT) entries that need to be programmed
+        for a channel. These are the full LUTs, unless previous_lut_image was
+        set, in which case only entries that differ from the image are
+        included"""
+        allocator = self.lut_allocators.get(ch)
+        if allocator is None:
+            return self.PLUT_data[ch], self.MMAP_data[ch], self.GLUT_data[ch]
+        return allocator.delta()
+
+    def lut_image(self):
+        """Return the contents of the LUTs of each channel after the output of
+        the last compile is programmed, in the form accepted by
+        previous_lut_image. This assumes the data for every channel was
+        uploaded; see save_lut_image and load_lut_image for storing it"""
+        if not self.compiled:
+            self.compile()
+        return {
+            ch: merge_lut_image(
+                (
+                    None
+                    if self.previous_lut_image is None
+                    else self.previous_lut_image.get(ch)
+                ),
+                *self.programming_tables(ch),
+            )
+            for ch in range(self.channel_num)
+        }
+
+    def generate_programming_data(self, pack_sequence=True):
+        """Convert the LUT programming IR representations to bytecode. If
+        pack_sequence is False, GSEQ_bin is left empty and the gate sequence
+        words are only generated when they're streamed out, or packed by
+        sequence_bin when bytecode() or a lookup in GSEQ_bin needs them"""
         self.PLUT_bin = defaultdict(list)
         self.MMAP_bin = defaultdict(list)
         self.GLUT_bin = defaultdict(list)
-        self.GSEQ_bin = defaultdict(list)
+        self.GSEQ_bin = SequenceBins(self.sequence_bin)
         for ch in range(self.channel_num):
-            self.PLUT_bin[ch] = program_PLUT(
-                {v: i for i, v in enumerate(self.PLUT_data[ch])}, ch
-            )
-            self.MMAP_bin[ch] = program_SLUT(self.MMAP_data[ch], ch)
-            self.GLUT_bin[ch] = program_GLUT(self.GLUT_data[ch], ch)
-            self.GSEQ_bin[ch] = gate_sequence_bytes(self.gate_sequence_ids[ch], ch)
+            PLUT, MMAP, GLUT = self.programming_tables(ch)
+            self.PLUT_bin[ch] = program_PLUT(PLUT, ch)
+            self.MMAP_bin[ch] = program_SLUT(MMAP, ch)
+            self.GLUT_bin[ch] = program_GLUT(GLUT, ch)
+        if pack_sequence:
+            with self.phase("pack_sequence"):
+                for ch in range(self.channel_num):
+                    self.GSEQ_bin[ch] = gate_sequence_bytes(
+                        self.gate_sequence_ids[ch], ch
+                    )
 
-    def compile(self):
-        """Compile the circuit, starting from parsing the jaqal file"""
-        if self.file is None and self.code_literal is None:
-            raise CircuitCompilerException("Need an input file!")
-        self.construct_circuit(
-            self.file,
+    def sequence_bin(self, ch):
+        """Return the gate sequence words of channel ch, packing and storing
+        them in GSEQ_bin if the sequence wasn't packed by compile(). The
+        packing is timed as part of the pack_sequence phase"""
+        if ch not in self.GSEQ_bin:
+            with self.phase("pack_sequence"):
+                self.GSEQ_bin[ch] = gate_sequence_bytes(self.gate_sequence_ids[ch], ch)
+        return self.GSEQ_bin[ch]
+
+    def iter_sequence_bin(self, ch):
+        """Yield the gate sequence words of channel ch from GSEQ_bin, or pack
+        them a chunk at a time as they're consumed if the sequence wasn't
+        packed. The packing of each chunk is timed as part of the
+        pack_sequence phase"""
+        if ch in self.GSEQ_bin:
+            yield from self.GSEQ_bin[ch]
+            return
+        word_lists = iterate_gate_sequence_word_lists(self.gate_sequence_ids[ch], ch)
+        while True:
+            with self.phase("pack_sequence"):
+                words = next(word_lists, None)
+            if words is None:
+                return
+            yield from words
+
+    def cache_key(self):
+        """Key for the compiled output in the compile cache"""
+        if self.file is None:
+            jaqal_source = self.code_literal
+        else:
+            jaqal_source = Path(self.file).read_bytes()
+        return compile_cache_key(
+            jaqal_source,
+            self.pulse_definition,
             override_dict=self.override_dict,
             pd_override_dict=self.pd_override_dict,
+            global_delay=self.global_delay,
+            num_channels=self.channel_num,
+            options={"share_mmap": self.share_mmap},
         )
-        self.apply_delays(self.delay_settings)
-        self.extract_gates()
-        self.generate_lookup_tables()
-        self.generate_programming_data()
+
+    def cached_compile_data(self):
+        """The compiled output stored in the compile cache"""
+        data = {
+            name: {ch: getattr(self, name)[ch] for ch in range(self.channel_num)}
+            for name in (
+                "gate_sequence_ids",
+                "PLUT_data",
+                "MMAP_data",
+                "GLUT_data",
+                "PLUT_bin",
+                "MMAP_bin",
+                "GLUT_bin",
+            )
+        }
+        if self.GSEQ_bin:
+            data["GSEQ_bin"] = dict(self.GSEQ_bin)
+        data["shot_boundary_gids"] = dict(self.shot_boundary_gids)
+        data["ordered_gate_identifiers"] = dict(self.ordered_gate_identifiers)
+        return data
+
+    def load_cached_compile_data(self, data, pack_sequence=True):
+        """Restore the compiled output from a compile cache entry. The
+        intermediate representation isn't cached, so whatever was left by a
+        previous compile is cleared rather than describing another circuit.
+        Only the gate digest of each gate id (ordered_gate_identifiers) is
+        restored"""
+        self.lut_allocators = dict()
+        self.slice_list = []
+        self.unique_gates = defaultdict(dict)
+        self.gate_hash_recurrence = defaultdict(lambda: defaultdict(int))
+        self.gate_sequence_hashes = defaultdict(list)
+        self.ordered_gate_identifiers = dict(data.get("ordered_gate_identifiers", {}))
+        self.branches = defaultdict(dict)
+        self.branch_gate_ids = defaultdict(dict)
+        self.branch_index_states = defaultdict(dict)
+        for name, default in (
+            ("gate_sequence_ids", list),
+            ("PLUT_data", dict),
+            ("MMAP_data", dict),
+            ("GLUT_data", dict),
+            ("PLUT_bin", list),
+            ("MMAP_bin", list),
+            ("GLUT_bin", list),
+            ("shot_boundary_gids", set),
+        ):
+            setattr(self, name, defaultdict(default, data.get(name, {})))
+        self.GSEQ_bin = SequenceBins(self.sequence_bin, data.get("GSEQ_bin", {}))
+        self.build_shot_indices()
+        if pack_sequence:
+            for ch in range(self.channel_num):
+                self.sequence_bin(ch)
+
+    def construct_if_needed(self):
+        """Construct the GateSlice IR if it isn't available, which is the case
+        before compiling and after a compile loaded from the compile cache"""
+        if not self.compiled or (self.cache_hit and not self.slice_list):
+            self.construct_circuit(
+                self.file,
+                override_dict=self.override_dict,
+                pd_override_dict=self.pd_override_dict,
+                gate_cache=self.gate_cache,
+            )
+
+    def compile(self, pack_sequence=True):
+        """Compile the circuit, starting from parsing the jaqal file. See
+        generate_programming_data for pack_sequence.
+
+        If the compiler has a compile_cache and the inputs match a previous
+        compilation, the LUTs, gate sequence ids and bytecode are loaded
+        from the cache and the intermediate representation (slice_list,
+        unique_gates, etc...) isn't generated, so it's left empty and
+        cache_hit is set. The cache isn't used when compiling against a
+        previous_lut_image"""
+        if self.file is None and self.code_literal is None:
+            raise CircuitCompilerException("Need an input file!")
+        cache_key = None
+        self.cache_hit = False
+        if self.stats is not None:
+            counts = self.event_counts()
+            self.stats.start_tracing()
+        try:
+            if self.compile_cache is not None and self.previous_lut_image is None:
+                with self.phase("compile_cache"):
+                    cache_key = self.cache_key()
+                    data = self.compile_cache.get(cache_key)
+                    if data is not None:
+                        self.load_cached_compile_data(data, pack_sequence)
+                        self.cache_hit = True
+            if not self.cache_hit:
+                self.construct_circuit(
+                    self.file,
+                    override_dict=self.override_dict,
+                    pd_override_dict=self.pd_override_dict,
+                    gate_cache=self.gate_cache,
+                )
+                with self.phase("apply_delays"):
+                    self.apply_delays(self.delay_settings)
+                with self.phase("extract_gates"):
+                    self.extract_gates()
+                with self.phase("generate_lookup_tables"):
+                    self.generate_lookup_tables()
+                with self.phase("generate_programming_data"):
+                    self.generate_programming_data(pack_sequence=pack_sequence)
+        finally:
+            if self.stats is not None:
+                self.stats.stop_tracing()
         self.compiled = True
+        self.words_counted = False
+        if self.stats is not None:
+            if cache_key is not None:
+                self.stats.count(
+                    "compile_cache_hits" if self.cache_hit else "compile_cache_misses"
+                )
+            self.stats.count_changes(counts, self.event_counts())
+            self.count_compile_output()
+            if self.stats.memory:
+                self.stats.record_sizes(self, self.profiled_attributes)
+        if cache_key is not None and not self.cache_hit:
+            self.compile_cache.put(cache_key, self.cached_compile_data())
+
+    # Attributes whose sizes are recorded when profiling memory use
+    profiled_attributes = (
+        "slice_list",
+        "unique_gates",
+        "gate_sequence_hashes",
+        "gate_sequence_ids",
+        "PLUT_data",
+        "MMAP_data",
+        "GLUT_data",
+        "PLUT_bin",
+        "MMAP_bin",
+        "GLUT_bin",
+        "GSEQ_bin",
+        "final_byte_dict",
+    )
+
+    @staticmethod
+    def event_counts():
+        """Snapshot of the process wide counts recorded by CompileStats"""
+        counts = dict(event_counters)
+        counts["binarize_cache_hits"] = binarization_cache.hits
+        counts["binarize_cache_misses"] = binarization_cache.misses
+        counts["binarize_cache_evictions"] = binarization_cache.evictions
+        return counts
+
+    def count_compile_output(self):
+        """Record the size of the compiled output in self.stats"""
+        stats = self.stats
+        for ch in range(self.channel_num):
+            if not self.cache_hit:
+                stats.count("unique_gates", len(self.unique_gates[ch]))
+            stats.count("PLUT_entries", len(self.PLUT_data[ch]))
+            stats.count("MMAP_entries", len(self.MMAP_data[ch]))
+            stats.count("GLUT_entries", len(self.GLUT_data[ch]))
+            stats.count(
+                "programming_words",
+                len(self.PLUT_bin[ch])
+                + len(self.MMAP_bin[ch])
+                + len(self.GLUT_bin[ch]),
+            )
+            # GSEQ_bin is empty if the sequence is packed as it's streamed
+            stats.count("sequence_words", len(self.GSEQ_bin.get(ch, ())))
+
+    def lut_report(self, top=10):
+        """Summarize the LUT usage of each channel as a dict of the form
+
+            {channel: {"PLUT": (entries, capacity),
+                       "MMAP": (entries, capacity),
+                       "GLUT": (entries, capacity),
+                       "gate_words": pulse words referenced by all gates,
+                       "dedupe_ratio": gate_words / PLUT entries,
+                       "top_gates": [(gate id, words, calls), ...],
+                       "GSEQ_gates": number of gates in the gate sequence,
+                       "GSEQ_words": number of gate sequence words}}
+
+        where top_gates lists the top gates by number of pulse words. The
+        number of calls to a gate is None when the compile was loaded from
+        the compile cache. The gate sequence is measured from its gate ids
+        without expanding its loops or packing it, so GSEQ_bin isn't used"""
+        if not self.compiled:
+            self.compile(pack_sequence=False)
+        report = dict()
+        for ch in range(self.channel_num):
+            calls = dict()
+            if ch in self.ordered_gate_identifiers:
+                recurrence = self.gate_hash_recurrence[ch]
+                calls = {
+                    gid: recurrence.get(gate_hash)
+                    for gid, gate_hash in self.ordered_gate_identifiers[ch].items()
+                }
+            # Branch entries alias the MMAP range of a gate, so only gate ids
+            # without the ancilla tag are counted
+            gate_words = {
+                gid: end - start + 1
+                for gid, (start, end) in self.GLUT_data[ch].items()
+                if gid < 1 << ANCILLA_COMPILER_TAG_BIT
+            }
+            nwords = sum(gate_words.values())
+            nplut = len(self.PLUT_data[ch])
+            report[ch] = {
+                "PLUT": (nplut, 1 << PLUTW),
+                "MMAP": (len(self.MMAP_data[ch]), 1 << SLUTW),
+                "GLUT": (len(self.GLUT_data[ch]), 1 << GPRGW),
+                "gate_words": nwords,
+                "dedupe_ratio": nwords / nplut if nplut else 1.0,
+                "top_gates": [
+                    (gid, words, calls.get(gid))
+                    for gid, words in sorted(
+                        gate_words.items(), key=lambda x: (-x[1], x[0])
+                    )[:top]
+                ],
+                "GSEQ_gates": gate_sequence_length(self.gate_sequence_ids[ch]),
+                "GSEQ_words": gate_sequence_word_count(self.gate_sequence_ids[ch]),
+            }
+        return report
+
+    def compile_sweep(self, override_dicts, channel_mask=None, delta=False):
+        """Compile the circuit once for each entry of override_dicts, which
+        are let overrides in the same form as override_dict, and return a list
+        of (programming_data, sequence_data) tuples as given by bytecode().
+
+        The jaqal file is parsed and macro expanded once, and the pulse
+        definition is imported once for all points. Evaluated gate data is
+        shared between points, so gates whose arguments don't depend on the
+        overridden values are evaluated once, and their PulseData objects are
+        reused and hit the binarization cache. After the sweep, the compiler
+        holds the state of the last point.
+
+        If delta is True, each point is compiled against the LUT image of the
+        previous point (starting from previous_lut_image), so the programming
+        data only contains the LUT entries that change between points."""
+        if self.file is None and self.code_literal is None:
+            raise CircuitCompilerException("Need an input file!")
+        results = []
+        self.gate_cache = dict()
+        try:
+            for override_dict in override_dicts:
+                self.override_dict = override_dict
+                self.compiled = False
+                self.compile()
+                results.append(self.bytecode(channel_mask))
+                if delta:
+                    self.previous_lut_image = self.lut_image()
+        finally:
+            self.gate_cache = None
+        return results
 
     def last_packet_pulse_data(self, ch):
         return [PulseData(ch, 3e-7, waittrig=False), PulseData(ch, 3e-7, waittrig=True)]
@@ -510,7 +1056,7 @@ class CircuitCompiler(CircuitConstructor):
                     board_programming_data.extend(bindata[0])
                 for bindata in zip_longest(
                     *list(
-                        self.GSEQ_bin[ch]
+                        self.sequence_bin(ch)
                         for ch in range(bbind, min(bbind + 8, self.channel_num))
                         if (1 << ch) & channel_mask
                     )
@@ -530,7 +1076,7 @@ class CircuitCompiler(CircuitConstructor):
                 board_programming_data.extend(bindata[0])
             for bindata in zip_longest(
                 *list(
-                    self.GSEQ_bin[ch]
+                    self.sequence_bin(ch)
                     for ch in range(self.channel_num)
                     if (1 << ch) & channel_mask
                 )
@@ -539,9 +1085,140 @@ class CircuitCompiler(CircuitConstructor):
                     board_sequence_data.extend(bindata)
             self.programming_data.append(board_programming_data)
             self.sequence_data.append(board_sequence_data)
+        self.count_words_emitted(
+            sum(map(len, self.programming_data)) + sum(map(len, self.sequence_data))
+        )
         return self.programming_data, self.sequence_data
 
+    def count_words_emitted(self, nwords):
+        """Record the number of words in the output in self.stats, only for
+        the first output generated after each compile"""
+        if self.stats is not None and not self.words_counted:
+            self.stats.count("words_emitted", nwords)
+            self.words_counted = True
+
+    def board_channels(self, bbind, channel_mask):
+        """Channels of the board starting at channel bbind that pass channel_mask"""
+        return [
+            ch
+            for ch in range(bbind, min(bbind + 8, self.channel_num))
+            if (1 << ch) & channel_mask
+        ]
+
+    def iter_programming_words(self, channel_mask=None):
+        """Yield the LUT programming words for all boards in the same order as
+        the programming data returned by bytecode()"""
+        if not self.compiled:
+            self.compile(pack_sequence=False)
+        if channel_mask is None:
+            channel_mask = (1 << self.channel_num) - 1
+        for bbind in range(0, self.channel_num, 8):
+            for ch in self.board_channels(bbind, channel_mask):
+                yield from self.GLUT_bin[ch]
+                yield from self.MMAP_bin[ch]
+                yield from self.PLUT_bin[ch]
+
+    def iter_sequence_words(self, channel_mask=None):
+        """Yield the gate sequence words for all boards in the same order as the
+        sequence data returned by bytecode(). Words are packed as they're
+        consumed unless the sequence was already packed during compilation"""
+        if not self.compiled:
+            self.compile(pack_sequence=False)
+        if channel_mask is None:
+            channel_mask = (1 << self.channel_num) - 1
+        for bbind in range(0, self.channel_num, 8):
+            channel_words = [
+                self.iter_sequence_bin(ch)
+                for ch in self.board_channels(bbind, channel_mask)
+            ]
+            for bindata in zip_longest(*channel_words):
+                for word in bindata:
+                    if word is not None:
+                        yield word
+
+    def iter_bytecode(self, channel_mask=None):
+        """Yield all programming words followed by all sequence words. Joining
+        the output is equivalent to concatenating the nested lists returned by
+        bytecode(), but only the words being consumed are held in memory"""
+        if self.stats is None:
+            yield from self.iter_programming_words(channel_mask)
+            yield from self.iter_sequence_words(channel_mask)
+            return
+        nwords = 0
+        try:
+            for words in (
+                self.iter_programming_words(channel_mask),
+                self.iter_sequence_words(channel_mask),
+            ):
+                for word in words:
+                    nwords += 1
+                    yield word
+        finally:
+            self.count_words_emitted(nwords)
+
+    def write_bytecode(self, sink, channel_mask=None):
+        """Stream the output of iter_bytecode to a file-like object or socket,
+        using scatter-gather writes where possible. Returns the number of bytes
+        written"""
+        return write_words(sink, self.iter_bytecode(channel_mask))
+
+    def bytecode_buffers(self, channel_mask=None):
+        """Return the bytecode in the same two blocks as bytecode(), but with
+        each board's data packed into one contiguous buffer rather than a list
+        of 32 byte words:
+
+               [board0 memoryview, board1 memoryview, ...]
+
+        The words are written in place into a preallocated WordBuffer per
+        board, so the views can be handed to a driver (or wrapped with
+        numpy.frombuffer) without copying. The programming buffers are
+        packed from the LUTs and the sequence buffers are packed from the
+        gate sequence ids, so the bin lists built by compile() aren't used"""
+        if not self.compiled:
+            self.compile(pack_sequence=False)
+        if channel_mask is None:
+            channel_mask = (1 << self.channel_num) - 1
+        programming_buffers = list()
+        sequence_buffers = list()
+        for bbind in range(0, self.channel_num, 8):
+            channels = self.board_channels(bbind, channel_mask)
+            tables = {ch: self.programming_tables(ch) for ch in channels}
+            board_programming_data = WordBuffer(
+                sum(
+                    packed_word_count(len(GLUT), GLUT_BYTECNT)
+                    + packed_word_count(len(MMAP), SLUT_BYTECNT)
+                    + len(PLUT)
+                    for PLUT, MMAP, GLUT in tables.values()
+                )
+            )
+            for ch, (PLUT, MMAP, GLUT) in tables.items():
+                program_GLUT(GLUT, ch, out=board_programming_data)
+                program_SLUT(MMAP, ch, out=board_programming_data)
+                program_PLUT(PLUT, ch, out=board_programming_data)
+            # The sequence of each channel is packed on its own and the words
+            # of the channels are then interleaved into the board's buffer
+            board_sequence_data = WordBuffer()
+            with self.phase("pack_sequence"):
+                board_sequence_data.extend_interleaved(
+                    [
+                        gate_sequence_bytes(
+                            self.gate_sequence_ids[ch], ch, out=WordBuffer()
+                        ).as_array()
+                        for ch in channels
+                    ]
+                )
+            programming_buffers.append(board_programming_data.view())
+            sequence_buffers.append(board_sequence_data.view())
+        return programming_buffers, sequence_buffers
+
     def get_prepare_all_indices(self):
+        """Find the gate id of the initialize_gate_name (prepare_all) gate on
+        each channel. The gate ids are stored in self.prepare_all_gids and the
+        gate digests in self.prepare_all_hashes, and the GateSlice of the gate
+        is returned. See get_shot_start_gids for the gate ids that start each
+        shot, which are used to resume a gate sequence"""
+        if not self.compiled:
+            self.compile()
         self.prepare_all_hashes = dict()
         self.prepare_all_gids = dict()
         if not hasattr(self.pulse_definition, "gate_" + self.initialize_gate_name):
@@ -553,10 +1230,10 @@ class CircuitCompiler(CircuitConstructor):
         )
         gslice = populate_gate_slice(gate_data, self.channel_num)
         for ch, gsdata in gslice.channel_data.items():
-            prep_hash = hash(tuple(gsdata))
+            prep_hash = gate_digest(gsdata)
             self.prepare_all_hashes[ch] = prep_hash
             inverted_gid_hashes = {
-                v: k for k, v in self.ordered_gate_identifiers[ch].items()
+                v: k for k, v in self.ordered_gate_identifiers.get(ch, {}).items()
             }
             gid = inverted_gid_hashes.get(prep_hash, None)
             if gid is None:
@@ -566,15 +1243,36 @@ class CircuitCompiler(CircuitConstructor):
             self.prepare_all_gids[ch] = gid
         return gslice
 
+    def get_shot_start_gids(self):
+        """Return the gate ids that start a shot on each channel, as
+        {channel: set of gate ids}. These are the gate ids of the first gate
+        of each initialize_gate_name (prepare_all) call, which are found when
+        the gates are extracted"""
+        if not self.compiled:
+            self.compile()
+        return {ch: gids for ch, gids in self.shot_boundary_gids.items() if gids}
+
     def generate_gate_sequence_from_index(self, ind):
-        self.get_prepare_all_indices()
-        partial_gs_ids = dict()
-        partial_GSEQ_bin = dict()
-        for ch, gidlist in self.gate_sequence_ids.items():
-            partial_gs_ids[ch] = get_tail_from_index(
-                self.prepare_all_gids[ch], gidlist, ind
-            )
-            partial_GSEQ_bin[ch] = gate_sequence_bytes(partial_gs_ids[ch], ch)
+        """Return the gate sequence words for each channel starting from the
+        shot with index ind. The tail of the gate sequence is located with the
+        shot index built during compilation, and the packed words are cached
+        for the most recently requested indices"""
+        partial_GSEQ_bin = self.partial_GSEQ_bin_cache.pop(ind, None)
+        if partial_GSEQ_bin is None:
+            partial_GSEQ_bin = dict()
+            for ch in range(self.channel_num):
+                if self.gate_sequence_ids[ch] and not self.shot_boundary_gids[ch]:
+                    raise CircuitCompilerException(
+                        f"Unable to find {self.initialize_gate_name} on channel {ch}"
+                    )
+                with self.phase("pack_sequence"):
+                    partial_GSEQ_bin[ch] = gate_sequence_bytes(
+                        self.shot_indices[ch].tail(ind), ch
+                    )
+            while len(self.partial_GSEQ_bin_cache) >= PARTIAL_SEQUENCE_CACHE_SIZE:
+                del self.partial_GSEQ_bin_cache[next(iter(self.partial_GSEQ_bin_cache))]
+        # Reinserting keeps the cache ordered from least to most recently used
+        self.partial_GSEQ_bin_cache[ind] = partial_GSEQ_bin
         return partial_GSEQ_bin
 
     def partial_sequence_bytecode(self, channel_mask=None, starting_index=0):
@@ -682,10 +1380,3 @@ def get_gate_pulse_name(filename):
     if output:
         return output[0]
     return None
-
-
-def get_tail_from_index(elem, gidlist, ind):
-    from itertools import compress, count
-
-    gid_ind = list(compress(count(), map(lambda x: x == elem, gidlist)))[ind]
-    return gidlist[gid_ind:]
@@ -0,0 +1,310 @@
+import pickle
+from array import array
+
+from jaqalpaw.bytecode.encoding_parameters import PLUTW, SLUTW, GPRGW
+from jaqalpaw.utilities.exceptions import CircuitCompilerException
+
+# ######################################################## #
+# --------------- LUT Address Allocation ----------------- #
+# ######################################################## #
+
+
+class LUTAllocator:
+    """Assigns addresses in the PLUT, MMAP (SLUT) and GLUT for a single
+    channel. Pulse words are deduplicated through a dict that maps the raw
+    word to its PLUT address, so each lookup and assignment is O(1) and the
+    cost of building the LUTs scales linearly with the number of words.
+
+    The tables are exposed in the form expected by the LUT programming
+    functions:
+
+        PLUT : {pulse word: PLUT address}
+        MMAP : {MMAP address: PLUT address}
+        GLUT : {gate id: (MMAP start address, MMAP end address)}
+
+    A CircuitCompilerException is raised as soon as an address is assigned
+    beyond the end of a LUT, so an oversized circuit fails before the rest of
+    its gates are binarized. If check_mmap is False, the MMAP isn't checked
+    until share_mmap is called, since sharing can make it fit.
+    """
+
+    def __init__(self, channel=0, image=None, check_mmap=True):
+        self.channel = channel
+        self.check_mmap = check_mmap
+        self.PLUT = dict()
+        self.MMAP = dict()
+        self.GLUT = dict()
+        self.next_mmap_addr = 0
+        self.image = image
+        if image is not None:
+            self.used_plut_addrs = set()
+            # Image addresses of words that are still needed (see retain_words)
+            self.retained_plut_addrs = set()
+            self.previous_plut_addrs = {
+                word: addr for addr, word in image["PLUT"].items()
+            }
+            self.unused_plut_addrs = self.iterate_unused_plut_addrs()
+            self.previous_mmap_ranges = dict()
+            for start, end in image["GLUT"].values():
+                entries = tuple(image["MMAP"].get(a) for a in range(start, end + 1))
+                self.previous_mmap_ranges.setdefault(entries, start)
+            self.next_mmap_addr = max(image["MMAP"], default=-1) + 1
+
+    def __repr__(self):
+        return (
+            f"LUTAllocator(ch: {self.channel}, PLUT: {len(self.PLUT)}, "
+            f"MMAP: {len(self.MMAP)}, GLUT: {len(self.GLUT)})"
+        )
+
+    def iterate_unused_plut_addrs(self):
+        """PLUT addresses that can be assigned to new words when allocating
+        against an image: addresses that are empty in the image come first,
+        followed by addresses holding stale words. Addresses retained with
+        retain_words are skipped, so a new word doesn't displace a word that
+        is still needed but hasn't been added yet"""
+        for addr in range(1 << PLUTW):
+            if addr not in self.image["PLUT"]:
+                yield addr
+        for addr in sorted(self.image["PLUT"]):
+            if addr not in self.retained_plut_addrs:
+                yield addr
+        # Keep counting past the end of the PLUT so overflows are reported
+        # by plut_address
+        addr = 1 << PLUTW
+        while True:
+            yield addr
+            addr += 1
+
+    def retain_words(self, words):
+        """Keep the image addresses of words that the circuit uses out of the
+        addresses given to new words. This should be called with all the
+        words of the circuit before any gates are added, and does nothing if
+        there's no image"""
+        if self.image is None:
+            return
+        for word in words:
+            addr = self.previous_plut_addrs.get(word)
+            if addr is not None:
+                self.retained_plut_addrs.add(addr)
+
+    def plut_address(self, word):
+        """Return the PLUT address of a pulse word, assigning the next free
+        address if the word hasn't been seen before"""
+        addr = self.PLUT.get(word)
+        if addr is None:
+            if self.image is None:
+                addr = len(self.PLUT)
+            else:
+                addr = self.previous_plut_addrs.get(word)
+                while addr is None or addr in self.used_plut_addrs:
+                    addr = next(self.unused_plut_addrs)
+                self.used_plut_addrs.add(addr)
+            if addr >= 1 << PLUTW:
+                self.overflow("PLUT", 1 << PLUTW)
+            self.PLUT[word] = addr
+        return addr
+
+    def overflow(self, lut, capacity):
+        raise CircuitCompilerException(
+            f"{lut} overflow on channel {self.channel}: more than {capacity} "
+            f"entries are needed ({len(self.PLUT)} PLUT, {len(self.MMAP)} MMAP "
+            f"and {len(self.GLUT)} GLUT entries allocated so far)"
+        )
+
+    def check_gate(self, gid, end_addr):
+        if gid >= 1 << GPRGW:
+            self.overflow("GLUT", 1 << GPRGW)
+        if self.check_mmap and end_addr >= 1 << SLUTW:
+            self.overflow("MMAP", 1 << SLUTW)
+
+    def mmap_range_is_free(self, start, length):
+        return all(addr not in self.MMAP for addr in range(start, start + length))
+
+    def find_mmap_range(self, gid, plut_addrs):
+        """Choose the MMAP start address for a gate when allocating against an
+        image, preferring addresses that already hold the same entries"""
+        length = len(plut_addrs)
+        start = self.previous_mmap_ranges.get(tuple(plut_addrs))
+        if start is not None and all(
+            self.MMAP.get(start + n, paddr) == paddr
+            for n, paddr in enumerate(plut_addrs)
+        ):
+            return start
+        previous_range = self.image["GLUT"].get(gid)
+        if (
+            previous_range is not None
+            and previous_range[1] - previous_range[0] + 1 == length
+            and self.mmap_range_is_free(previous_range[0], length)
+        ):
+            return previous_range[0]
+        if self.next_mmap_addr + length <= 1 << SLUTW:
+            return self.next_mmap_addr
+        for start in range((1 << SLUTW) - length + 1):
+            if self.mmap_range_is_free(start, length):
+                return start
+        return self.next_mmap_addr
+
+    def add_gate(self, gid, words):
+        """Store a gate as a contiguous range of MMAP entries pointing to the
+        PLUT addresses of its pulse words, and return the (start, end) range
+        that is programmed into the GLUT for the gate id. When allocating
+        against an image, the range is placed to reuse as many of the image's
+        entries as possible"""
+        if self.image is None:
+            start_addr = self.next_mmap_addr
+            for word in words:
+                self.MMAP[self.next_mmap_addr] = self.plut_address(word)
+                self.next_mmap_addr += 1
+            self.check_gate(gid, self.next_mmap_addr - 1)
+            self.GLUT[gid] = (start_addr, self.next_mmap_addr - 1)
+            return self.GLUT[gid]
+        plut_addrs = [self.plut_address(word) for word in words]
+        start_addr = self.find_mmap_range(gid, plut_addrs)
+        for n, paddr in enumerate(plut_addrs):
+            self.MMAP[start_addr + n] = paddr
+        end_addr = start_addr + len(plut_addrs) - 1
+        self.check_gate(gid, end_addr)
+        self.next_mmap_addr = max(self.next_mmap_addr, end_addr + 1)
+        self.GLUT[gid] = (start_addr, end_addr)
+        return self.GLUT[gid]
+
+    def alias_gate(self, gid, source_gid):
+        """Point a GLUT entry to the MMAP range of an existing gate id"""
+        if gid >= 1 << GPRGW:
+            self.overflow("GLUT", 1 << GPRGW)
+        self.GLUT[gid] = self.GLUT[source_gid]
+
+    def share_mmap(self):
+        """Rebuild the MMAP so that gates share entries wherever one gate's
+        PLUT address list is a copy of, or contained within, another gate's
+        list, or where the end of one list matches the start of the next.
+        Lists are placed longest first, so shorter lists are likely to be
+        found within the storage already placed, otherwise they're appended
+        with the longest suffix/prefix overlap. The GLUT entries are updated
+        to point into the shared storage, and the tables are modified in
+        place so existing references to them stay valid. This should be run
+        before any alias_gate calls."""
+        sequences = {
+            gid: array("I", (self.MMAP[addr] for addr in range(start, end + 1)))
+            for gid, (start, end) in self.GLUT.items()
+        }
+        storage = array("I")
+        start_addrs = dict()
+        for seq in sorted(
+            {seq.tobytes(): seq for seq in sequences.values()}.values(),
+            key=len,
+            reverse=True,
+        ):
+            start_addr = find_subsequence(storage, seq)
+            if start_addr < 0:
+                overlap = longest_overlap(storage, seq)
+                start_addr = len(storage) - overlap
+                storage.extend(seq[overlap:])
+            start_addrs[seq.tobytes()] = start_addr
+        self.MMAP.clear()
+        self.MMAP.update(enumerate(storage))
+        for gid, seq in sequences.items():
+            start_addr = start_addrs[seq.tobytes()]
+            self.GLUT[gid] = (start_addr, start_addr + len(seq) - 1)
+        self.next_mmap_addr = len(storage)
+        if len(storage) > 1 << SLUTW:
+            self.overflow("MMAP", 1 << SLUTW)
+
+    def delta(self):
+        """Return the (PLUT, MMAP, GLUT) tables reduced to the entries that
+        differ from the image, or the full tables if there's no image"""
+        if self.image is None:
+            return self.PLUT, self.MMAP, self.GLUT
+        return (
+            {w: a for w, a in self.PLUT.items() if self.image["PLUT"].get(a) != w},
+            {a: p for a, p in self.MMAP.items() if self.image["MMAP"].get(a) != p},
+            {g: r for g, r in self.GLUT.items() if self.image["GLUT"].get(g) != r},
+        )
+
+    @property
+    def occupancy(self):
+        """Number of entries used in each LUT"""
+        return {"PLUT": len(self.PLUT), "MMAP": len(self.MMAP), "GLUT": len(self.GLUT)}
+
+    @property
+    def capacity(self):
+        """Number of addressable entries in each LUT"""
+        return {"PLUT": 1 << PLUTW, "MMAP": 1 << SLUTW, "GLUT": 1 << GPRGW}
+
+
+def find_subsequence(storage, seq):
+    """Index of the first occurrence of seq within storage (both arrays of
+    the same type), or -1 if it doesn't occur"""
+    if not seq:
+        return 0
+    haystack = storage.tobytes()
+    needle = seq.tobytes()
+    pos = haystack.find(needle)
+    # Only matches that are aligned to array items are valid
+    while pos >= 0 and pos % storage.itemsize:
+        pos = haystack.find(needle, pos + 1)
+    return pos // storage.itemsize if pos >= 0 else -1
+
+
+def longest_overlap(storage, seq):
+    """Length of the longest suffix of storage that is a prefix of seq"""
+    for overlap in range(min(len(storage), len(seq) - 1), 0, -1):
+        if storage[-overlap:] == seq[:overlap]:
+            return overlap
+    return 0
+
+
+def format_lut_report(report):
+    """Human readable form of CircuitCompiler.lut_report"""
+    lines = []
+    for ch, entry in report.items():
+        lines.append(f"channel {ch}:")
+        for lut in ("PLUT", "MMAP", "GLUT"):
+            used, capacity = entry[lut]
+            lines.append(f"  {lut}  {used}/{capacity} ({100 * used / capacity:.1f}%)")
+        lines.append(
+            f"  gate words  {entry['gate_words']} "
+            f"(dedupe ratio {entry['dedupe_ratio']:.2f})"
+        )
+        lines.append(
+            f"  GSEQ words  {entry['GSEQ_words']} ({entry['GSEQ_gates']} gates)"
+        )
+        for gid, words, calls in entry["top_gates"]:
+            lines.append(f"  gate {gid}: {words} words, {calls} calls")
+    return "\n".join(lines)
+
+
+# ######################################################## #
+# -------------------- LUT Images ------------------------ #
+# ######################################################## #
+
+
+def merge_lut_image(image, PLUT, MMAP, GLUT):
+    """Return the LUT contents of a channel after programming the PLUT, MMAP
+    and GLUT tables on top of image (or empty LUTs if image is None). An image
+    is a dict of the form
+
+        {"PLUT": {PLUT address: pulse word},
+         "MMAP": {MMAP address: PLUT address},
+         "GLUT": {gate id: (MMAP start address, MMAP end address)}}
+    """
+    merged = {"PLUT": dict(), "MMAP": dict(), "GLUT": dict()}
+    if image is not None:
+        for name in merged:
+            merged[name].update(image[name])
+    merged["PLUT"].update((addr, word) for word, addr in PLUT.items())
+    merged["MMAP"].update(MMAP)
+    merged["GLUT"].update(GLUT)
+    return merged
+
+
+def save_lut_image(image, filename):
+    """Save the LUT images of all channels ({channel: image}) to a file"""
+    with open(filename, "wb") as f:
+        pickle.dump(image, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def load_lut_image(filename):
+    """Load LUT images saved with save_lut_image"""
+    with open(filename, "rb") as f:
+        return pickle.load(f)
@@ -0,0 +1,75 @@
+from bisect import bisect_right
+
+from jaqalpaw.utilities.datatypes import Loop
+from jaqalpaw.utilities.exceptions import CircuitCompilerException
+
+# ######################################################## #
+# ------------------ Shot Boundary Index ----------------- #
+# ######################################################## #
+
+
+class ShotIndex:
+    """Locates the start of each shot in a gate sequence of gate ids, which
+    can contain (nested) Loop objects. A shot starts wherever one of the
+    boundary_gids is sequenced, which is the first gate of prepare_all.
+
+    The number of boundaries within each element of every (sub)sequence is
+    accumulated once when the index is built, so finding the start of a shot
+    only takes a binary search at each level of loop nesting. The tail of the
+    sequence starting from a shot keeps the loop structure, so a loop that
+    contains the shot is split into the rest of the current iteration and a
+    Loop over the remaining iterations."""
+
+    def __init__(self, gate_sequence_ids, boundary_gids):
+        self.gate_sequence_ids = gate_sequence_ids
+        self.boundary_gids = frozenset(boundary_gids)
+        # Maps id(sequence) -> cumulative number of boundaries before each
+        # element of the sequence, with the total as the last entry
+        self.boundary_counts = dict()
+        self.num_shots = self.count_boundaries(gate_sequence_ids)
+
+    def __len__(self):
+        return self.num_shots
+
+    def __repr__(self):
+        return f"ShotIndex(shots: {self.num_shots})"
+
+    def count_boundaries(self, glist):
+        counts = [0]
+        total = 0
+        for g in glist:
+            if isinstance(g, Loop):
+                total += g.repeats * self.count_boundaries(g)
+            elif g in self.boundary_gids:
+                total += 1
+            counts.append(total)
+        self.boundary_counts[id(glist)] = counts
+        return total
+
+    def tail(self, shot):
+        """Return the gate sequence starting from the first gate of the shot
+        with index shot"""
+        if not self.gate_sequence_ids:
+            return []
+        if not 0 <= shot < self.num_shots:
+            raise CircuitCompilerException(
+                f"Shot index {shot} is out of range, the gate sequence has "
+                f"{self.num_shots} shots"
+            )
+        return self.sequence_tail(self.gate_sequence_ids, shot)
+
+    def sequence_tail(self, glist, shot):
+        counts = self.boundary_counts[id(glist)]
+        # Element n contains the shot if counts[n] <= shot < counts[n+1]
+        n = bisect_right(counts, shot) - 1
+        g = glist[n]
+        if not isinstance(g, Loop):
+            return glist[n:]
+        iteration, shot = divmod(
+            shot - counts[n], (counts[n + 1] - counts[n]) // g.repeats
+        )
+        tail = self.sequence_tail(g, shot)
+        if g.repeats - iteration - 1:
+            tail.append(Loop(g, repeats=g.repeats - iteration - 1))
+        tail.extend(glist[n + 1 :])
+        return tail
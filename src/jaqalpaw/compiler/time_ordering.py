@@ -1,7 +1,20 @@
 from collections import defaultdict
+from heapq import merge
+
+import numpy as np
 
 from jaqalpaw.bytecode.binary_conversion import map_from_bytes
-from jaqalpaw.bytecode.encoding_parameters import MODTYPE_LSB, DMA_MUX_LSB
+from jaqalpaw.bytecode.encoding_parameters import (
+    MODTYPE_LSB,
+    DMA_MUX_LSB,
+    METADATA_START_LSB,
+)
+from jaqalpaw.bytecode.word_buffer import WORD_SIZE
+from jaqalpaw.utilities.datatypes import Loop
+
+# The duration is the signed 40 bit field just below the metadata
+DURATION_WIDTH = 40
+DURATION_LSB = METADATA_START_LSB - DURATION_WIDTH
 
 # ######################################################## #
 # --------------- Time Ordering Functions ---------------- #
@@ -64,17 +77,123 @@ def generate_time_stamped_data(bytelist):
     return full_pb_list
 
 
+def word_field(words, lsb, width):
+    """Extract the unsigned bit field of width bits starting at lsb from each
+    row of words, a uint8 array of shape (N, 32)"""
+    first, last = lsb // 8, (lsb + width - 1) // 8
+    field = np.zeros(len(words), dtype=np.uint64)
+    for n, byte in enumerate(range(first, last + 1)):
+        field |= words[:, byte].astype(np.uint64) << np.uint64(8 * n)
+    return (field >> np.uint64(lsb % 8)) & np.uint64((1 << width) - 1)
+
+
+def decode_words(data):
+    """Extract the channel, modulation type and duration from every word in
+    data, which is a bytes-like object holding whole 32 byte words or a uint8
+    array of shape (N, 32). This is the vectorized form of decode_word, and
+    returns three int64 arrays"""
+    words = np.frombuffer(data, dtype=np.uint8).reshape(-1, WORD_SIZE)
+    channel = word_field(words, DMA_MUX_LSB, 3).astype(np.int64)
+    mod_type = word_field(words, MODTYPE_LSB, 3).astype(np.int64)
+    dur = word_field(words, DURATION_LSB, DURATION_WIDTH).astype(np.int64)
+    dur[dur >= 1 << (DURATION_WIDTH - 1)] -= 1 << DURATION_WIDTH
+    return channel, mod_type, dur
+
+
+def stream_start_times(stream, dur):
+    """Start time of each word, where the words of each stream (as labelled by
+    the stream array) follow each other back to back in their original order"""
+    order = np.argsort(stream, kind="stable")
+    sorted_dur = dur[order]
+    end_times = np.cumsum(sorted_dur)
+    sorted_stream = stream[order]
+    # Index (in sorted order) of the first word of the stream of each word
+    stream_start = np.ones(len(stream), dtype=bool)
+    stream_start[1:] = sorted_stream[1:] != sorted_stream[:-1]
+    first = np.maximum.accumulate(np.where(stream_start, np.arange(len(stream)), 0))
+    start_times = np.empty_like(end_times)
+    start_times[order] = end_times - sorted_dur - (end_times - sorted_dur)[first]
+    return start_times
+
+
+def timesort_order(data):
+    """Indices that sort the words in data (see decode_words) by start time,
+    then by modulation type and channel. Words with the same start time,
+    modulation type and channel keep their original order"""
+    channel, mod_type, dur = decode_words(data)
+    start_times = stream_start_times((mod_type << 3) | channel, dur)
+    return np.lexsort((channel, mod_type, start_times))
+
+
 def timesort_bytelist(bytelist):
-    """Sort a list of raw data words by start time, then by channel and modulation type"""
-    full_pb_list = generate_time_stamped_data(bytelist)
-    # sorted_pb_list = list(sorted(full_pb_list, key=lambda el: (el.start_time << 6) | (el.chan << 3) | el.mod_type))
-    sorted_pb_list = list(
-        sorted(
-            full_pb_list,
-            key=lambda el: (el.start_time << 6) | (el.mod_type << 3) | el.chan,
-        )
-    )
-    wordlist = []
-    for spb in sorted_pb_list:
-        wordlist.append(spb.word)
-    return wordlist
+    """Sort a list of raw data words by start time, then by modulation type and
+    channel. The words are decoded and sorted with NumPy, without creating
+    a TimeStampedWord for each word"""
+    if not bytelist:
+        return []
+    return [bytelist[i] for i in timesort_order(b"".join(bytelist))]
+
+
+def time_stamp_words(words):
+    """Yield (start_time, mod_type, chan, word) for an iterable of words that
+    follow each other back to back"""
+    start_time = 0
+    for word in words:
+        chan, mod_type, dur = decode_word(word)
+        yield start_time, mod_type, chan, word
+        start_time += dur
+
+
+def merge_word_streams(word_streams):
+    """Merge iterables of words into a single iterator in the same order as
+    timesort_bytelist. Each iterable must hold the words for a single channel
+    and modulation type, so it's already in time order, and the iterables are
+    merged lazily in O(n log k) for k iterables"""
+    for _, _, _, word in merge(*map(time_stamp_words, word_streams)):
+        yield word
+
+
+# ######################################################## #
+# ------------ Loop Preserving Time Ordering ------------- #
+# ######################################################## #
+
+
+def replay_stream(stream, chan, mod_type, start_time=0):
+    """Yield (start_time, mod_type, chan, word) for each word in stream, which
+    is a list of (duration, word) tuples for a single channel and modulation
+    type that can contain (nested) Loop objects of the same form. Loops are
+    replayed lazily, with the start time advancing by the duration of the
+    loop body for each iteration. Returns the end time of the stream"""
+    for item in stream:
+        if isinstance(item, Loop):
+            for _ in range(item.repeats):
+                start_time = yield from replay_stream(item, chan, mod_type, start_time)
+        else:
+            dur, word = item
+            yield start_time, mod_type, chan, word
+            start_time += dur
+    return start_time
+
+
+def replay_streams(streams, chan, mod_type):
+    """Replay a list of streams for the same channel and modulation type one
+    after the other, as if they were a single stream"""
+    start_time = 0
+    for stream in streams:
+        start_time = yield from replay_stream(stream, chan, mod_type, start_time)
+
+
+def iterate_timesorted_streams(streams):
+    """Yield the words of streams, a dict mapping (channel, modulation type)
+    to a list of streams (see replay_stream), in the same order as
+    timesort_bytelist. Each (channel, modulation type) is already in time
+    order, so the words are merged lazily, and only one word per stream is
+    held at a time"""
+    replayed = [
+        replay_streams(stream_list, chan, mod_type)
+        for (chan, mod_type), stream_list in streams.items()
+    ]
+    # Each replayed stream has a distinct (mod_type, chan), so ties in the
+    # sort key never fall through to comparing words
+    for _, _, _, word in merge(*replayed):
+        yield word
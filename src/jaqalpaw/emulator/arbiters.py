@@ -182,9 +182,9 @@ async def spline_engine(
             # The additional 3 clock cycles are related to a subtle hardware issue
             xdata = np.array(list(range(dur))) + 1
             spline_data = pdq_spline(coeffs, [0], nsteps=dur, shift=shift)
-            spline_data_real = list(
-                map(mod_type_dict[mod_type]["realConvFunc"], spline_data)
-            )
+            spline_data_real = mod_type_dict[mod_type]["realArrayConvFunc"](
+                spline_data
+            ).tolist()
             xdata_real = list(map(lambda x: time_list[-1] + x, xdata))
             time_list.extend(xdata_real[:])
             last_val = data_list[-1]
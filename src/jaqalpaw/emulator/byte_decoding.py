@@ -4,6 +4,7 @@ from jaqalpaw.bytecode.binary_conversion import (
     convert_freq_full,
     convert_phase_full,
     convert_amp_full,
+    exact_int_array,
     map_from_bytes,
 )
 from jaqalpaw.bytecode.encoding_parameters import (
@@ -40,6 +41,26 @@ def convert_amp_bytes_to_real(data):
     return (int(data) >> 23) / ((1 << 16) - 1) * MAXAMP
 
 
+# Array versions of the conversions above, which give the same values as
+# mapping the scalar conversions over each element. Values that don't fit in
+# int64 are kept as Python ints in object arrays.
+
+
+def convert_phase_bytes_to_real_array(data):
+    return np.asarray(data) / (1 << 40) * 360.0
+
+
+def convert_freq_bytes_to_real_array(data):
+    return np.asarray(data) / (1 << 40) * CLOCK_FREQUENCY
+
+
+def convert_amp_bytes_to_real_array(data):
+    data = np.asarray(data)
+    if data.dtype.kind == "f":
+        data = exact_int_array(np.trunc(data))
+    return (data >> 23) / ((1 << 16) - 1) * MAXAMP
+
+
 def convert_time_from_clock_cycles(data):
     return data * CLKPERIOD
 
@@ -58,41 +79,49 @@ mod_type_dict = {
         "name": "f0",
         "machineConvFunc": convert_freq_full,
         "realConvFunc": convert_freq_bytes_to_real,
+        "realArrayConvFunc": convert_freq_bytes_to_real_array,
     },
     0b001: {
         "name": "a0",
         "machineConvFunc": convert_amp_full,
         "realConvFunc": convert_amp_bytes_to_real,
+        "realArrayConvFunc": convert_amp_bytes_to_real_array,
     },
     0b010: {
         "name": "p0",
         "machineConvFunc": convert_phase_full,
         "realConvFunc": convert_phase_bytes_to_real,
+        "realArrayConvFunc": convert_phase_bytes_to_real_array,
     },
     0b011: {
         "name": "f1",
         "machineConvFunc": convert_freq_full,
         "realConvFunc": convert_freq_bytes_to_real,
+        "realArrayConvFunc": convert_freq_bytes_to_real_array,
     },
     0b100: {
         "name": "a1",
         "machineConvFunc": convert_amp_full,
         "realConvFunc": convert_amp_bytes_to_real,
+        "realArrayConvFunc": convert_amp_bytes_to_real_array,
     },
     0b101: {
         "name": "p1",
         "machineConvFunc": convert_phase_full,
         "realConvFunc": convert_phase_bytes_to_real,
+        "realArrayConvFunc": convert_phase_bytes_to_real_array,
     },
     0b110: {
         "name": "z0",
         "machineConvFunc": convert_phase_full,
         "realConvFunc": convert_phase_bytes_to_real,
+        "realArrayConvFunc": convert_phase_bytes_to_real_array,
     },
     0b111: {
         "name": "z1",
         "machineConvFunc": convert_phase_full,
         "realConvFunc": convert_phase_bytes_to_real,
+        "realArrayConvFunc": convert_phase_bytes_to_real_array,
     },
 }
 
@@ -239,9 +268,9 @@ def decode_word(raw_data, master_data_record, sequence_mode=False):
             coeffs[3, 0] = U0
             xdata = np.array(list(range(dur))) + 1
             spline_data = pdq_spline(coeffs, [0], nsteps=dur)
-            spline_data_real = list(
-                map(mod_type_dict[mod_type]["realConvFunc"], spline_data)
-            )
+            spline_data_real = mod_type_dict[mod_type]["realArrayConvFunc"](
+                spline_data
+            ).tolist()
             xdata_real = list(
                 map(
                     lambda x: master_data_record[channel][mod_type]["time"][-1]
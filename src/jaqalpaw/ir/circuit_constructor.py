@@ -7,6 +7,7 @@ from .circuit_constructor_visitor import convert_circuit_to_gateslices
 from .pulse_data import PulseData
 from .ast_utilities import get_let_constants
 from jaqalpaw.utilities.exceptions import CircuitCompilerException
+from jaqalpaw.utilities.instrumentation import null_phase
 from jaqalpaw._import import get_jaqal_pulses
 
 # ######################################################## #
@@ -22,6 +23,8 @@ class CircuitConstructor:
         self.channel_num = channel_num
         self.slice_list = []
         self.pulse_definition = pulse_definition
+        # The gate that starts each shot
+        self.initialize_gate_name = "prepare_all"
         self.exported_constants = None
         self.reg_list = None
         self.gate_pulse_info = None
@@ -30,6 +33,14 @@ class CircuitConstructor:
         # The circuit after certain transformations (such as
         # overriding let variables) has occurred.
         self.circuit = None
+        # CompileStats that records the time spent in each phase, if enabled
+        self.stats = None
+
+    def phase(self, name):
+        """Context manager that times a phase of compilation in self.stats"""
+        if self.stats is None:
+            return null_phase
+        return self.stats.phase(name)
 
     def get_dependencies(self):
         if self.file is None:
@@ -79,13 +90,22 @@ class CircuitConstructor:
 
         return self.circuit
 
-    def construct_circuit(self, file, override_dict=None, pd_override_dict=None):
+    def construct_circuit(
+        self, file, override_dict=None, pd_override_dict=None, gate_cache=None
+    ):
         """Generate full circuit from jaqal file. Circuit is in the form of
-        PulseData objects."""
-        ast = self.generate_ast(file, override_dict=override_dict)
+        PulseData objects. An optional gate_cache dict is used to reuse gate
+        data that was evaluated by a previous call."""
+        with self.phase("parse"):
+            ast = self.generate_ast(file, override_dict=override_dict)
         if pd_override_dict and isinstance(pd_override_dict, dict):
             for k, v in pd_override_dict.items():
                 setattr(self.pulse_definition, k, v)
-        self.slice_list = convert_circuit_to_gateslices(
-            self.pulse_definition, ast, self.channel_num
-        )
+        with self.phase("convert_circuit_to_gateslices"):
+            self.slice_list = convert_circuit_to_gateslices(
+                self.pulse_definition,
+                ast,
+                self.channel_num,
+                gate_cache=gate_cache,
+                shot_boundary_gate=self.initialize_gate_name,
+            )
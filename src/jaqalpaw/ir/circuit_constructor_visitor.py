@@ -1,8 +1,11 @@
+from copy import copy
+from itertools import zip_longest
+
 from jaqalpaq.core.algorithm.visitor import Visitor
 
 from .gate_slice import GateSlice
 from .ast_utilities import (
-    merge_slice_lists,
+    merge_slices,
     is_total_gate,
     get_gate_data,
     normalize_number,
@@ -23,12 +26,37 @@ def is_loop(gdata):
     return isinstance(gdata, Loop)
 
 
-def convert_circuit_to_gateslices(pulse_definition, circuit, num_channels):
-    """Convert a Circuit into a list of GateSlice objects."""
-    visitor = CircuitConstructorVisitor(pulse_definition, num_channels)
+def convert_circuit_to_gateslices(
+    pulse_definition,
+    circuit,
+    num_channels,
+    gate_cache=None,
+    shot_boundary_gate=None,
+):
+    """Convert a Circuit into a list of GateSlice objects. If gate_cache is a
+    dict, evaluated gate data is stored in and reused from it. The first
+    GateSlice of each shot_boundary_gate is marked as a shot boundary."""
+    visitor = CircuitConstructorVisitor(
+        pulse_definition,
+        num_channels,
+        gate_cache=gate_cache,
+        shot_boundary_gate=shot_boundary_gate,
+    )
     return visitor.visit(circuit)
 
 
+def mark_shot_boundary(slices):
+    """Mark the first GateSlice in a (nested) list of slices as the start of a
+    shot. Returns True if a GateSlice was found"""
+    for obj in slices:
+        if isinstance(obj, GateSlice):
+            obj.shot_boundary = True
+            return True
+        if isinstance(obj, list) and mark_shot_boundary(obj):
+            return True
+    return False
+
+
 def make_all_durations_equal(obj):
     """Calls obj.make_durations_equal if obj is a GateSlice.  If obj is a
     list or Loop, recursively descends to all GateSlice elements
@@ -41,8 +69,10 @@ def make_all_durations_equal(obj):
         obj.make_durations_equal()
 
 
-def populate_gate_slice(gate, num_channels):
-    """Constructs a GateSlice with the relevant PulseData given by the associated PulseDefinition"""
+def populate_gate_slice(gate, num_channels, pulse_data_table=None):
+    """Constructs a GateSlice with the relevant PulseData given by the associated PulseDefinition.
+    If pulse_data_table is a dict, PulseData objects are interned in it by
+    digest, so identical PulseData are replaced with the first such object"""
     gslice = GateSlice(num_channels=num_channels)
     if gate is not None:
         for pd in gate:
@@ -50,14 +80,17 @@ def populate_gate_slice(gate, num_channels):
                 # Only append gate data if its duration is long enough
                 # otherwise the gate is ignored, this is useful for
                 # calibrations in which a gate duration is set to zero
+                if pulse_data_table is not None:
+                    pd = pulse_data_table.setdefault(pd.digest, pd)
                 gslice.channel_data[pd.channel].append(pd)
     return gslice
 
 
 class MacroConstructor:
-    def __init__(self, channel_num):
+    def __init__(self, channel_num, pulse_data_table=None):
         self.channel_num = channel_num
         self.slice_list = []
+        self.pulse_data_table = pulse_data_table
 
     @staticmethod
     def transform_gate_arg(arg):
@@ -69,7 +102,11 @@ class MacroConstructor:
 
     def construct_gate(self, gate):
         """Constructs a GateSlice with the relevant PulseData given by the associated PulseDefinition"""
-        return populate_gate_slice(gate, num_channels=self.channel_num)
+        return populate_gate_slice(
+            gate,
+            num_channels=self.channel_num,
+            pulse_data_table=self.pulse_data_table,
+        )
 
     def construct_gate_block(self, gate_block):
         """Walk AST parallel/sequential blocks"""
@@ -117,13 +154,65 @@ class MacroConstructor:
 
 
 class CircuitConstructorVisitor(Visitor):
-    """Convert a Circuit into a list of GateSlice objects."""
+    """Convert a Circuit into a list of GateSlice objects.
 
-    def __init__(self, pulse_definition, num_channels):
+    GateSlices are hash-consed: gates (and merged parallel blocks) with the
+    same contents are represented by the same GateSlice object wherever they
+    occur in the circuit, as are the slices of macros called with the same
+    arguments. Shared slices are never merged into, so padding a shared slice
+    with make_durations_equal has the same effect at every occurrence."""
+
+    def __init__(
+        self, pulse_definition, num_channels, gate_cache=None, shot_boundary_gate=None
+    ):
         super().__init__()
         self.pulse_definition = pulse_definition
         self.num_channels = num_channels
-        self.macro_constructor = MacroConstructor(channel_num=self.num_channels)
+        # Maps (gate name, args) to the PulseData list returned by the pulse
+        # definition. The cache can outlive the visitor, which allows repeated
+        # conversions of the same circuit (e.g. parameter sweeps) to skip gate
+        # evaluation for gates whose arguments haven't changed.
+        self.gate_cache = gate_cache
+        self.shot_boundary_gate = shot_boundary_gate
+        # Interns the PulseData of every gate in the circuit, see
+        # populate_gate_slice
+        self.pulse_data_table = dict()
+        # Maps GateSlice.content_key() -> the canonical GateSlice
+        self.slice_table = dict()
+        # Maps (id(dst), id(src)) -> (dst, src, merged slice). dst and src are
+        # kept so their ids can't be reused while the visitor is alive
+        self.merge_cache = dict()
+        # Maps (macro name, args) -> slice list
+        self.macro_cache = dict()
+        self.macro_constructor = MacroConstructor(
+            channel_num=self.num_channels, pulse_data_table=self.pulse_data_table
+        )
+
+    def intern_slice(self, gslice):
+        """Return the canonical GateSlice with the same contents as gslice"""
+        return self.slice_table.setdefault(gslice.content_key(), gslice)
+
+    def merge_slices(self, dst, src):
+        """Merge two GateSlice objects without modifying either one. Merging
+        the same pair of slices again returns the same merged slice"""
+        if dst is None:
+            return src
+        if src is None:
+            return dst
+        if not isinstance(dst, GateSlice) or not isinstance(src, GateSlice):
+            return merge_slices(dst, src)
+        key = (id(dst), id(src))
+        if key not in self.merge_cache:
+            merged = copy(dst)
+            merged.merge(src)
+            self.merge_cache[key] = (dst, src, self.intern_slice(merged))
+        return self.merge_cache[key][2]
+
+    def merge_slice_lists(self, dst_list, src_list):
+        """Take two lists of GateSlice objects and merge them pairwise"""
+        return [
+            self.merge_slices(dst, src) for dst, src in zip_longest(dst_list, src_list)
+        ]
 
     def visit_Circuit(self, circuit):
         slice_list = self.visit(circuit.body)
@@ -138,7 +227,7 @@ class CircuitConstructorVisitor(Visitor):
         if block.parallel:
             for stmt in block.statements:
                 stmt_slices = self.visit(stmt)
-                slice_list = merge_slice_lists(slice_list, stmt_slices)
+                slice_list = self.merge_slice_lists(slice_list, stmt_slices)
         else:
             for stmt in block.statements:
                 slice_list.append(self.visit(stmt))
@@ -160,10 +249,28 @@ class CircuitConstructorVisitor(Visitor):
         else:
             args = [self.visit(garg) for garg in gate.parameters.values()]
         if hasattr(self.pulse_definition, "macro_" + gate.name):
-            macro_data = get_macro_data(self.pulse_definition, gate.name, args)
-            return self.macro_constructor.construct_circuit(macro_data)
-        gate_data = get_gate_data(self.pulse_definition, gate.name, args)
-        return [populate_gate_slice(gate_data, self.num_channels)]
+            key = (gate.name, tuple(args))
+            if key not in self.macro_cache:
+                macro_data = get_macro_data(self.pulse_definition, gate.name, args)
+                slice_list = self.macro_constructor.construct_circuit(macro_data)
+                if gate.name == self.shot_boundary_gate:
+                    mark_shot_boundary(slice_list)
+                self.macro_cache[key] = slice_list
+            return self.macro_cache[key]
+        if self.gate_cache is None:
+            gate_data = get_gate_data(self.pulse_definition, gate.name, args)
+        else:
+            key = (gate.name, tuple(args))
+            if key not in self.gate_cache:
+                self.gate_cache[key] = get_gate_data(
+                    self.pulse_definition, gate.name, args
+                )
+            gate_data = self.gate_cache[key]
+        gslice = populate_gate_slice(
+            gate_data, self.num_channels, pulse_data_table=self.pulse_data_table
+        )
+        gslice.shot_boundary = gate.name == self.shot_boundary_gate
+        return [self.intern_slice(gslice)]
 
     def visit_LoopStatement(self, loop):
         """Return a Loop object representing this loop."""
@@ -1,7 +1,7 @@
 from collections import defaultdict
 from copy import copy
 
-from .pulse_data import PulseData
+from .pulse_data import PulseData, gate_digest
 from .padding import append_prepend_distribute
 from jaqalpaw.utilities.datatypes import ClockCycles, to_real_time
 from jaqalpaw.utilities.exceptions import CollisionException
@@ -14,6 +14,8 @@ class GateSlice:
     def __init__(self, num_channels=None):
         self.channel_data = defaultdict(list)
         self.num_channels = num_channels or self.CHANNEL_NUM
+        # Set for the first slice of the gate that starts each shot
+        self.shot_boundary = False
         # self.repeats = 1
 
     def __repr__(self):
@@ -22,6 +24,25 @@ class GateSlice:
             retlist.append(f"Channel {k}: {v}")
         return "\n".join(retlist)
 
+    def __copy__(self):
+        """Copy the slice along with its per channel lists, so the copy can be
+        merged or padded without modifying the original"""
+        new_gate_slice = GateSlice(num_channels=self.num_channels)
+        for k, v in self.channel_data.items():
+            new_gate_slice.channel_data[k] = list(v)
+        new_gate_slice.shot_boundary = self.shot_boundary
+        return new_gate_slice
+
+    def content_key(self):
+        """Key identifying the contents of the slice, made from the digests of
+        the PulseData on each (non-empty) channel"""
+        return (
+            self.shot_boundary,
+            tuple(
+                (k, gate_digest(v)) for k, v in sorted(self.channel_data.items()) if v
+            ),
+        )
+
     def merge(self, other):
         k1s = set(self.channel_data.keys())
         k2s = set(other.channel_data.keys())
@@ -30,7 +51,7 @@ class GateSlice:
                 if k in k2s:
                     if self.channel_data[k] != other.channel_data[k]:
                         if self.channel_data[k] is None:
-                            self.channel_data[k] = other.channel_data[k]
+                            self.channel_data[k] = list(other.channel_data[k])
                         elif other.channel_data[k] is None:
                             continue
                         else:
@@ -61,13 +82,16 @@ class GateSlice:
                                     self.channel_data[k][0].dur
                                     < other.channel_data[k][0].dur
                                 ):
-                                    self.channel_data[k] = other.channel_data[k]
+                                    self.channel_data[k] = list(other.channel_data[k])
                             else:
                                 raise CollisionException(
                                     f"Data does not match on channel {k}!"
                                 )
             else:
-                self.channel_data[k] = other.channel_data[k]
+                # The list is copied so that padding this slice later doesn't
+                # modify other, which might be shared (see
+                # CircuitConstructorVisitor.merge_slices)
+                self.channel_data[k] = list(other.channel_data[k])
 
     def append(self, other):
         for k in other.channel_data.keys():
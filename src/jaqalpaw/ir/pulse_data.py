@@ -1,13 +1,79 @@
 from collections import defaultdict
-from functools import lru_cache
+from hashlib import blake2b
+from operator import attrgetter
 
-from jaqalpaw.bytecode.pulse_binarization import pulse
+import numpy as np
+
+from jaqalpaw.bytecode.binarization_cache import binarization_cache
 from jaqalpaw.utilities.helper_functions import make_list_hashable
-from jaqalpaw.utilities.datatypes import to_clock_cycles
+from jaqalpaw.utilities.datatypes import ClockCycles, to_clock_cycles
 from jaqalpaw.utilities.parameters import CLKFREQ
 
 
+def canonical_repr(value):
+    """String representation of a PulseData parameter used for its digest.
+    Values that compare equal (e.g. 1, 1.0 and numpy.float64(1)) have the same
+    representation, floats are represented exactly, and the type of
+    modulation (Spline, Discrete...) is included for sequences"""
+    vtype = type(value)
+    if vtype is int or vtype is ClockCycles:
+        return str(value)
+    if vtype is float or isinstance(value, (float, np.floating)):
+        value = float(value)
+        if value.is_integer():
+            return str(int(value))
+        # repr is the shortest string that round trips, so it's exact
+        return repr(value)
+    if isinstance(value, (int, np.integer)):
+        return str(int(value))
+    if isinstance(value, (tuple, list)):
+        return f"{vtype.__name__}({','.join(map(canonical_repr, value))})"
+    return f"{vtype.__name__}:{value!r}"
+
+
+def gate_digest(pd_list):
+    """128 bit digest of a sequence of PulseData objects"""
+    return blake2b(b"".join(pd.digest for pd in pd_list), digest_size=16).digest()
+
+
+def binarize_many(pulse_data_list, bypass=False):
+    """Binarize every PulseData in pulse_data_list and return their lists of
+    words. Pulses that aren't in the binarization_cache are binarized in one
+    batch"""
+    pulse_data_list = list(pulse_data_list)
+    words = binarization_cache.binarize_many(pulse_data_list, bypass=bypass)
+    for pd, pd_words in zip(pulse_data_list, words):
+        pd.binary_data = pd_words
+    return words
+
+
 class PulseData:
+    # Parameters that determine the pulse, and are covered by the digest
+    digest_fields = (
+        "channel",
+        "dur",
+        "freq0",
+        "phase0",
+        "amp0",
+        "freq1",
+        "phase1",
+        "amp1",
+        "waittrig",
+        "sync_mask",
+        "enable_mask",
+        "fb_enable_mask",
+        "framerot0",
+        "framerot1",
+        "apply_at_end_mask",
+        "rst_frame_mask",
+        "fwd_frame0_mask",
+        "fwd_frame1_mask",
+        "inv_frame0_mask",
+        "inv_frame1_mask",
+        "delay",
+    )
+    digest_field_set = frozenset(digest_fields)
+    digest_fields_getter = attrgetter(*digest_fields)
     nonetypes = [
         "freq0",
         "phase0",
@@ -42,30 +108,54 @@ class PulseData:
         inv_frame0_mask=0,
         inv_frame1_mask=0,
     ):
-        self.channel = channel
-        self.real_dur = dur
-        self.dur = to_clock_cycles(dur, CLKFREQ)
-        self.freq0 = make_list_hashable(freq0)
-        self.phase0 = make_list_hashable(phase0)
-        self.amp0 = make_list_hashable(amp0)
-        self.freq1 = make_list_hashable(freq1)
-        self.phase1 = make_list_hashable(phase1)
-        self.amp1 = make_list_hashable(amp1)
-        self.waittrig = waittrig
-        self.sync_mask = sync_mask
-        self.enable_mask = enable_mask
-        self.fb_enable_mask = fb_enable_mask
-        self.framerot0 = make_list_hashable(framerot0)
-        self.framerot1 = make_list_hashable(framerot1)
-        self.apply_at_end_mask = apply_at_end_mask
-        self.rst_frame_mask = rst_frame_mask
-        self.fwd_frame0_mask = fwd_frame0_mask
-        self.fwd_frame1_mask = fwd_frame1_mask
-        self.inv_frame0_mask = inv_frame0_mask
-        self.inv_frame1_mask = inv_frame1_mask
-        self.old_hash = None
-        self.binary_data = None
-        self.delay = 0
+        # The instance dict is filled directly, which skips going through
+        # __setattr__ for every field
+        self.__dict__.update(
+            channel=channel,
+            real_dur=dur,
+            dur=to_clock_cycles(dur, CLKFREQ),
+            freq0=make_list_hashable(freq0),
+            phase0=make_list_hashable(phase0),
+            amp0=make_list_hashable(amp0),
+            freq1=make_list_hashable(freq1),
+            phase1=make_list_hashable(phase1),
+            amp1=make_list_hashable(amp1),
+            waittrig=waittrig,
+            sync_mask=sync_mask,
+            enable_mask=enable_mask,
+            fb_enable_mask=fb_enable_mask,
+            framerot0=make_list_hashable(framerot0),
+            framerot1=make_list_hashable(framerot1),
+            apply_at_end_mask=apply_at_end_mask,
+            rst_frame_mask=rst_frame_mask,
+            fwd_frame0_mask=fwd_frame0_mask,
+            fwd_frame1_mask=fwd_frame1_mask,
+            inv_frame0_mask=inv_frame0_mask,
+            inv_frame1_mask=inv_frame1_mask,
+            old_hash=None,
+            binary_data=None,
+            delay=0,
+            _digest=None,
+        )
+
+    def __setattr__(self, name, value):
+        # Setting any of the digest fields invalidates the cached digest
+        object.__setattr__(self, name, value)
+        if name in PulseData.digest_field_set:
+            object.__setattr__(self, "_digest", None)
+
+    @property
+    def digest(self):
+        """128 bit digest of the pulse parameters, used for equality and
+        hashing. The digest is cached until one of the digest_fields is set.
+        Parameters must be replaced rather than modified in place (e.g. by
+        appending to a list) for the digest to follow them"""
+        if self._digest is None:
+            params = PulseData.digest_fields_getter(self)
+            self._digest = blake2b(
+                "|".join(map(canonical_repr, params)).encode(), digest_size=16
+            ).digest()
+        return self._digest
 
     def __repr__(self):
         return (
@@ -79,34 +169,7 @@ class PulseData:
     def __eq__(self, other):
         if not isinstance(other, PulseData):
             return False
-        return all(
-            map(
-                lambda attr: getattr(self, attr) == getattr(other, attr),
-                [
-                    "channel",
-                    "dur",
-                    "freq0",
-                    "phase0",
-                    "amp0",
-                    "freq1",
-                    "phase1",
-                    "amp1",
-                    "waittrig",
-                    "sync_mask",
-                    "enable_mask",
-                    "fb_enable_mask",
-                    "framerot0",
-                    "framerot1",
-                    "apply_at_end_mask",
-                    "rst_frame_mask",
-                    "fwd_frame0_mask",
-                    "fwd_frame1_mask",
-                    "inv_frame0_mask",
-                    "inv_frame1_mask",
-                    "delay",
-                ],
-            )
-        )
+        return self is other or self.digest == other.digest
 
     def almost_equal(self, other):
         """almost_equal is used for verifying that the data is equivalent with
@@ -173,57 +236,12 @@ class PulseData:
         return False
 
     def __hash__(self):
-        return hash(
-            (
-                self.channel,
-                self.dur,
-                self.freq0,
-                self.phase0,
-                self.amp0,
-                self.freq1,
-                self.phase1,
-                self.amp1,
-                self.waittrig,
-                self.sync_mask,
-                self.enable_mask,
-                self.fb_enable_mask,
-                self.framerot0,
-                self.framerot1,
-                self.apply_at_end_mask,
-                self.rst_frame_mask,
-                self.fwd_frame0_mask,
-                self.fwd_frame1_mask,
-                self.inv_frame0_mask,
-                self.inv_frame1_mask,
-                self.delay,
-            )
-        )
+        return int.from_bytes(self.digest[:8], byteorder="little", signed=True)
 
-    @lru_cache(maxsize=4096)
     def binarize(self, bypass=False):
-        self.binary_data = pulse(
-            self.channel,
-            self.dur + self.delay,
-            freq0=self.freq0,
-            phase0=self.phase0,
-            amp0=self.amp0,
-            waittrig=self.waittrig,
-            freq1=self.freq1,
-            phase1=self.phase1,
-            amp1=self.amp1,
-            sync_mask=self.sync_mask,
-            enable_mask=self.enable_mask,
-            fb_enable_mask=self.fb_enable_mask,
-            framerot0=self.framerot0,
-            framerot1=self.framerot1,
-            apply_at_end_mask=self.apply_at_end_mask,
-            rst_frame_mask=self.rst_frame_mask,
-            fwd_frame0_mask=self.fwd_frame0_mask,
-            fwd_frame1_mask=self.fwd_frame1_mask,
-            inv_frame0_mask=self.inv_frame0_mask,
-            inv_frame1_mask=self.inv_frame1_mask,
-            bypass=bypass,
-        )
+        """Binarize the pulse, reusing the words of an equal pulse if they are
+        in the process wide binarization_cache"""
+        self.binary_data = binarization_cache.binarize(self, bypass=bypass)
         return self.binary_data
 
     @property
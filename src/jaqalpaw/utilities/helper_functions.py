@@ -1,14 +1,22 @@
+import numpy as np
+
 from .datatypes import ClockCycles, Discrete, Spline, Mixed
 from .parameters import CLKFREQ
 from ..bytecode.binary_conversion import (
     convert_freq_full,
     convert_phase_full,
     convert_amp_full,
+    convert_freq_full_array,
+    convert_phase_full_array,
+    convert_amp_full_array,
 )
 from ..emulator.byte_decoding import (
     convert_freq_bytes_to_real,
     convert_phase_bytes_to_real,
     convert_amp_bytes_to_real,
+    convert_freq_bytes_to_real_array,
+    convert_phase_bytes_to_real_array,
+    convert_amp_bytes_to_real_array,
 )
 
 
@@ -49,14 +57,20 @@ def to_real_time(dur):
 
 
 def discretize_amplitude(v):
+    if np.ndim(v):
+        return convert_amp_bytes_to_real_array(convert_amp_full_array(v))
     return convert_amp_bytes_to_real(convert_amp_full(v))
 
 
 def discretize_frequency(v):
+    if np.ndim(v):
+        return convert_freq_bytes_to_real_array(convert_freq_full_array(v))
     return convert_freq_bytes_to_real(convert_freq_full(v))
 
 
 def discretize_phase(v):
+    if np.ndim(v):
+        return convert_phase_bytes_to_real_array(convert_phase_full_array(v))
     return convert_phase_bytes_to_real(convert_phase_full(v))
 
 
@@ -0,0 +1,266 @@
+import json
+import os
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+
+# ######################################################## #
+# -------------- Compile Time Instrumentation ------------ #
+# ######################################################## #
+
+# Process wide counts of events that happen below the level of the compiler,
+# such as spline fits during binarization. CompileStats records how much these
+# counts change over the course of a compilation.
+event_counters = defaultdict(int)
+
+
+class NullPhase:
+    """Context manager that does nothing, used in place of a Phase when
+    instrumentation is disabled"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+null_phase = NullPhase()
+
+
+def deep_sizeof(obj, seen=None):
+    """Approximate number of bytes used by obj and everything it references
+    through containers and instance attributes. Objects referenced more than
+    once are counted once"""
+    if seen is None:
+        seen = set()
+    total = 0
+    stack = [obj]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        if isinstance(obj, (str, bytes, bytearray, int, float, type)):
+            continue
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        if hasattr(obj, "__dict__"):
+            stack.append(obj.__dict__)
+    return total
+
+
+class Phase:
+    """Context manager that records the wall time spent in a named phase"""
+
+    def __init__(self, stats, name):
+        self.stats = stats
+        self.name = name
+        self.start = None
+
+    def __enter__(self):
+        if self.stats.memory:
+            self.stats.enter_memory_phase(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        stop = time.perf_counter()
+        if self.stats.memory:
+            self.stats.exit_memory_phase(self)
+        self.stats.add_phase(self.name, self.start, stop)
+        return False
+
+
+class CompileStats:
+    """Wall time per compile phase and counts of compile events (unique gates,
+    binarization cache hits, words emitted...). A phase that runs more than
+    once accumulates its time, and every run is kept as a Chrome trace event
+    (see trace_events), so the output of write_trace can be loaded in
+    chrome://tracing or Perfetto.
+
+    If memory is True, memory allocations are traced with tracemalloc while
+    phases run. The peak memory allocated during each phase and the memory
+    it retains when it finishes (both relative to the start of the phase) are
+    recorded in phase_memory, and the compiler records the size of its major
+    attributes in attribute_sizes. Tracing slows compilation down
+    considerably, so the phase times aren't representative in this mode.
+    Tracing starts with the first phase if it isn't already running, and
+    stop_tracing should be called once the last phase is done. The highest
+    memory traced while the phases ran is kept in peak_memory.
+
+    If the caller is already tracing with tracemalloc, its peak is left
+    alone. The peak of a phase is then only known when it's higher than any
+    earlier peak, and the memory allocated at the end of the phase (or of
+    one of its nested phases) is used in its place otherwise."""
+
+    def __init__(self, memory=False):
+        self.origin = time.perf_counter()
+        self.phase_times = dict()
+        self.phase_calls = defaultdict(int)
+        self.counters = defaultdict(int)
+        self.spans = []
+        self.memory = memory
+        self.phase_memory = dict()
+        self.attribute_sizes = dict()
+        # Phases that are being traced, innermost last, as [phase, start,
+        # peak] where start is the traced memory when the phase started
+        self.memory_stack = []
+        self.started_tracing = False
+        # Highest traced memory seen while phases ran, and the tracemalloc
+        # peak at the last sample (see sample_memory)
+        self.peak_memory = 0
+        self.last_peak = 0
+
+    def __repr__(self):
+        return f"CompileStats(phases: {len(self.phase_times)}, total: {self.total_time:.6f} s)"
+
+    def phase(self, name):
+        return Phase(self, name)
+
+    def add_phase(self, name, start, stop):
+        self.phase_times[name] = self.phase_times.get(name, 0.0) + stop - start
+        self.phase_calls[name] += 1
+        self.spans.append((name, start, stop))
+
+    def start_tracing(self):
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracing = True
+            self.last_peak = 0
+
+    def stop_tracing(self):
+        """Stop tracing memory allocations, if they were traced by this
+        CompileStats"""
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+
+    def sample_memory(self):
+        """Credit the memory allocated since the last sample to the phases
+        being traced, and return the memory currently allocated"""
+        current, peak = tracemalloc.get_traced_memory()
+        # A peak above the last one seen was reached while every phase on the
+        # stack was running. Otherwise the peak since the last sample isn't
+        # known, but it's at least the current memory
+        reached = peak if peak > self.last_peak else current
+        for entry in self.memory_stack:
+            entry[2] = max(entry[2], reached)
+        self.peak_memory = max(self.peak_memory, peak)
+        self.last_peak = peak
+        # Resetting the peak tells the peaks of consecutive phases apart, but
+        # it's only done if tracing was started here, so the peak seen by a
+        # caller that's tracing memory itself isn't changed
+        if self.started_tracing and hasattr(tracemalloc, "reset_peak"):
+            tracemalloc.reset_peak()
+            self.last_peak = current
+        return current
+
+    def enter_memory_phase(self, phase):
+        self.start_tracing()
+        current = self.sample_memory()
+        self.memory_stack.append([phase, current, current])
+
+    def exit_memory_phase(self, phase):
+        current = self.sample_memory()
+        _, start, phase_peak = self.memory_stack.pop()
+        usage = self.phase_memory.setdefault(phase.name, {"peak": 0, "retained": 0})
+        usage["peak"] = max(usage["peak"], phase_peak - start)
+        usage["retained"] += current - start
+
+    def record_sizes(self, obj, names):
+        """Record the deep size of each named attribute of obj in
+        attribute_sizes"""
+        for name in names:
+            if hasattr(obj, name):
+                self.attribute_sizes[name] = deep_sizeof(getattr(obj, name))
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def count_changes(self, before, after):
+        """Add the change in each count between two snapshots (dicts of counts)"""
+        for name, value in after.items():
+            self.counters[name] += value - before.get(name, 0)
+
+    @property
+    def total_time(self):
+        return sum(self.phase_times.values())
+
+    def as_dict(self):
+        return {
+            "phases": dict(self.phase_times),
+            "phase_calls": dict(self.phase_calls),
+            "counters": dict(self.counters),
+            "total_time": self.total_time,
+            "phase_memory": {k: dict(v) for k, v in self.phase_memory.items()},
+            "peak_memory": self.peak_memory,
+            "attribute_sizes": dict(self.attribute_sizes),
+        }
+
+    def report(self):
+        """Human readable summary of the phase times and counters"""
+        width = max(map(len, list(self.phase_times) + list(self.counters) + [""]))
+        lines = ["phase times (s):"]
+        for name, seconds in self.phase_times.items():
+            lines.append(f"  {name:<{width}}  {seconds:.6f}")
+        lines.append(f"  {'total':<{width}}  {self.total_time:.6f}")
+        lines.append("counters:")
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"  {name:<{width}}  {value}")
+        if self.phase_memory:
+            lines.append(f"peak memory (bytes):  {self.peak_memory}")
+            lines.append("phase memory (bytes):  peak  retained")
+            for name, usage in self.phase_memory.items():
+                lines.append(f"  {name:<{width}}  {usage['peak']}  {usage['retained']}")
+        if self.attribute_sizes:
+            lines.append("attribute sizes (bytes):")
+            for name, size in sorted(
+                self.attribute_sizes.items(), key=lambda kv: kv[1], reverse=True
+            ):
+                lines.append(f"  {name:<{width}}  {size}")
+        return "\n".join(lines)
+
+    def trace_events(self):
+        """Phases as Chrome trace complete ("X") events and the final counts as
+        a counter ("C") event, with timestamps in microseconds"""
+        pid = os.getpid()
+        events = [
+            {
+                "name": name,
+                "cat": "compile",
+                "ph": "X",
+                "ts": (start - self.origin) * 1e6,
+                "dur": (stop - start) * 1e6,
+                "pid": pid,
+                "tid": 0,
+            }
+            for name, start, stop in self.spans
+        ]
+        for event in events:
+            if event["name"] in self.phase_memory:
+                event["args"] = dict(self.phase_memory[event["name"]])
+        if self.counters:
+            end = max((stop for _, _, stop in self.spans), default=self.origin)
+            events.append(
+                {
+                    "name": "counters",
+                    "cat": "compile",
+                    "ph": "C",
+                    "ts": (end - self.origin) * 1e6,
+                    "pid": pid,
+                    "tid": 0,
+                    "args": dict(self.counters),
+                }
+            )
+        return events
+
+    def write_trace(self, path):
+        """Write the Chrome trace event JSON to path"""
+        with open(path, "w") as f:
+            json.dump({"traceEvents": self.trace_events(), "displayTimeUnit": "ms"}, f)
@@ -1,5 +1,6 @@
 import timeit
 import cProfile
+import tracemalloc
 
 
 class Benchmark:
@@ -11,6 +12,9 @@ class Benchmark:
 
     def __init__(self):
         self.times = None
+        # Set to a CompileStats while profiling memory, see profile_memory
+        self.stats = None
+        self.peak_memory = None
 
     def setUp(self):
         """Override to set up environment."""
@@ -47,6 +51,22 @@ class Benchmark:
         finally:
             self.tearDown()
 
+    def profile_memory(self):
+        """Run once while tracing memory allocations and record the peak
+        allocated memory. Benchmarks that pass self.stats to the compiler
+        also get the memory used by each compile phase"""
+        from jaqalpaw.utilities.instrumentation import CompileStats
+
+        self.stats = CompileStats(memory=True)
+        self.setUp()
+        tracemalloc.start()
+        try:
+            self.run()
+            self.peak_memory = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+            self.tearDown()
+
     @property
     def time(self):
         return sum(self.times) / len(self.times)
@@ -78,3 +98,13 @@ def profile_benchmarks(benchmarks):
     for bm_cls in benchmarks:
         bm = bm_cls()
         bm.profile()
+
+
+def memory_benchmarks(benchmarks):
+    print("<benchmark>: <peak-memory> bytes")
+    for bm_cls in benchmarks:
+        bm = bm_cls()
+        bm.profile_memory()
+        print(f"{bm_cls.__name__}: {bm.peak_memory} bytes")
+        if bm.stats.phase_memory:
+            print(bm.stats.report())
@@ -9,7 +9,12 @@ from jaqalpaq.core.circuitbuilder import build
 from jaqalpaq.generator import generate_jaqal_program
 
 # from octet.jaqalCompiler import CircuitCompiler
-from benchmark.benchmark import Benchmark, run_benchmarks, profile_benchmarks
+from benchmark.benchmark import (
+    Benchmark,
+    run_benchmarks,
+    profile_benchmarks,
+    memory_benchmarks,
+)
 
 from jaqalpaw.compiler.jaqal_compiler import CircuitCompiler
 
@@ -46,7 +51,7 @@ class ManyGates(Benchmark):
         os.unlink(self.fd.name)
 
     def run(self):
-        cc = CircuitCompiler(self.fd.name)
+        cc = CircuitCompiler(self.fd.name, stats=self.stats)
         cc.bytecode(0xFF)
 
 
@@ -93,7 +98,7 @@ class NestedGates(Benchmark):
             os.unlink(self.fd.name)
 
     def run(self):
-        cc = CircuitCompiler(self.fd.name)
+        cc = CircuitCompiler(self.fd.name, stats=self.stats)
         cc.bytecode(0xFF)
 
 
@@ -434,8 +439,11 @@ def main():
     random.seed(1)  # Make deterministic
     benchmarks = [ManyGates, NestedGates]
     profile = False
+    memory = False
     if profile:
         profile_benchmarks(benchmarks)
+    elif memory:
+        memory_benchmarks(benchmarks)
     else:
         run_benchmarks(benchmarks)
 
@@ -0,0 +1,114 @@
+import gc
+import unittest
+import weakref
+from pathlib import Path
+
+from jaqalpaw.bytecode.binarization_cache import (
+    BinarizationCache,
+    binarization_cache,
+)
+from jaqalpaw.bytecode.pulse_binarization import PulseEncoder
+from jaqalpaw.compiler.jaqal_compiler import CircuitCompiler
+from jaqalpaw.ir.pulse_data import PulseData, binarize_many
+from jaqalpaw.utilities.datatypes import Discrete
+
+ex4 = Path("examples") / "DocumentationSamples" / "ex4.jaqal"
+
+
+def make_pulses():
+    return [
+        PulseData(0, 3e-6, freq0=200e6, amp0=50),
+        PulseData(1, 2e-6, freq1=210e6, amp1=(0, 40, 0)),
+        PulseData(2, 2e-6, phase0=Discrete([0, 90, 180])),
+    ]
+
+
+class BinarizationCacheTester(unittest.TestCase):
+    def test_hits_and_misses(self):
+        cache = BinarizationCache()
+        pd = PulseData(0, 3e-6, freq0=200e6, amp0=50)
+        words = cache.binarize(pd)
+        self.assertEqual(words, PulseEncoder().encode(pd))
+        # Equal pulses share the cached words, bypass is part of the key
+        self.assertIs(cache.binarize(PulseData(0, 3e-6, freq0=200e6, amp0=50.0)), words)
+        self.assertIsNot(cache.binarize(pd, bypass=True), words)
+        self.assertEqual(
+            cache.stats,
+            {
+                "hits": 1,
+                "misses": 2,
+                "evictions": 0,
+                "entries": 2,
+                "bytes": sum(map(len, words)) * 2,
+            },
+        )
+
+    def test_eviction(self):
+        pds = make_pulses()
+        sizes = [sum(map(len, PulseEncoder().encode(pd))) for pd in pds]
+        cache = BinarizationCache(max_bytes=sizes[0] + sizes[1])
+        for pd in pds[:2]:
+            cache.binarize(pd)
+        cache.binarize(pds[0])
+        # The least recently used entry is evicted first
+        cache.binarize(pds[2])
+        self.assertEqual(cache.evictions, 1)
+        self.assertEqual(
+            list(cache.entries), [(pds[0].digest, False), (pds[2].digest, False)]
+        )
+        self.assertLessEqual(cache.bytes, cache.max_bytes)
+        cache.resize(0)
+        self.assertEqual((len(cache), cache.bytes, cache.evictions), (0, 0, 3))
+
+    def test_clear(self):
+        cache = BinarizationCache()
+        pd = make_pulses()[1]
+        cache.binarize(pd)
+        cache.clear()
+        self.assertEqual((len(cache), cache.bytes), (0, 0))
+        cache.binarize(pd)
+        self.assertEqual((cache.hits, cache.misses), (0, 2))
+
+    def test_pulses_are_not_kept_alive(self):
+        cache = BinarizationCache()
+        pd = make_pulses()[0]
+        ref = weakref.ref(pd)
+        cache.binarize(pd)
+        del pd
+        gc.collect()
+        self.assertIsNone(ref())
+        self.assertEqual(len(cache), 1)
+
+    def test_binarize_many(self):
+        cache = BinarizationCache()
+        pds = make_pulses()
+        cache.binarize(pds[0])
+        batch = pds + [PulseData(1, 2e-6, freq1=210e6, amp1=(0.0, 40.0, 0.0))]
+        words = cache.binarize_many(batch)
+        self.assertEqual(words, [PulseEncoder().encode(pd) for pd in batch])
+        self.assertIs(words[1], words[3])
+        self.assertEqual((cache.hits, cache.misses), (2, 3))
+        self.assertEqual(cache.binarize_many([]), [])
+        # The module level function also records the words on each pulse
+        words = binarize_many(pds, bypass=True)
+        self.assertEqual([pd.binary_data for pd in pds], words)
+
+    def test_shared_between_compilers(self):
+        binarization_cache.clear()
+        first = CircuitCompiler(file=ex4, stats=True)
+        first.compile()
+        counters = first.stats.counters
+        misses = counters["binarize_cache_misses"]
+        self.assertGreater(misses, 0)
+        second = CircuitCompiler(file=ex4, stats=True)
+        second.compile()
+        self.assertEqual(second.stats.counters["binarize_cache_misses"], 0)
+        self.assertEqual(
+            second.stats.counters["binarize_cache_hits"],
+            counters["binarize_cache_hits"] + misses,
+        )
+        self.assertEqual(first.bytecode(0xFF), second.bytecode(0xFF))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+import tempfile
+import unittest
+from collections import defaultdict
+from pathlib import Path
+
+import jaqalpaq.core.branch
+
+from jaqalpaw.bytecode.encoding_parameters import (
+    ANCILLA_COMPILER_TAG_BIT,
+    ANCILLA_STATE_LSB,
+)
+from jaqalpaw.compiler.jaqal_compiler import CircuitCompiler
+from jaqalpaw.utilities.exceptions import CircuitCompilerException
+
+TAG = 1 << ANCILLA_COMPILER_TAG_BIT
+
+branch_code = """from qscout.v1.std usepulses *
+register q[2]
+prepare_all
+Rx q[0] 0.5
+branch {
+  '0' : { Rx q[0] 0.5 ; Ry q[0] 0.25 }
+  '1' : { Rx q[0] 0.25 }
+}
+Rx q[0] 0.75
+branch {
+  '0' : { Rx q[0] 0.5 ; Ry q[0] 0.25 }
+  '1' : { Rx q[0] 0.25 }
+}
+measure_all
+"""
+
+
+class BranchAllocationTester(unittest.TestCase):
+    def setUp(self):
+        use_branch = jaqalpaq.core.branch.USE_EXPERIMENTAL_BRANCH
+        jaqalpaq.core.branch.USE_EXPERIMENTAL_BRANCH = True
+        self.addCleanup(
+            setattr, jaqalpaq.core.branch, "USE_EXPERIMENTAL_BRANCH", use_branch
+        )
+        self.cc = CircuitCompiler(file=Path("examples") / "test_std.jaqal")
+        self.cc.branches = defaultdict(dict)
+        self.cc.branch_gate_ids = defaultdict(dict)
+        self.cc.branch_index_states = defaultdict(dict)
+
+    def test_identical_branches_share_range(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "branch.jaqal"
+            path.write_text(branch_code)
+            cc = CircuitCompiler(file=path)
+            cc.compile()
+        for ch in range(3):
+            tagged = [g for g in cc.gate_sequence_ids[ch] if g & TAG]
+            self.assertEqual(tagged, [TAG, TAG | 1] * 2)
+            self.assertEqual(len(cc.branches[ch]), 1)
+            tagged_glut = [gid for gid in cc.GLUT_data[ch] if gid & TAG]
+            self.assertEqual(
+                sorted(tagged_glut), [TAG, TAG | 1, TAG | 1 << ANCILLA_STATE_LSB]
+            )
+
+    def test_overlapping_ranges(self):
+        state1 = 1 << ANCILLA_STATE_LSB
+        cases = {0: [1, 2], state1: [3, 6]}
+        self.assertEqual(self.cc.allocate_branch_range(0, cases), 0)
+        self.assertEqual(self.cc.allocate_branch_range(0, dict(cases)), 0)
+        # Overlaps the second gate of each case of the first branch
+        self.assertEqual(self.cc.allocate_branch_range(0, {0: [2, 5], state1: [6]}), 1)
+        # The shorter case of the second branch reserves the address after it
+        self.assertEqual(self.cc.allocate_branch_range(0, {0: [5], state1: [8]}), 3)
+        # Other channels are independent
+        self.assertEqual(self.cc.allocate_branch_range(1, {0: [5], state1: [8]}), 0)
+        self.assertEqual(
+            self.cc.branch_gate_ids[0],
+            {
+                0: 1,
+                1: 2,
+                2: 5,
+                3: 5,
+                state1: 3,
+                state1 + 1: 6,
+                state1 + 2: -1,
+                state1 + 3: 8,
+            },
+        )
+
+    def test_branches_with_different_states(self):
+        state1 = 1 << ANCILLA_STATE_LSB
+        state2 = 2 << ANCILLA_STATE_LSB
+        branches = [
+            {0: [1, 2], state1: [3]},
+            {0: [2, 5]},
+            {state1: [4]},
+            {0: [2], state2: [8]},
+            {0: [5]},
+        ]
+        starts = [self.cc.allocate_branch_range(0, cases) for cases in branches]
+        self.assertEqual(starts, [0, 2, 4, 5, 3])
+        # Every state read out for a branch streams into addresses holding
+        # that branch's gates, or into addresses that aren't programmed
+        states = {offset for cases in branches for offset in cases}
+        assigned = self.cc.branch_gate_ids[0]
+        for start, cases in zip(starts, branches):
+            length = max(map(len, cases.values()))
+            for state in states:
+                gids = cases.get(state, [])
+                for n in range(length):
+                    gid = assigned.get(start + state + n, -1)
+                    self.assertEqual(gid, gids[n] if n < len(gids) else -1)
+
+    def test_out_of_addresses(self):
+        for gid in range(1 << ANCILLA_STATE_LSB):
+            self.cc.allocate_branch_range(0, {0: [gid]})
+        with self.assertRaises(CircuitCompilerException):
+            self.cc.allocate_branch_range(0, {0: [1 << ANCILLA_STATE_LSB]})
+
+
+if __name__ == "__main__":
+    unittest.main()
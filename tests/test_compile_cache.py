@@ -0,0 +1,121 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from jaqalpaw.compiler.compile_cache import CompileCache
+from jaqalpaw.compiler.jaqal_compiler import CircuitCompiler
+
+example = Path("examples") / "test_std"
+
+
+def joined_bytecode(cc):
+    return b"".join(w for q in cc.bytecode(0xFF) for qq in q for w in qq)
+
+
+class CompileCacheTester(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def test_cache_hit_matches_waveform(self):
+        expected = example.with_suffix(".wvf").read_bytes()
+        cache = CompileCache(self.tmpdir.name)
+        for _ in range(2):
+            cc = CircuitCompiler(
+                file=example.with_suffix(".jaqal"), compile_cache=cache
+            )
+            self.assertEqual(joined_bytecode(cc), expected)
+        self.assertEqual(cache.stats["hits"], 1)
+        self.assertEqual(cache.stats["misses"], 1)
+        self.assertEqual(cache.stats["entries"], 1)
+        # A cached compile can still be streamed and packed into buffers
+        self.assertEqual(b"".join(cc.iter_bytecode(0xFF)), expected)
+
+    def test_cache_hit_replaces_previous_compile(self):
+        path = example.with_suffix(".jaqal")
+        cache = CompileCache(self.tmpdir.name)
+        override = {"pi": 1.5}
+        expected = CircuitCompiler(file=path, override_dict=override)
+        expected.compile()
+        CircuitCompiler(
+            file=path, override_dict=override, compile_cache=cache
+        ).compile()
+        cc = CircuitCompiler(file=path, compile_cache=cache, stats=True)
+        cc.compile()
+        cc.override_dict = override
+        cc.compile()
+        self.assertTrue(cc.cache_hit)
+        self.assertEqual(cc.stats.counters["compile_cache_hits"], 1)
+        self.assertEqual(cc.stats.counters["compile_cache_misses"], 1)
+        self.assertEqual(cc.stats.phase_calls["compile_cache"], 2)
+        # Nothing is left from the first compile
+        self.assertFalse(cc.unique_gates)
+        self.assertTrue(
+            all(
+                gate[2] is None
+                for entry in cc.lut_report().values()
+                for gate in entry["top_gates"]
+            )
+        )
+        self.assertEqual(
+            cc.generate_gate_sequence_from_index(0),
+            expected.generate_gate_sequence_from_index(0),
+        )
+        self.assertEqual(cc.streaming_data(), expected.streaming_data())
+        self.assertEqual(cc.bytecode(0xFF), expected.bytecode(0xFF))
+
+    def test_key_depends_on_inputs(self):
+        path = example.with_suffix(".jaqal")
+        keys = {
+            CircuitCompiler(file=path).cache_key(),
+            CircuitCompiler(file=path, override_dict={"pi": 0.5}).cache_key(),
+            CircuitCompiler(file=path, global_delay=1e-6).cache_key(),
+            CircuitCompiler(file=path, num_channels=16).cache_key(),
+        }
+        self.assertEqual(len(keys), 4)
+        self.assertEqual(
+            CircuitCompiler(file=path, override_dict={"pi": 0.5}).cache_key(),
+            CircuitCompiler(file=path, override_dict={"pi": 0.5}).cache_key(),
+        )
+
+    def test_eviction(self):
+        cache = CompileCache(self.tmpdir.name, max_bytes=1 << 40)
+        for n in range(3):
+            cache.put(f"key{n}", bytes(1000))
+            os.utime(cache.path(f"key{n}"), (n, n))
+        cache.get("key0")  # most recently used
+        cache.max_bytes = 2500
+        cache.evict()
+        self.assertEqual(cache.evictions, 1)
+        self.assertIsNotNone(cache.get("key0"))
+        self.assertIsNotNone(cache.get("key2"))
+        self.assertIsNone(cache.get("key1"))
+
+    def test_corrupt_entry_is_a_miss(self):
+        cache = CompileCache(self.tmpdir.name)
+        for n, data in enumerate(
+            (b"\x80\x05not a pickle", b"\x80\x09", b"\x80\x04\x95", b"", b"K")
+        ):
+            cache.path("bad").write_bytes(data)
+            self.assertIsNone(cache.get("bad"))
+            self.assertEqual(cache.misses, n + 1)
+            self.assertFalse(cache.path("bad").exists())
+        # A corrupt entry doesn't stop a compile
+        cc = CircuitCompiler(file=example.with_suffix(".jaqal"), compile_cache=cache)
+        cache.path(cc.cache_key()).write_bytes(b"\x80\x09")
+        self.assertEqual(joined_bytecode(cc), example.with_suffix(".wvf").read_bytes())
+        self.assertFalse(cc.cache_hit)
+
+    def test_stats_skip_removed_entries(self):
+        cache = CompileCache(self.tmpdir.name)
+        cache.put("key", bytes(1000))
+        removed = cache.path("removed")
+        with patch.object(cache, "entries", lambda: [cache.path("key"), removed]):
+            self.assertEqual(cache.stats["entries"], 1)
+            self.assertGreater(cache.size, 1000)
+
+
+if __name__ == "__main__":
+    unittest.main()
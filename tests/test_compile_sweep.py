@@ -0,0 +1,23 @@
+import unittest
+from pathlib import Path
+
+from jaqalpaw.compiler.jaqal_compiler import CircuitCompiler
+
+example = Path("examples") / "test_std.jaqal"
+
+
+class CompileSweepTester(unittest.TestCase):
+    def test_sweep_matches_individual_compiles(self):
+        points = [{"pi": 3.141592653589793}, {"pi": 1.5}, {"pi": 0.25}]
+        cc = CircuitCompiler(file=example)
+        swept = cc.compile_sweep(points, channel_mask=0xFF)
+        self.assertEqual(len(swept), len(points))
+        for override_dict, result in zip(points, swept):
+            single = CircuitCompiler(file=example, override_dict=override_dict)
+            self.assertEqual(result, single.bytecode(0xFF))
+
+    def test_sweep_shares_gate_data(self):
+        cc = CircuitCompiler(file=example)
+        first, second = cc.compile_sweep([{"pi": 1.5}, {"pi": 1.5}])
+        self.assertEqual(first, second)
+        self.assertIsNone(cc.gate_cache)
@@ -0,0 +1,175 @@
+import contextlib
+import io
+import json
+import tempfile
+import tracemalloc
+import unittest
+from pathlib import Path
+
+from jaqalpaw._cli import main
+from jaqalpaw.compiler.jaqal_compiler import CircuitCompiler
+from jaqalpaw.utilities.instrumentation import CompileStats, deep_sizeof
+
+ex4 = Path("examples") / "DocumentationSamples" / "ex4.jaqal"
+modulated_ms = Path("examples") / "ModulatedMS" / "Exemplar_ModulatedMS.jaqal"
+
+compile_phases = [
+    "parse",
+    "convert_circuit_to_gateslices",
+    "apply_delays",
+    "extract_gates",
+    "generate_lookup_tables",
+    "pack_sequence",
+    "generate_programming_data",
+]
+
+
+class InstrumentationTester(unittest.TestCase):
+    def test_compile_stats(self):
+        cc = CircuitCompiler(file=ex4, stats=True)
+        programming_data, sequence_data = cc.bytecode(0xFF)
+        stats = cc.stats
+        self.assertEqual(list(stats.phase_times), compile_phases)
+        self.assertTrue(all(t >= 0 for t in stats.phase_times.values()))
+        counters = stats.as_dict()["counters"]
+        self.assertEqual(
+            counters["unique_gates"], sum(map(len, cc.unique_gates.values()))
+        )
+        self.assertEqual(
+            counters["words_emitted"],
+            sum(map(len, programming_data)) + sum(map(len, sequence_data)),
+        )
+        self.assertEqual(
+            counters["binarize_cache_hits"] + counters["binarize_cache_misses"],
+            sum(
+                len(cc.unique_gates[ch][h])
+                for ch in cc.unique_gates
+                for h in cc.unique_gates[ch]
+            ),
+        )
+        self.assertEqual(
+            CircuitCompiler(file=ex4).bytecode(0xFF),
+            (programming_data, sequence_data),
+        )
+
+    def test_spline_fits_and_streamed_words(self):
+        stats = CompileStats()
+        cc = CircuitCompiler(file=modulated_ms, stats=stats)
+        cc.compile(pack_sequence=False)
+        self.assertGreater(stats.counters["spline_fits"], 0)
+        self.assertEqual(stats.counters["sequence_words"], 0)
+        nwords = sum(1 for _ in cc.iter_bytecode(0xFF))
+        self.assertEqual(stats.counters["words_emitted"], nwords)
+
+    def test_lazy_sequence_packing_is_timed(self):
+        for output in (
+            lambda cc: b"".join(cc.iter_bytecode(0xFF)),
+            lambda cc: cc.bytecode(0xFF),
+            lambda cc: cc.bytecode_buffers(0xFF),
+        ):
+            cc = CircuitCompiler(file=ex4, stats=True)
+            cc.compile(pack_sequence=False)
+            self.assertNotIn("pack_sequence", cc.stats.phase_times)
+            output(cc)
+            self.assertGreater(cc.stats.phase_calls["pack_sequence"], 0)
+        # Words that were already packed aren't timed again
+        calls = cc.stats.phase_calls["pack_sequence"]
+        cc.compile()
+        b"".join(cc.iter_bytecode(0xFF))
+        cc.bytecode(0xFF)
+        self.assertEqual(cc.stats.phase_calls["pack_sequence"], calls + 1)
+
+    def test_words_counted_once_per_compile(self):
+        cc = CircuitCompiler(file=ex4, stats=True)
+        programming_data, sequence_data = cc.bytecode(0xFF)
+        nwords = sum(map(len, programming_data)) + sum(map(len, sequence_data))
+        cc.bytecode(0xFF)
+        self.assertEqual(sum(1 for _ in cc.iter_bytecode(0xFF)), nwords)
+        self.assertEqual(cc.stats.counters["words_emitted"], nwords)
+        cc.compile()
+        cc.bytecode(0xFF)
+        self.assertEqual(cc.stats.counters["words_emitted"], 2 * nwords)
+
+    def test_trace_events(self):
+        cc = CircuitCompiler(file=ex4, stats=True)
+        cc.compile()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "trace.json"
+            cc.stats.write_trace(path)
+            trace = json.loads(path.read_text())
+        events = trace["traceEvents"]
+        spans = [e for e in events if e["ph"] == "X"]
+        self.assertEqual([e["name"] for e in spans], compile_phases)
+        pack, programming = spans[-2:]
+        self.assertLessEqual(programming["ts"], pack["ts"])
+        self.assertLessEqual(
+            pack["ts"] + pack["dur"], programming["ts"] + programming["dur"]
+        )
+        (counters,) = [e for e in events if e["ph"] == "C"]
+        self.assertEqual(counters["args"], dict(cc.stats.counters))
+
+    def test_memory_profile(self):
+        cc = CircuitCompiler(file=ex4, profile_memory=True)
+        cc.compile()
+        stats = cc.stats
+        self.assertFalse(tracemalloc.is_tracing())
+        self.assertEqual(list(stats.phase_memory), compile_phases)
+        for usage in stats.phase_memory.values():
+            self.assertGreaterEqual(usage["peak"], usage["retained"])
+        # Peaks of nested phases are included in the enclosing phase
+        self.assertGreaterEqual(
+            stats.phase_memory["generate_programming_data"]["peak"],
+            stats.phase_memory["pack_sequence"]["peak"],
+        )
+        self.assertGreater(stats.phase_memory["extract_gates"]["retained"], 0)
+        self.assertEqual(set(stats.attribute_sizes), set(cc.profiled_attributes))
+        self.assertEqual(stats.attribute_sizes["GSEQ_bin"], deep_sizeof(cc.GSEQ_bin))
+        self.assertIn("attribute sizes", stats.report())
+        self.assertGreaterEqual(
+            stats.peak_memory, max(u["peak"] for u in stats.phase_memory.values())
+        )
+        self.assertEqual(CircuitCompiler(file=ex4).bytecode(0xFF), cc.bytecode(0xFF))
+
+    def test_external_memory_tracing(self):
+        size = 1 << 24
+        tracemalloc.start()
+        try:
+            block = bytearray(size)
+            del block
+            cc = CircuitCompiler(file=ex4, profile_memory=True)
+            cc.compile()
+            self.assertTrue(tracemalloc.is_tracing())
+            # The peak seen by the caller isn't reset by the phases
+            self.assertGreaterEqual(tracemalloc.get_traced_memory()[1], size)
+        finally:
+            tracemalloc.stop()
+        self.assertGreaterEqual(cc.stats.peak_memory, size)
+        self.assertEqual(list(cc.stats.phase_memory), compile_phases)
+        for usage in cc.stats.phase_memory.values():
+            self.assertLess(usage["peak"], size)
+
+    def test_deep_sizeof(self):
+        shared = [1.5] * 100
+        self.assertGreater(deep_sizeof([shared]), deep_sizeof(shared))
+        self.assertEqual(
+            deep_sizeof([shared, shared]) - deep_sizeof([shared]),
+            deep_sizeof([None, None]) - deep_sizeof([None]),
+        )
+
+    def test_cli(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "trace.json"
+            stderr = io.StringIO()
+            with contextlib.redirect_stderr(stderr):
+                main([str(ex4), "-s", "--stats", "--trace", str(path)])
+            self.assertIn("extract_gates", stderr.getvalue())
+            self.assertIn("unique_gates", stderr.getvalue())
+            self.assertTrue(json.loads(path.read_text())["traceEvents"])
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            main([str(ex4), "-s", "--memory"])
+        self.assertIn("phase memory", stderr.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+
+from jaqalpaw.bytecode.encoding_parameters import GPRGW, PLUTW, SLUTW
+from jaqalpaw.compiler.lut_allocator import LUTAllocator
+from jaqalpaw.utilities.exceptions import CircuitCompilerException
+
+
+def word(n):
+    return n.to_bytes(32, "little")
+
+
+class LUTAllocatorTester(unittest.TestCase):
+    def test_plut_words_are_deduplicated(self):
+        alloc = LUTAllocator(0)
+        words = [bytes([n]) * 32 for n in (1, 2, 1, 3, 2)]
+        self.assertEqual(alloc.add_gate(0, words[:2]), (0, 1))
+        self.assertEqual(alloc.add_gate(1, words[2:]), (2, 4))
+        self.assertEqual(alloc.PLUT, {words[0]: 0, words[1]: 1, words[3]: 2})
+        self.assertEqual(alloc.MMAP, {0: 0, 1: 1, 2: 0, 3: 2, 4: 1})
+        self.assertEqual(alloc.occupancy, {"PLUT": 3, "MMAP": 5, "GLUT": 2})
+
+    def test_alias_gate(self):
+        alloc = LUTAllocator(0)
+        alloc.add_gate(0, [b"\x01" * 32])
+        alloc.alias_gate(1 << 11, 0)
+        self.assertEqual(alloc.GLUT[1 << 11], alloc.GLUT[0])
+
+    def test_plut_overflow(self):
+        alloc = LUTAllocator(3)
+        words = [word(n) for n in range(1 << PLUTW)]
+        alloc.add_gate(0, words)
+        with self.assertRaisesRegex(CircuitCompilerException, "PLUT .* channel 3"):
+            alloc.add_gate(1, [word(1 << PLUTW)])
+        # Words that are already stored don't need new entries
+        with self.assertRaisesRegex(CircuitCompilerException, "MMAP"):
+            alloc.add_gate(1, words[:1])
+
+    def test_mmap_overflow_is_checked_after_sharing(self):
+        words = [word(n) for n in range(8)]
+        ngates = (1 << SLUTW) // len(words) + 1
+        alloc = LUTAllocator(0)
+        with self.assertRaisesRegex(CircuitCompilerException, "MMAP"):
+            for gid in range(ngates):
+                alloc.add_gate(gid, words)
+        alloc = LUTAllocator(0, check_mmap=False)
+        for gid in range(ngates):
+            alloc.add_gate(gid, words)
+        alloc.share_mmap()
+        self.assertEqual(len(alloc.MMAP), len(words))
+
+    def test_glut_overflow(self):
+        alloc = LUTAllocator(0)
+        alloc.add_gate((1 << GPRGW) - 1, [word(0)])
+        with self.assertRaisesRegex(CircuitCompilerException, "GLUT"):
+            alloc.add_gate(1 << GPRGW, [word(0)])
+        with self.assertRaisesRegex(CircuitCompilerException, "GLUT"):
+            alloc.alias_gate(1 << GPRGW, 0)
@@ -0,0 +1,122 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from jaqalpaw.bytecode.encoding_parameters import PLUTW
+from jaqalpaw.compiler.jaqal_compiler import CircuitCompiler
+from jaqalpaw.compiler.lut_allocator import (
+    LUTAllocator,
+    merge_lut_image,
+    save_lut_image,
+    load_lut_image,
+)
+
+example = Path("examples") / "DocumentationSamples" / "ex4.jaqal"
+
+
+def resolve_gate(image, gid):
+    """Look up the pulse words of a gate the same way the LUTs are traversed"""
+    start, end = image["GLUT"][gid]
+    return [image["PLUT"][image["MMAP"][addr]] for addr in range(start, end + 1)]
+
+
+def programming_word_count(cc):
+    return sum(
+        len(cc.PLUT_bin[ch]) + len(cc.MMAP_bin[ch]) + len(cc.GLUT_bin[ch])
+        for ch in range(cc.channel_num)
+    )
+
+
+class LUTDeltaTester(unittest.TestCase):
+    def test_unchanged_recompile_is_empty(self):
+        image = CircuitCompiler(file=example).lut_image()
+        cc = CircuitCompiler(file=example, previous_lut_image=image)
+        cc.compile()
+        for ch in range(cc.channel_num):
+            self.assertEqual(cc.programming_tables(ch), ({}, {}, {}))
+        self.assertEqual(cc.lut_image(), image)
+
+    def test_delta_programs_same_gates(self):
+        examples = [
+            (Path("examples") / "test_sk1.jaqal", {"pi": 3.0}),
+            (Path("examples") / "test_std.jaqal", {"pi": 1.5}),
+            (
+                Path("examples") / "ModulatedMS" / "Exemplar_ModulatedMS.jaqal",
+                {"ms_loops": 2, "global_duration": 1.5e-4},
+            ),
+        ]
+        for path, override in examples:
+            image = CircuitCompiler(file=path).lut_image()
+            full = CircuitCompiler(file=path, override_dict=override)
+            full.compile()
+            delta = CircuitCompiler(
+                file=path, override_dict=override, previous_lut_image=image
+            )
+            delta.compile()
+            self.assertLess(programming_word_count(delta), programming_word_count(full))
+            full_image = full.lut_image()
+            # Programming the delta on top of the previous image gives the same
+            # pulse words for each gate as programming the full LUTs
+            delta_image = delta.lut_image()
+            for ch in range(full.channel_num):
+                self.assertEqual(
+                    merge_lut_image(image[ch], *delta.programming_tables(ch)),
+                    delta_image[ch],
+                )
+                for gid in full_image[ch]["GLUT"]:
+                    self.assertEqual(
+                        resolve_gate(delta_image[ch], gid),
+                        resolve_gate(full_image[ch], gid),
+                    )
+            self.assertEqual(delta.gate_sequence_ids, full.gate_sequence_ids)
+
+    def test_stable_addresses(self):
+        words = [bytes([n]) * 32 for n in range(6)]
+        allocator = LUTAllocator()
+        allocator.add_gate(0, words[:3])
+        allocator.add_gate(1, words[3:5])
+        image = merge_lut_image(None, allocator.PLUT, allocator.MMAP, allocator.GLUT)
+        allocator = LUTAllocator(image=image)
+        # gate 0 changes its last word, gate 1 is unchanged but renumbered
+        allocator.add_gate(0, words[:2] + [words[5]])
+        allocator.add_gate(2, words[3:5])
+        PLUT, MMAP, GLUT = allocator.delta()
+        self.assertEqual(PLUT, {words[5]: 5})
+        self.assertEqual(GLUT, {2: (3, 4)})
+        self.assertEqual(MMAP, {2: 5})
+
+    def test_new_words_skip_retained_addresses(self):
+        # The image fills the PLUT, so new words go to addresses with words
+        # that aren't needed anymore
+        words = [n.to_bytes(32, "little") for n in range(1 << PLUTW)]
+        allocator = LUTAllocator()
+        allocator.add_gate(0, words)
+        image = merge_lut_image(None, allocator.PLUT, allocator.MMAP, allocator.GLUT)
+        new_word = bytes([0xFF]) * 32
+        gates = [[new_word], words[:3]]
+        allocator = LUTAllocator(image=image)
+        allocator.retain_words(word for gate in gates for word in gate)
+        for gid, gate in enumerate(gates):
+            allocator.add_gate(gid, gate)
+        PLUT, _, _ = allocator.delta()
+        self.assertEqual(PLUT, {new_word: 3})
+        self.assertEqual([allocator.PLUT[w] for w in words[:3]], [0, 1, 2])
+
+    def test_save_and_load(self):
+        image = CircuitCompiler(file=example).lut_image()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = Path(tmpdir) / "lut_image.pkl"
+            save_lut_image(image, filename)
+            self.assertEqual(load_lut_image(filename), image)
+
+    def test_delta_sweep(self):
+        points = [{"pi": 3.141592653589793}, {"pi": 1.5}, {"pi": 1.5}]
+        cc = CircuitCompiler(file=Path("examples") / "test_std.jaqal")
+        first, second, third = cc.compile_sweep(points, 0xFF, delta=True)
+        self.assertEqual(first, CircuitCompiler(file=cc.file).bytecode(0xFF))
+        self.assertEqual(second[1], third[1])
+        self.assertLess(len(third[0][0]), len(second[0][0]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,177 @@
+import unittest
+from itertools import islice
+from unittest.mock import patch
+
+import numpy as np
+
+from jaqalpaw.bytecode.binary_conversion import int_to_bytes
+from jaqalpaw.bytecode import lut_programming
+from jaqalpaw.bytecode.lut_programming import (
+    MIN_BULK_ENTRIES,
+    expand_gate_sequence,
+    gate_sequence_bytes,
+    gate_sequence_word_count,
+    iterate_GLUT_words,
+    iterate_SLUT_words,
+    iterate_gate_sequence,
+    iterate_gate_sequence_arrays,
+    iterate_gate_sequence_words,
+    pack_GLUT_words,
+    pack_SLUT_words,
+    pack_gate_sequence_words,
+    program_array,
+    program_GLUT,
+    program_SLUT,
+)
+from jaqalpaw.bytecode.encoding_parameters import (
+    ANCILLA_COMPILER_TAG_BIT,
+    GLUT_BYTECNT,
+    GSEQ_BYTECNT,
+    SLUT_BYTECNT,
+)
+from jaqalpaw.utilities.datatypes import Loop
+from jaqalpaw.utilities.exceptions import CircuitCompilerException
+
+TAG = 1 << ANCILLA_COMPILER_TAG_BIT
+
+
+def scalar_words(words):
+    return list(map(int_to_bytes, words))
+
+
+class GateSequenceTester(unittest.TestCase):
+    def test_nested_loops_expand_lazily(self):
+        glist = [0, Loop([1, Loop([2, 3], repeats=2)], repeats=3), 4]
+        expanded = [0] + [1, 2, 3, 2, 3] * 3 + [4]
+        self.assertEqual(list(iterate_gate_sequence(glist)), expanded)
+
+    def test_loop_packing_matches_unrolled(self):
+        body = [5, 6, TAG | 0, TAG | 1, 7]
+        glist = [1, 2, Loop(body, repeats=40), 3]
+        flat = [1, 2] + body * 40 + [3]
+        for ch in range(3):
+            self.assertEqual(
+                gate_sequence_bytes(glist, ch), gate_sequence_bytes(flat, ch)
+            )
+
+    def test_expand_gate_sequence(self):
+        glist = [0, Loop([1, Loop([2, TAG | 3], repeats=2)], repeats=3), 4] * 5
+        self.assertEqual(
+            expand_gate_sequence(glist).tolist(), list(iterate_gate_sequence(glist))
+        )
+        self.assertEqual(expand_gate_sequence([]).tolist(), [])
+
+    def test_word_count(self):
+        body = [TAG | 4] * (GSEQ_BYTECNT + 1) + [5, 6]
+        sequences = [
+            [],
+            [1, 2, 3],
+            [TAG | 1] + [2] * (2 * GSEQ_BYTECNT),
+            [1, Loop(body, repeats=7), TAG | 2, Loop([], repeats=3), 3],
+            [Loop([TAG | 1, Loop(body, repeats=3), 2], repeats=1000)] * 2,
+            [Loop(body, repeats=0), 7],
+        ]
+        for glist in sequences:
+            with self.subTest(glist=glist):
+                self.assertEqual(
+                    gate_sequence_word_count(glist),
+                    sum(1 for _ in iterate_gate_sequence_words(glist)),
+                )
+        # Loops aren't expanded to count the words
+        glist = [Loop([3] * 5, repeats=10**12)]
+        self.assertEqual(
+            gate_sequence_word_count(glist), -(-5 * 10**12 // GSEQ_BYTECNT)
+        )
+
+
+class BulkPackingTester(unittest.TestCase):
+    # Sizes around multiples of the number of entries in a word
+    sizes = sorted(
+        {0, 1, 7, MIN_BULK_ENTRIES + 1, 1000}
+        | {
+            k * n + d
+            for n in (SLUT_BYTECNT, GLUT_BYTECNT)
+            for k in (1, 3)
+            for d in (-1, 0, 1)
+        }
+    )
+
+    def test_SLUT_matches_scalar(self):
+        rng = np.random.default_rng(1)
+        for n in self.sizes:
+            addrs = rng.permutation(1 << 12)[:n].tolist()
+            lut = dict(zip(addrs, rng.integers(0, 1 << 12, n).tolist()))
+            with self.subTest(entries=n):
+                expected = scalar_words(iterate_SLUT_words(lut, 5))
+                self.assertEqual(
+                    program_array(pack_SLUT_words(addrs, list(lut.values()), 5)),
+                    expected,
+                )
+                self.assertEqual(program_SLUT(lut, 5), expected)
+
+    def test_GLUT_matches_scalar(self):
+        rng = np.random.default_rng(2)
+        for n in self.sizes:
+            addrs = rng.permutation(1 << 12)[:n].tolist()
+            starts = rng.integers(0, 1 << 11, n).tolist()
+            stops = [s + 17 for s in starts]
+            lut = dict(zip(addrs, zip(starts, stops)))
+            with self.subTest(entries=n):
+                expected = scalar_words(iterate_GLUT_words(lut, 9))
+                self.assertEqual(
+                    program_array(pack_GLUT_words(addrs, starts, stops, 9)), expected
+                )
+                self.assertEqual(program_GLUT(lut, 9), expected)
+
+    def test_invalid_addresses(self):
+        with self.assertRaisesRegex(CircuitCompilerException, "MMAP LUT"):
+            pack_SLUT_words([0, 1 << 12], [0, 0])
+        with self.assertRaisesRegex(CircuitCompilerException, "GLUT"):
+            pack_GLUT_words([-1], [0], [0])
+
+    def test_gate_sequence_matches_scalar(self):
+        rng = np.random.default_rng(3)
+        for n in self.sizes:
+            for tag_rate in (0, 0.05, 0.5, 1):
+                gids = rng.integers(0, 1 << 9, n)
+                gids[rng.random(n) < tag_rate] |= TAG
+                # Long runs of tagged and untagged ids span several words
+                gids = np.repeat(gids, rng.integers(1, 3 * GSEQ_BYTECNT, n))
+                with self.subTest(gates=len(gids), tag_rate=tag_rate):
+                    self.assertEqual(
+                        program_array(pack_gate_sequence_words(gids, 4)),
+                        scalar_words(iterate_gate_sequence_words(gids.tolist(), 4)),
+                    )
+
+    def test_gate_sequence_bytes_with_loops(self):
+        body = [5, TAG | 6, TAG | 7] + [8] * GSEQ_BYTECNT
+        glist = [1, Loop([Loop(body, repeats=3), 2], repeats=20), 3]
+        self.assertEqual(
+            gate_sequence_bytes(glist, 6),
+            scalar_words(iterate_gate_sequence_words(glist, 6)),
+        )
+
+    def test_gate_sequence_chunks(self):
+        body = [5, TAG | 6, TAG | 7] + [8] * GSEQ_BYTECNT + [TAG | 9] * 40
+        sequences = [
+            [TAG | 1] * 1000 + [2] * 999,
+            [1, Loop([Loop(body, repeats=3), 2], repeats=20), 3],
+            [Loop([TAG | 4] * 300, repeats=7), Loop([TAG | 5], repeats=500)],
+        ]
+        # Small chunks, so runs of tagged ids and loops cross chunk boundaries
+        for size in (100, 257, 1 << 16):
+            with patch.object(lut_programming, "GSEQ_CHUNK_SIZE", size):
+                for glist in sequences:
+                    with self.subTest(size=size, glist=glist):
+                        self.assertEqual(
+                            gate_sequence_bytes(glist, 2),
+                            scalar_words(iterate_gate_sequence_words(glist, 2)),
+                        )
+
+    def test_gate_sequence_arrays_are_bounded(self):
+        glist = [1, Loop([2, Loop([3] * 50, repeats=4)], repeats=10**9), 4]
+        arrays = iterate_gate_sequence_arrays(glist, 1000)
+        expected = iterate_gate_sequence(glist)
+        for gids in islice(arrays, 100):
+            self.assertLessEqual(len(gids), 1000)
+            self.assertEqual(gids.tolist(), list(islice(expected, len(gids))))
@@ -0,0 +1,80 @@
+import contextlib
+import io
+import tempfile
+import unittest
+from pathlib import Path
+
+from jaqalpaw._cli import main
+from jaqalpaw.bytecode.encoding_parameters import GLUTW
+from jaqalpaw.bytecode.lut_programming import iterate_gate_sequence
+from jaqalpaw.compiler.jaqal_compiler import CircuitCompiler
+from jaqalpaw.compiler.lut_allocator import format_lut_report
+from jaqalpaw.utilities.exceptions import CircuitCompilerException
+
+ex4 = Path("examples") / "DocumentationSamples" / "ex4.jaqal"
+
+
+def rotations_code(n):
+    lines = ["from qscout.v1.std usepulses *", "register q[1]", "prepare_all"]
+    lines.extend(f"Rx q[0] {0.001 * (k + 1)}" for k in range(n))
+    lines.append("measure_all")
+    return "\n".join(lines) + "\n"
+
+
+class LUTReportTester(unittest.TestCase):
+    def test_report(self):
+        cc = CircuitCompiler(file=ex4)
+        report = cc.lut_report(top=2)
+        # The report doesn't pack the gate sequence
+        self.assertFalse(cc.GSEQ_bin)
+        self.assertEqual(cc.bytecode(0xFF), CircuitCompiler(file=ex4).bytecode(0xFF))
+        self.assertEqual(set(report), set(range(cc.channel_num)))
+        for ch, entry in report.items():
+            self.assertEqual(entry["PLUT"][0], len(cc.PLUT_data[ch]))
+            self.assertEqual(entry["MMAP"][0], len(cc.MMAP_data[ch]))
+            self.assertEqual(entry["GLUT"][0], len(cc.GLUT_data[ch]))
+            self.assertEqual(entry["GSEQ_words"], len(cc.GSEQ_bin[ch]))
+            self.assertEqual(
+                entry["GSEQ_gates"],
+                len(list(iterate_gate_sequence(cc.gate_sequence_ids[ch]))),
+            )
+            self.assertLessEqual(len(entry["top_gates"]), 2)
+            word_counts = [words for _, words, _ in entry["top_gates"]]
+            self.assertEqual(word_counts, sorted(word_counts, reverse=True))
+            if entry["PLUT"][0]:
+                self.assertAlmostEqual(
+                    entry["dedupe_ratio"], entry["gate_words"] / entry["PLUT"][0]
+                )
+        ch = max(report, key=lambda ch: report[ch]["dedupe_ratio"])
+        self.assertGreater(report[ch]["dedupe_ratio"], 1)
+        gid, words, calls = report[ch]["top_gates"][0]
+        gate_hash = cc.ordered_gate_identifiers[ch][gid]
+        self.assertEqual(calls, cc.gate_hash_recurrence[ch][gate_hash])
+        self.assertIn(f"channel {ch}:", format_lut_report(report))
+
+    def test_streamed_sequence_words(self):
+        cc = CircuitCompiler(file=ex4)
+        cc.compile()
+        streamed = CircuitCompiler(file=ex4)
+        streamed.compile(pack_sequence=False)
+        self.assertEqual(streamed.lut_report(), cc.lut_report())
+
+    def test_cli(self):
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            main([str(ex4), "-s", "--lut-report"])
+        self.assertIn("dedupe ratio", stderr.getvalue())
+
+    def test_too_many_unique_gates(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "circuit.jaqal"
+            path.write_text(rotations_code(1 << GLUTW))
+            cc = CircuitCompiler(file=path)
+            with self.assertRaisesRegex(CircuitCompilerException, "unique gates"):
+                cc.compile()
+        # Nothing is binarized before the overflow is detected
+        self.assertFalse(cc.PLUT_data)
+
+
+if __name__ == "__main__":
+    unittest.main()
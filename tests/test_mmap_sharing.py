@@ -0,0 +1,82 @@
+import unittest
+from array import array
+from pathlib import Path
+
+from jaqalpaw.bytecode.encoding_parameters import PROG_MODE_LSB
+from jaqalpaw.bytecode.lut_programming import iterate_gate_sequence
+from jaqalpaw.compiler.jaqal_compiler import CircuitCompiler
+from jaqalpaw.compiler.lut_allocator import (
+    LUTAllocator,
+    find_subsequence,
+    longest_overlap,
+)
+from jaqalpaw.emulator import byte_decoding
+from jaqalpaw.emulator.uram import GLUT, SLUT, PLUT
+
+examples = [
+    Path("examples") / "test_std",
+    Path("examples") / "DocumentationSamples" / "ex4",
+    Path("examples") / "ModulatedMS" / "Exemplar_ModulatedMS",
+]
+
+
+def emulated_gates(cc):
+    """Program the emulator LUTs and read back the PLUT words of every gate in
+    the gate sequence of each channel"""
+    for lut in GLUT + SLUT + PLUT:
+        lut.clear()
+    for word in cc.iter_programming_words(0xFF):
+        data = int.from_bytes(word, byteorder="little", signed=False)
+        prog_mode = (data >> PROG_MODE_LSB) & 0b111
+        if prog_mode == 0b001:
+            byte_decoding.parse_GLUT_prog_data(data)
+        elif prog_mode == 0b010:
+            byte_decoding.parse_SLUT_prog_data(data)
+        elif prog_mode == 0b011:
+            byte_decoding.parse_PLUT_prog_data(word)
+    return {
+        ch: [
+            list(byte_decoding.iterate_GLUT_bounds(gid, ch))
+            for gid in iterate_gate_sequence(cc.gate_sequence_ids[ch])
+        ]
+        for ch in range(cc.channel_num)
+    }
+
+
+class MMAPSharingTester(unittest.TestCase):
+    def test_subsequence_helpers(self):
+        storage = array("I", [1, 2, 3, 65536, 4])
+        self.assertEqual(find_subsequence(storage, array("I", [2, 3])), 1)
+        self.assertEqual(find_subsequence(storage, array("I", [0, 1])), -1)
+        self.assertEqual(find_subsequence(storage, array("I", [256])), -1)
+        self.assertEqual(longest_overlap(storage, array("I", [65536, 4, 7])), 2)
+        self.assertEqual(longest_overlap(storage, array("I", [4])), 0)
+
+    def test_share_mmap(self):
+        words = [bytes([n]) * 32 for n in range(5)]
+        allocator = LUTAllocator()
+        allocator.add_gate(0, words[1:3])
+        allocator.add_gate(1, words[0:4])
+        allocator.add_gate(2, words[3:5])
+        allocator.add_gate(3, words[0:4])
+        allocator.share_mmap()
+        # Gate 0 is contained in gate 1, and gate 2 overlaps the end of gate 1
+        self.assertEqual(allocator.MMAP, {0: 2, 1: 0, 2: 1, 3: 3, 4: 4})
+        self.assertEqual(allocator.GLUT, {0: (1, 2), 1: (0, 3), 2: (3, 4), 3: (0, 3)})
+
+    def test_shared_programming_matches_emulator(self):
+        for example in examples:
+            cc = CircuitCompiler(file=example.with_suffix(".jaqal"))
+            cc.compile()
+            shared = CircuitCompiler(
+                file=example.with_suffix(".jaqal"), share_mmap=True
+            )
+            shared.compile()
+            for ch in range(cc.channel_num):
+                self.assertLessEqual(len(shared.MMAP_data[ch]), len(cc.MMAP_data[ch]))
+            self.assertEqual(shared.gate_sequence_ids, cc.gate_sequence_ids)
+            self.assertEqual(emulated_gates(shared), emulated_gates(cc))
+
+
+if __name__ == "__main__":
+    unittest.main()
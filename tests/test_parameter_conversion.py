@@ -0,0 +1,111 @@
+import unittest
+
+import numpy as np
+
+from jaqalpaw.bytecode.binary_conversion import (
+    convert_amp_full,
+    convert_amp_full_array,
+    convert_freq_full,
+    convert_freq_full_array,
+    convert_phase_full,
+    convert_phase_full_array,
+    convert_phase_full_mod_2pi,
+    convert_phase_full_mod_2pi_array,
+)
+from jaqalpaw.emulator.byte_decoding import (
+    convert_amp_bytes_to_real,
+    convert_amp_bytes_to_real_array,
+    convert_freq_bytes_to_real,
+    convert_freq_bytes_to_real_array,
+    convert_phase_bytes_to_real,
+    convert_phase_bytes_to_real_array,
+)
+from jaqalpaw.utilities.helper_functions import (
+    discretize_amplitude,
+    discretize_frequency,
+    discretize_phase,
+)
+from jaqalpaw.utilities.parameters import CLOCK_FREQUENCY, MAXAMP
+
+conversions = [
+    (convert_freq_full, convert_freq_full_array, CLOCK_FREQUENCY),
+    (convert_phase_full, convert_phase_full_array, 360.0),
+    (convert_phase_full_mod_2pi, convert_phase_full_mod_2pi_array, 360.0),
+    (convert_amp_full, convert_amp_full_array, MAXAMP),
+]
+
+decoders = [
+    (convert_freq_bytes_to_real, convert_freq_bytes_to_real_array),
+    (convert_phase_bytes_to_real, convert_phase_bytes_to_real_array),
+    (convert_amp_bytes_to_real, convert_amp_bytes_to_real_array),
+]
+
+
+def sample_values(scale, rng):
+    """Random values around the full scale of a parameter, along with values
+    that round halfway between two integers and multiples of the scale"""
+    values = list(rng.uniform(-4, 4, 500) * scale)
+    values += [(n + 0.5) * scale / (1 << 40) for n in range(-20, 20)]
+    values += [n * scale / 2 for n in range(-9, 10)]
+    values += [-0.0, 1e-300, 180.0, -180.0, 359.99999999999994, -360.0, 720]
+    return values
+
+
+class ParameterConversionTester(unittest.TestCase):
+    def test_conversions_match_scalar(self):
+        rng = np.random.default_rng(7)
+        for scalar, array, scale in conversions:
+            with self.subTest(conversion=scalar.__name__):
+                values = sample_values(scale, rng)
+                converted = array(values)
+                self.assertEqual(converted.dtype, np.int64)
+                self.assertEqual(converted.tolist(), [scalar(v) for v in values])
+                # Integer and numpy inputs
+                ints = list(range(-400, 400, 7))
+                self.assertEqual(array(ints).tolist(), list(map(scalar, ints)))
+                self.assertEqual(
+                    array(np.array(values)).tolist(), list(map(scalar, values))
+                )
+
+    def test_values_beyond_int64(self):
+        values = [1e30, -3e25, 1.0]
+        converted = convert_freq_full_array(values)
+        self.assertEqual(converted.dtype, object)
+        self.assertEqual(converted.tolist(), list(map(convert_freq_full, values)))
+        self.assertEqual(convert_freq_full_array([]).tolist(), [])
+        with self.assertRaises(ValueError):
+            convert_phase_full_array([float("nan")])
+
+    def test_decoders_match_scalar(self):
+        rng = np.random.default_rng(11)
+        data = rng.integers(-(1 << 40), 1 << 40, 500).tolist()
+        data += [0, 1, -1, (1 << 39) - 1, -(1 << 39), (1 << 62) + 12345]
+        for scalar, array in decoders:
+            with self.subTest(decoder=scalar.__name__):
+                self.assertEqual(array(data).tolist(), [scalar(d) for d in data])
+        # Beyond int64 the values are kept as Python ints
+        huge = [(1 << 70) + 3, -(1 << 65) - 1, 5]
+        for scalar, array in decoders:
+            self.assertEqual(array(huge).tolist(), [scalar(d) for d in huge])
+        floats = [1e13, -2.5e12, 7.9]
+        self.assertEqual(
+            convert_amp_bytes_to_real_array(floats).tolist(),
+            list(map(convert_amp_bytes_to_real, floats)),
+        )
+
+    def test_discretize_arrays(self):
+        rng = np.random.default_rng(3)
+        for discretize, scale in (
+            (discretize_amplitude, MAXAMP),
+            (discretize_frequency, CLOCK_FREQUENCY),
+            (discretize_phase, 360.0),
+        ):
+            values = rng.uniform(-1, 1, 100) * scale
+            self.assertEqual(
+                discretize(values).tolist(), [discretize(v) for v in values]
+            )
+            self.assertIsInstance(discretize(float(values[0])), float)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+from copy import copy
+from unittest.mock import patch
+
+import numpy as np
+
+from jaqalpaw.ir.circuit_constructor_visitor import populate_gate_slice
+from jaqalpaw.ir.pulse_data import PulseData, gate_digest
+
+
+class PulseDataDigestTester(unittest.TestCase):
+    def test_equal_values_have_equal_digests(self):
+        pd_int = PulseData(0, 3e-6, freq0=200, amp0=1)
+        pd_float = PulseData(0, 3e-6, freq0=200.0, amp0=1.0)
+        pd_numpy = PulseData(0, 3e-6, freq0=np.float64(200), amp0=np.int64(1))
+        self.assertEqual(pd_int.digest, pd_float.digest)
+        self.assertEqual(pd_int.digest, pd_numpy.digest)
+        self.assertEqual(pd_int, pd_numpy)
+        self.assertEqual(hash(pd_int), hash(pd_numpy))
+        self.assertNotEqual(pd_int, PulseData(0, 3e-6, freq0=200.5, amp0=1))
+
+    def test_modulation_type_is_part_of_digest(self):
+        spline = PulseData(0, 3e-6, amp0=(0, 10, 20))
+        discrete = PulseData(0, 3e-6, amp0=[0, 10, 20])
+        self.assertNotEqual(spline.digest, discrete.digest)
+        self.assertNotEqual(spline, discrete)
+
+    def test_digest_follows_parameter_changes(self):
+        pd = PulseData(1, 3e-6, phase0=45)
+        digest = pd.digest
+        pd_copy = copy(pd)
+        self.assertEqual(pd_copy.digest, digest)
+        pd_copy.delay = 5
+        self.assertNotEqual(pd_copy.digest, digest)
+        self.assertEqual(pd.digest, digest)
+        pd.phase0 = 90
+        self.assertNotEqual(pd.digest, digest)
+        pd.phase0 = 45
+        self.assertEqual(pd.digest, digest)
+
+    def test_digest_is_cached_until_a_field_is_set(self):
+        pd = PulseData(0, 3e-6, freq0=10, amp0=(0, 5, 0))
+        other = PulseData(0, 3e-6, freq0=10.0, amp0=(0, 5, 0))
+        digest = pd.digest
+        other.digest
+        table = {digest: pd}
+        with patch.object(PulseData, "digest_fields_getter") as getter:
+            self.assertEqual(pd, other)
+            self.assertEqual(hash(pd), hash(other))
+            pd.binary_data = []
+            self.assertEqual(pd.digest, digest)
+            getter.assert_not_called()
+        # An interned pulse that's modified gets a new digest and hash
+        pd.delay = 3
+        self.assertNotEqual(pd.digest, digest)
+        self.assertNotEqual(pd, other)
+        self.assertNotIn(pd.digest, table)
+
+    def test_gate_digest_depends_on_order(self):
+        pd1 = PulseData(0, 3e-6, freq0=10)
+        pd2 = PulseData(0, 3e-6, freq0=20)
+        self.assertEqual(gate_digest([pd1, pd2]), gate_digest([copy(pd1), pd2]))
+        self.assertNotEqual(gate_digest([pd1, pd2]), gate_digest([pd2, pd1]))
+
+    def test_interning(self):
+        table = dict()
+        gate_a = [PulseData(0, 3e-6, freq0=10), PulseData(1, 3e-6, freq0=20)]
+        gate_b = [PulseData(0, 3e-6, freq0=10.0)]
+        slice_a = populate_gate_slice(gate_a, 2, pulse_data_table=table)
+        slice_b = populate_gate_slice(gate_b, 2, pulse_data_table=table)
+        self.assertEqual(len(table), 2)
+        self.assertIs(slice_a.channel_data[0][0], slice_b.channel_data[0][0])
+        self.assertIs(slice_b.channel_data[0][0], gate_a[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
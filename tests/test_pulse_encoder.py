@@ -0,0 +1,235 @@
+import unittest
+from itertools import zip_longest
+from unittest.mock import patch
+
+import numpy as np
+
+from jaqalpaw.bytecode.binary_conversion import map_to_bytes
+from jaqalpaw.bytecode.pulse_binarization import (
+    PARAMETER_ENCODINGS,
+    PULSE_FLAGS,
+    PulseEncoder,
+    apply_metadata,
+    binarize_parameter,
+    generate_spline_bytes,
+    pulse,
+)
+from jaqalpaw.ir.pulse_data import PulseData
+from jaqalpaw.utilities.datatypes import Discrete, Mixed, Spline
+from jaqalpaw.utilities.helper_functions import delist
+from jaqalpaw.utilities.instrumentation import event_counters
+
+flags = dict(
+    waittrig=True,
+    sync_mask=0b11,
+    enable_mask=0b01,
+    fb_enable_mask=0b10,
+    apply_at_end_mask=0b11,
+    rst_frame_mask=0b01,
+    fwd_frame0_mask=0b10,
+    fwd_frame1_mask=0b11,
+    inv_frame0_mask=0b01,
+    inv_frame1_mask=0b10,
+)
+
+
+def generate_single_pulse_bytes(coeff, wait, modtype=0, **kwargs):
+    """Word of a parameter with a constant value, before the metadata was
+    precomputed"""
+    # v0, v1, v2, v3, duration
+    bytelist = map_to_bytes([int(coeff), 0, 0, 0, int(wait)])
+    final_bytes = apply_metadata(bytelist, modtype=modtype, **kwargs)
+    return final_bytes, [final_bytes]
+
+
+def reference_parameter(encoding, data, dur, **kwargs):
+    """Parameter binarization before the metadata was precomputed"""
+    _, modtype, convert_discrete, convert_spline = encoding
+    n_points = 1 if not hasattr(data, "__iter__") else len(data)
+    if isinstance(data, Mixed):
+        raw_dur = np.round(np.linspace(0, dur, n_points + 1))
+        bytelist = []
+        for i, (d, subdur) in enumerate(zip(data, list(np.diff(raw_dur)))):
+            subkwargs = dict(kwargs)
+            if i:
+                for name in (
+                    "waittrig",
+                    "sync_mask",
+                    "apply_at_end_mask",
+                    "rst_frame_mask",
+                ):
+                    subkwargs[name] = False
+            bytelist.extend(reference_parameter(encoding, d, subdur, **subkwargs))
+        return bytelist
+    if n_points > 1:
+        pulsemode = isinstance(data, Discrete)
+        convert = convert_discrete if pulsemode else convert_spline
+        raw_cycles = np.round(np.linspace(0, dur, n_points + 1 * pulsemode))
+        return generate_spline_bytes(
+            np.array(list(range(n_points))),
+            np.array(list(map(convert, data))),
+            list(np.diff(raw_cycles)),
+            pulse_mode=pulsemode,
+            modtype=modtype,
+            shift_len=-1,
+            **kwargs,
+        )
+    lbytes, _ = generate_single_pulse_bytes(
+        convert_discrete(delist(data)), dur, modtype=modtype, **kwargs
+    )
+    return [lbytes]
+
+
+def reference_pulse(channel, dur, bypass=False, **params):
+    kwargs = {name: params.pop(name) for name in flags if name in params}
+    bytelist = [
+        reference_parameter(
+            encoding,
+            params.get(encoding[0], 0),
+            dur,
+            channel=channel & 0b111,
+            bypass=bypass,
+            **kwargs,
+        )
+        for encoding in PARAMETER_ENCODINGS
+    ]
+    return [
+        m
+        for i in zip_longest(*sorted(bytelist, key=len), fillvalue=b"")
+        for m in i
+        if len(m)
+    ]
+
+
+pulse_parameters = [
+    dict(freq0=200e6, amp0=50, phase0=30),
+    dict(freq1=230e6, amp1=(0, 20, 80, 20, 0), framerot0=45, **flags),
+    dict(amp0=Discrete([0, 10, 20, 30]), phase1=Spline((0, 90, 180)), **flags),
+    dict(
+        freq0=Mixed([200e6, (200e6, 201e6, 203e6), [203e6, 202e6]]),
+        framerot1=Mixed([(0, 40, 90), 120]),
+        **flags,
+    ),
+    dict(amp0=tuple(np.linspace(0, 100, 40)), framerot0=(0, 10, 5, 70), **flags),
+]
+
+
+class PulseEncoderTester(unittest.TestCase):
+    def test_matches_reference(self):
+        for params in pulse_parameters:
+            for channel, bypass in ((3, False), (12, True)):
+                with self.subTest(params=params, channel=channel):
+                    self.assertEqual(
+                        pulse(channel, 4000, bypass=bypass, **params),
+                        reference_pulse(channel, 4000, bypass=bypass, **params),
+                    )
+
+    def test_headers_are_reused(self):
+        encoder = PulseEncoder()
+        pd = PulseData(2, 3e-6, freq0=200e6, amp0=Discrete([10, 20]), **flags)
+        words = encoder.encode(pd)
+        self.assertEqual(len(encoder.headers), len(PARAMETER_ENCODINGS))
+        headers = dict(encoder.headers)
+        self.assertEqual(encoder.encode(pd), words)
+        self.assertEqual(encoder.headers, headers)
+        encoder.encode(pd, bypass=True)
+        self.assertEqual(len(encoder.headers), 2 * len(PARAMETER_ENCODINGS))
+        for key in encoder.headers:
+            self.assertEqual(len(key), len(PULSE_FLAGS) + 1)
+
+    def test_encode_many(self):
+        encoder = PulseEncoder()
+        pds = [
+            PulseData(0, 3e-6, freq0=200e6, amp0=(0, 50, 0)),
+            PulseData(1, 3e-6, freq1=210e6, phase1=10),
+            PulseData(0, 3e-6, freq0=200e6, amp0=(0.0, 50.0, 0.0)),
+        ]
+        words = encoder.encode_many(pds)
+        self.assertEqual(words, [encoder.encode(pd) for pd in pds])
+        self.assertIs(words[0], words[2])
+        self.assertEqual(
+            encoder.encode_many(pds, bypass=True),
+            [pd.binarize(bypass=True) for pd in pds],
+        )
+        self.assertEqual(encoder.encode_many([]), [])
+
+    def test_constant_pulse_templates(self):
+        encoder = PulseEncoder()
+        params = (200e6, 50, 30, 0, 0, 0, 45, 0)
+        flag_values = (3, False) + tuple(flags[name] for name in PULSE_FLAGS[2:])
+        hits = event_counters["pulse_template_hits"]
+        for dur in (4000, 12, 4000, (1 << 39) - 1):
+            words = encoder.encode_parameters(dur, params, flag_values)
+            self.assertEqual(
+                words,
+                reference_pulse(
+                    3,
+                    dur,
+                    freq0=params[0],
+                    amp0=params[1],
+                    phase0=params[2],
+                    framerot0=params[6],
+                    **flags,
+                ),
+            )
+        self.assertEqual(len(encoder.templates), 1)
+        self.assertEqual(event_counters["pulse_template_hits"] - hits, 3)
+        # Pulses with varying parameters don't use templates
+        encoder.encode(PulseData(0, 3e-6, amp0=(0, 10, 0)))
+        self.assertEqual(len(encoder.templates), 1)
+
+    def test_template_eviction(self):
+        encoder = PulseEncoder()
+        flag_values = (0,) * len(PULSE_FLAGS)
+        with patch("jaqalpaw.bytecode.pulse_binarization.TEMPLATE_CACHE_SIZE", 2):
+            for amp in (10, 20, 30):
+                encoder.encode_parameters(100, (0, amp, 0, 0, 0, 0, 0, 0), flag_values)
+        self.assertEqual(
+            [key[0][1] for key in encoder.templates],
+            [20, 30],
+        )
+
+    def test_binarize_parameter(self):
+        for name, modtype, convert_discrete, convert_spline in PARAMETER_ENCODINGS:
+            mpdict = {
+                name: {
+                    "modtype": modtype,
+                    "convertFunc": {
+                        "discrete": convert_discrete,
+                        "spline": convert_spline,
+                    },
+                    "enabled": True,
+                }
+            }
+            encoding = (name, modtype, convert_discrete, convert_spline)
+            for data in (30, (0, 40, 90), Mixed([(0, 40, 90), 120])):
+                with self.subTest(parameter=name, data=data):
+                    self.assertEqual(
+                        binarize_parameter(
+                            name,
+                            mpdict,
+                            data=data,
+                            dur=4000,
+                            bypass=True,
+                            DDS=5,
+                            **flags,
+                        ),
+                        reference_parameter(
+                            encoding, data, 4000, bypass=True, channel=5, **flags
+                        ),
+                    )
+            mpdict[name]["enabled"] = False
+            self.assertEqual(
+                binarize_parameter(
+                    name, mpdict, data=30, dur=4000, bypass=False, DDS=0, **flags
+                ),
+                [],
+            )
+
+    def test_short_steps_raise(self):
+        with self.assertRaises(Exception):
+            pulse(0, 10, amp0=(0, 10, 20, 30))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+import tempfile
+import unittest
+from itertools import compress, count
+from pathlib import Path
+
+from jaqalpaw.bytecode.lut_programming import (
+    gate_sequence_bytes,
+    iterate_gate_sequence,
+)
+from jaqalpaw.compiler.compile_cache import CompileCache
+from jaqalpaw.compiler.jaqal_compiler import CircuitCompiler
+from jaqalpaw.compiler.shot_index import ShotIndex
+from jaqalpaw.ir.gate_slice import GateSlice
+from jaqalpaw.utilities.datatypes import Loop
+from jaqalpaw.utilities.exceptions import CircuitCompilerException
+from qscout.v1.std.jaqal_pulses import GatePulses
+
+shots_code = """from qscout.v1.std usepulses *
+register q[2]
+prepare_all
+Rx q[0] 0.5
+measure_all
+loop 3 {
+  prepare_all
+  Rx q[0] 0.25
+  loop 2 { prepare_all ; Ry q[1] 0.5 ; measure_all }
+  measure_all
+}
+prepare_all
+Rx q[1] 0.5
+measure_all
+"""
+
+
+class PreparePulses(GatePulses):
+    """Pulse definition with prepare_all defined as a gate"""
+
+    def gate_prepare_all(self, num_channels=8):
+        return self.wait_trigger(num_channels)
+
+
+def get_tail_from_index(elem, gidlist, ind):
+    """Tail of an expanded gate sequence from the ind-th occurrence of elem"""
+    gid_ind = list(compress(count(), map(lambda x: x == elem, gidlist)))[ind]
+    return gidlist[gid_ind:]
+
+
+class ShotIndexTester(unittest.TestCase):
+    def test_tail_keeps_loops(self):
+        glist = [0, 4, Loop([0, 3, Loop([0, 2], repeats=2), 1], repeats=3), 0, 2]
+        index = ShotIndex(glist, {0})
+        self.assertEqual(len(index), 11)
+        flat = list(iterate_gate_sequence(glist))
+        for shot in range(len(index)):
+            tail = index.tail(shot)
+            self.assertEqual(
+                list(iterate_gate_sequence(tail)), get_tail_from_index(0, flat, shot)
+            )
+        tail = index.tail(5)
+        self.assertEqual(tail[:3], [0, 2, Loop([0, 2])])
+        self.assertEqual(tail[4], Loop([0, 3, Loop([0, 2]), 1]))
+        self.assertEqual(tail[4].repeats, 1)
+        with self.assertRaises(CircuitCompilerException):
+            index.tail(11)
+
+    def test_partial_sequence_bytecode(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "shots.jaqal"
+            path.write_text(shots_code)
+            cc = CircuitCompiler(file=path)
+            cc.compile()
+        shot_start_gids = cc.get_shot_start_gids()
+        self.assertEqual(sorted(shot_start_gids), list(range(cc.channel_num)))
+        for shot in (0, 1, 5, 10):
+            _, sequence_data = cc.partial_sequence_bytecode(0xFF, starting_index=shot)
+            for ch in range(cc.channel_num):
+                (gid,) = shot_start_gids[ch]
+                flat = list(iterate_gate_sequence(cc.gate_sequence_ids[ch]))
+                expected = gate_sequence_bytes(get_tail_from_index(gid, flat, shot), ch)
+                self.assertEqual(cc.partial_GSEQ_bin_cache[shot][ch], expected)
+            self.assertEqual(
+                len(sequence_data[0]),
+                sum(len(cc.partial_GSEQ_bin_cache[shot][ch]) for ch in range(8)),
+            )
+        self.assertEqual(list(cc.partial_GSEQ_bin_cache), [0, 1, 5, 10])
+        cc.partial_sequence_bytecode(0xFF, starting_index=1)
+        self.assertEqual(list(cc.partial_GSEQ_bin_cache), [0, 5, 10, 1])
+
+    def test_prepare_all_indices(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = CompileCache(tmpdir)
+            for compile_cache in (cache, cache):
+                cc = CircuitCompiler(
+                    code_literal=shots_code,
+                    pulse_definition=PreparePulses(),
+                    compile_cache=compile_cache,
+                )
+                gslice = cc.get_prepare_all_indices()
+                self.assertIsInstance(gslice, GateSlice)
+                self.assertEqual(
+                    sorted(cc.prepare_all_hashes), list(range(cc.channel_num))
+                )
+                self.assertEqual(
+                    cc.prepare_all_gids,
+                    {ch: gid for ch, (gid,) in cc.get_shot_start_gids().items()},
+                )
+            # The gate ids are also found for a compile loaded from the cache
+            self.assertTrue(cc.cache_hit)
+            # prepare_all is a macro in the standard pulse definitions
+            path = Path(tmpdir) / "shots.jaqal"
+            path.write_text(shots_code)
+            with self.assertRaisesRegex(CircuitCompilerException, "no gate named"):
+                CircuitCompiler(file=path).get_prepare_all_indices()
+
+
+if __name__ == "__main__":
+    unittest.main()
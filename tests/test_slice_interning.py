@@ -0,0 +1,69 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from jaqalpaw.compiler.jaqal_compiler import CircuitCompiler
+
+repeated_code = """from qscout.v1.std usepulses *
+register q[2]
+prepare_all
+Rx q[0] 0.5
+< Rx q[0] 0.5 | Ry q[1] 0.25 >
+Rx q[0] 0.5
+< Rx q[0] 0.5 | Ry q[1] 0.25 >
+measure_all
+prepare_all
+Rx q[0] 0.5
+measure_all
+"""
+
+single_code = """from qscout.v1.std usepulses *
+register q[2]
+prepare_all
+Rx q[0] 0.5
+measure_all
+"""
+
+
+def compile_code(code):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = Path(tmpdir) / "circuit.jaqal"
+        path.write_text(code)
+        cc = CircuitCompiler(file=path)
+        cc.compile()
+    return cc
+
+
+class SliceInterningTester(unittest.TestCase):
+    def test_repeated_slices_are_shared(self):
+        cc = compile_code(repeated_code)
+        slices = cc.slice_list
+        self.assertIs(slices[1][0], slices[3][0])
+        self.assertIs(slices[1][0], slices[7][0])
+        self.assertIs(slices[2][0], slices[4][0])
+        self.assertIsNot(slices[1][0], slices[2][0])
+        self.assertIs(slices[0], slices[6])
+        self.assertIs(slices[5][0], slices[8][0])
+
+    def test_merging_leaves_shared_slices_unchanged(self):
+        cc = compile_code(repeated_code)
+        reference = compile_code(single_code)
+        self.assertEqual(
+            cc.slice_list[1][0].content_key(), reference.slice_list[1][0].content_key()
+        )
+        self.assertNotEqual(
+            cc.slice_list[2][0].content_key(), cc.slice_list[1][0].content_key()
+        )
+
+    def test_gate_sequence(self):
+        cc = compile_code(repeated_code)
+        for ch in range(cc.channel_num):
+            gids = cc.gate_sequence_ids[ch]
+            self.assertEqual(gids[:2], gids[6:8])
+            self.assertEqual(gids[5], gids[8])
+            self.assertEqual(sum(cc.gate_hash_recurrence[ch].values()), len(gids))
+        self.assertEqual(cc.slice_gate_keys, dict())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import unittest
+
+import numpy as np
+from scipy.interpolate import CubicSpline
+
+from jaqalpaw.bytecode import spline_engine
+from jaqalpaw.bytecode.spline_engine import (
+    fit_natural_spline,
+    fit_natural_splines,
+    natural_spline_coefficients,
+    natural_spline_coefficients_batch,
+    spline_cache,
+)
+from jaqalpaw.utilities.instrumentation import event_counters
+
+
+def scipy_coefficients(ys):
+    return CubicSpline(np.arange(len(ys)), ys, bc_type=((2, 0.0), (2, 0.0))).c
+
+
+class SplineEngineTester(unittest.TestCase):
+    def setUp(self):
+        self.rng = np.random.default_rng(2024)
+        spline_cache.clear()
+
+    def random_knots(self, n):
+        ys = self.rng.standard_normal(n) * 10.0 ** self.rng.uniform(-3, 12)
+        return np.round(ys) if self.rng.random() < 0.5 else ys
+
+    def test_matches_scipy(self):
+        for n in list(range(2, 12)) + [int(n) for n in self.rng.integers(12, 400, 40)]:
+            ys = self.random_knots(n)
+            np.testing.assert_array_equal(
+                natural_spline_coefficients(ys), scipy_coefficients(ys)
+            )
+
+    def test_batch_matches_scipy(self):
+        for n in (2, 3, 17, 250):
+            ys = np.stack([self.random_knots(n) for _ in range(20)])
+            coeffs = natural_spline_coefficients_batch(ys)
+            self.assertEqual(coeffs.shape, (20, 4, n - 1))
+            for c, row in zip(coeffs, ys):
+                np.testing.assert_array_equal(c, scipy_coefficients(row))
+
+    def test_fit_cache(self):
+        ys = self.random_knots(30)
+        hits = event_counters["spline_cache_hits"]
+        coeffs = fit_natural_spline(ys)
+        self.assertIs(fit_natural_spline(list(ys)), coeffs)
+        self.assertEqual(event_counters["spline_cache_hits"], hits + 1)
+        self.assertFalse(coeffs.flags.writeable)
+        np.testing.assert_array_equal(coeffs, scipy_coefficients(ys))
+
+    def test_fit_many(self):
+        knot_lists = [self.rng.standard_normal(n) for n in (5, 40, 5, 3, 40)]
+        knot_lists.append(knot_lists[1].copy())
+        fits = fit_natural_splines(knot_lists)
+        self.assertEqual(len(spline_cache), 5)
+        self.assertIs(fits[1], fits[5])
+        for coeffs, ys in zip(fits, knot_lists):
+            np.testing.assert_array_equal(coeffs, scipy_coefficients(ys))
+            self.assertIs(fit_natural_spline(ys), coeffs)
+
+    def test_cache_size(self):
+        size = spline_engine.SPLINE_CACHE_SIZE
+        spline_engine.SPLINE_CACHE_SIZE = 4
+        try:
+            first = self.rng.standard_normal(6)
+            fit_natural_spline(first)
+            for _ in range(4):
+                fit_natural_spline(self.rng.standard_normal(6))
+            self.assertEqual(len(spline_cache), 4)
+            self.assertNotIn(spline_engine.knot_digest(first), spline_cache)
+        finally:
+            spline_engine.SPLINE_CACHE_SIZE = size
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+import unittest
+
+import numpy as np
+from scipy.interpolate import CubicSpline
+
+from jaqalpaw.bytecode.spline_mapping import cs_mapper_int, cs_mapper_int_auto_shift
+
+
+def reference_cs_mapper_int(interp_table, nsteps=409625, shift_len=16):
+    """Map each segment separately with scalar arithmetic"""
+    new_coeffs = np.zeros(interp_table.shape)
+    for i in range(interp_table.shape[1]):
+        tstep = 1 / nsteps if not isinstance(nsteps, list) else 1 / nsteps[i]
+        new_coeffs[3, i] = float(interp_table[3, i])
+        new_coeffs[2, i] = float(
+            (
+                interp_table[2, i] * tstep
+                + interp_table[1, i] * tstep**2
+                + interp_table[0, i] * tstep**3
+            )
+            * (1 << shift_len)
+        )
+        new_coeffs[1, i] = float(
+            (2 * interp_table[1, i] * tstep**2 + 6 * interp_table[0, i] * tstep**3)
+            * (1 << (shift_len * 2))
+        )
+        new_coeffs[0, i] = float(
+            (6 * interp_table[0, i] * tstep**3) * (1 << (shift_len * 3))
+        )
+    return new_coeffs
+
+
+def reference_cs_mapper_int_auto_shift(interp_table, nsteps, apply_phase_mask=False):
+    """Map each segment separately with scalar and integer arithmetic"""
+    new_coeffs = np.zeros(interp_table.shape)
+    shift_len_list = []
+    for i in range(interp_table.shape[1]):
+        tstep = 1 / nsteps[i]
+        if apply_phase_mask:
+            new_coeffs[3, i] = (
+                (int(interp_table[3, i]) & 0xFFFFFFFFFF) ^ 0x8000000000
+            ) - 0x8000000000
+        else:
+            new_coeffs[3, i] = int(interp_table[3, i])
+        new_coeffs[2, i] = (
+            interp_table[2, i] * tstep
+            + interp_table[1, i] * tstep**2
+            + interp_table[0, i] * tstep**3
+        )
+        new_coeffs[1, i] = (
+            2 * interp_table[1, i] * tstep**2 + 6 * interp_table[0, i] * tstep**3
+        )
+        new_coeffs[0, i] = 6 * interp_table[0, i] * tstep**3
+        sig_bits = np.log2(np.abs(new_coeffs[:-1, i]) + 1e-23)
+        shift_len = int(
+            min(min([(39 - v) / (i + 1) for i, v in enumerate(reversed(sig_bits))]), 31)
+        )
+        new_coeffs[2, i] = int(new_coeffs[2, i] * (1 << shift_len))
+        new_coeffs[1, i] = int(new_coeffs[1, i] * (1 << (shift_len * 2)))
+        new_coeffs[0, i] = int(new_coeffs[0, i] * (1 << (shift_len * 3)))
+        shift_len_list.append(shift_len)
+    return new_coeffs, shift_len_list
+
+
+def random_table(rng, nsegments):
+    """Spline coefficients spanning many orders of magnitude, including
+    phases that wrap around 40 bits"""
+    table = rng.standard_normal((4, nsegments))
+    table[:3] *= 10.0 ** rng.uniform(-6, 12, (3, nsegments))
+    table[3] *= 10.0 ** rng.uniform(0, 14, nsegments)
+    table[:, rng.random(nsegments) < 0.05] = 0
+    return table
+
+
+class SplineMappingTester(unittest.TestCase):
+    def setUp(self):
+        self.rng = np.random.default_rng(1234)
+
+    def assertBitIdentical(self, a, b):
+        np.testing.assert_array_equal(a, b)
+        self.assertEqual(a.dtype, b.dtype)
+
+    def test_auto_shift_matches_scalar_mapping(self):
+        for _ in range(50):
+            nsegments = int(self.rng.integers(1, 200))
+            table = random_table(self.rng, nsegments)
+            nsteps = [int(n) for n in self.rng.integers(4, 1 << 24, nsegments)]
+            for apply_phase_mask in (False, True):
+                coeffs, shifts = cs_mapper_int_auto_shift(
+                    table, nsteps, apply_phase_mask=apply_phase_mask
+                )
+                ref_coeffs, ref_shifts = reference_cs_mapper_int_auto_shift(
+                    table, nsteps, apply_phase_mask=apply_phase_mask
+                )
+                self.assertBitIdentical(coeffs, ref_coeffs)
+                self.assertEqual(shifts, ref_shifts)
+                self.assertTrue(all(type(s) is int for s in shifts))
+
+    def test_fixed_shift_matches_scalar_mapping(self):
+        for _ in range(50):
+            nsegments = int(self.rng.integers(1, 200))
+            table = random_table(self.rng, nsegments)
+            nsteps = [int(n) for n in self.rng.integers(4, 1 << 24, nsegments)]
+            shift_len = int(self.rng.integers(0, 32))
+            self.assertBitIdentical(
+                cs_mapper_int(table, nsteps, shift_len),
+                reference_cs_mapper_int(table, nsteps, shift_len),
+            )
+            self.assertBitIdentical(
+                cs_mapper_int(table, nsteps[0], shift_len),
+                reference_cs_mapper_int(table, nsteps[0], shift_len),
+            )
+
+    def test_spline_coefficients(self):
+        xs = np.cumsum(self.rng.integers(4, 1000, 301)).astype(float)
+        ys = np.cumsum(self.rng.standard_normal(301)) * 1e9
+        table = CubicSpline(xs, ys, bc_type=((2, 0.0), (2, 0.0))).c
+        nsteps = [int(n) for n in np.diff(xs)]
+        coeffs, shifts = cs_mapper_int_auto_shift(table, nsteps, True)
+        ref_coeffs, ref_shifts = reference_cs_mapper_int_auto_shift(table, nsteps, True)
+        self.assertBitIdentical(coeffs, ref_coeffs)
+        self.assertEqual(shifts, ref_shifts)
+
+    def test_no_segments(self):
+        coeffs, shifts = cs_mapper_int_auto_shift(np.zeros((4, 0)), [])
+        self.assertEqual(coeffs.shape, (4, 0))
+        self.assertEqual(shifts, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+import io
+import socket
+import tempfile
+import unittest
+from itertools import islice
+from pathlib import Path
+
+from jaqalpaw.compiler.jaqal_compiler import CircuitCompiler, flatten
+from jaqalpaw.compiler.time_ordering import timesort_bytelist
+
+examples = [
+    Path("examples") / "test_std",
+    Path("examples") / "DocumentationSamples" / "ex4",
+    Path("examples") / "ModulatedMS" / "Exemplar_ModulatedMS",
+]
+
+
+class StreamingOutputTester(unittest.TestCase):
+    def test_iter_bytecode_matches_waveform(self):
+        for example in examples:
+            cc = CircuitCompiler(file=example.with_suffix(".jaqal"))
+            code = b"".join(cc.iter_bytecode(0xFF))
+            self.assertEqual(code, example.with_suffix(".wvf").read_bytes())
+            self.assertFalse(cc.GSEQ_bin)
+
+    def test_iter_bytecode_matches_bytecode(self):
+        cc = CircuitCompiler(file=examples[1].with_suffix(".jaqal"))
+        cc.compile()
+        for mask in (0xFF, 0b100, 0b10101):
+            code = b"".join(w for q in cc.bytecode(mask) for qq in q for w in qq)
+            self.assertEqual(b"".join(cc.iter_bytecode(mask)), code)
+
+    def test_bytecode_after_streaming(self):
+        example = examples[1].with_suffix(".jaqal")
+        expected = CircuitCompiler(file=example).bytecode(0xFF)
+        cc = CircuitCompiler(file=example)
+        streamed = b"".join(cc.iter_bytecode(0b101))
+        self.assertFalse(cc.GSEQ_bin)
+        # The sequence is packed when bytecode() needs it
+        self.assertEqual(cc.bytecode(0xFF), expected)
+        self.assertEqual(b"".join(cc.iter_bytecode(0b101)), streamed)
+
+    def test_sequence_bin_lookup(self):
+        example = examples[1].with_suffix(".jaqal")
+        packed = CircuitCompiler(file=example)
+        packed.compile()
+        cc = CircuitCompiler(file=example)
+        cc.compile(pack_sequence=False)
+        self.assertNotIn(0, cc.GSEQ_bin)
+        # Looking up a channel packs its sequence, as compile() would have
+        self.assertEqual(cc.GSEQ_bin[0], packed.GSEQ_bin[0])
+        self.assertIn(0, cc.GSEQ_bin)
+        self.assertEqual(
+            [cc.GSEQ_bin[ch] for ch in range(cc.channel_num)],
+            [packed.GSEQ_bin[ch] for ch in range(cc.channel_num)],
+        )
+        self.assertEqual(cc.bytecode(0xFF), packed.bytecode(0xFF))
+
+    def test_write_bytecode_sinks(self):
+        example = examples[0]
+        expected = example.with_suffix(".wvf").read_bytes()
+        cc = CircuitCompiler(file=example.with_suffix(".jaqal"))
+        sink = io.BytesIO()
+        self.assertEqual(cc.write_bytecode(sink, 0xFF), len(expected))
+        self.assertEqual(sink.getvalue(), expected)
+        with tempfile.TemporaryFile() as fd:
+            cc.write_bytecode(fd, 0xFF)
+            fd.seek(0)
+            self.assertEqual(fd.read(), expected)
+        if hasattr(socket, "socketpair"):
+            tx, rx = socket.socketpair()
+            with tx, rx:
+                cc.write_bytecode(tx, 0xFF)
+                tx.shutdown(socket.SHUT_WR)
+                received = b"".join(iter(lambda: rx.recv(4096), b""))
+            self.assertEqual(received, expected)
+
+
+looped_code = """from qscout.v1.std usepulses *
+register q[2]
+prepare_all
+loop {repeats} {{
+  Rx q[0] 0.5
+  loop 3 {{ < Ry q[1] 0.25 | Rx q[0] 0.75 > ; Sx q[1] }}
+}}
+Sy q[0]
+measure_all
+"""
+
+
+def expanded_streaming_data(cc, channels):
+    """Bypass data from the fully expanded circuit"""
+    cc.binarize_circuit(bypass=True)
+    bytelist = []
+    for ch in channels:
+        bytelist.extend(cc.binary_data[ch])
+    return timesort_bytelist(flatten(bytelist))
+
+
+class BypassStreamingTester(unittest.TestCase):
+    def compile_looped(self, tmpdir, repeats):
+        path = Path(tmpdir) / "looped.jaqal"
+        path.write_text(looped_code.format(repeats=repeats))
+        return CircuitCompiler(file=path)
+
+    def test_streaming_data_matches_expanded(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for channels in (None, [0, 2], [1]):
+                cc = self.compile_looped(tmpdir, 4)
+                expected = expanded_streaming_data(
+                    cc, channels or range(cc.channel_num)
+                )
+                self.assertEqual(cc.streaming_data(channels), expected)
+        for example in examples:
+            cc = CircuitCompiler(file=example.with_suffix(".jaqal"))
+            self.assertEqual(cc.streaming_data(), expanded_streaming_data(cc, range(8)))
+
+    def test_loops_are_replayed_lazily(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cc = self.compile_looped(tmpdir, 10**9)
+            expected = expanded_streaming_data(self.compile_looped(tmpdir, 4), range(8))
+            words = list(islice(cc.iter_streaming_data(), 500))
+        self.assertEqual(words, expected[:500])
+
+    def test_write_streaming_data(self):
+        cc = CircuitCompiler(file=examples[1].with_suffix(".jaqal"))
+        sink = io.BytesIO()
+        nbytes = cc.write_streaming_data(sink)
+        self.assertEqual(sink.getvalue(), b"".join(cc.streaming_data()))
+        self.assertEqual(nbytes, len(sink.getvalue()))
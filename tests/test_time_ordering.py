@@ -0,0 +1,72 @@
+import random
+import unittest
+from collections import defaultdict
+from pathlib import Path
+
+from jaqalpaw.compiler.jaqal_compiler import CircuitCompiler, flatten
+from jaqalpaw.compiler.time_ordering import (
+    decode_word,
+    decode_words,
+    generate_time_stamped_data,
+    merge_word_streams,
+    timesort_bytelist,
+)
+from jaqalpaw.bytecode.encoding_parameters import DMA_MUX_LSB, MODTYPE_LSB
+
+
+def reference_timesort(bytelist):
+    """Sort with TimeStampedWord objects and a key function"""
+    return [
+        tsw.word
+        for tsw in sorted(
+            generate_time_stamped_data(bytelist),
+            key=lambda el: (el.start_time << 6) | (el.mod_type << 3) | el.chan,
+        )
+    ]
+
+
+def random_word(rng, dur):
+    data = rng.getrandbits(160)
+    data |= (dur & ((1 << 40) - 1)) << 160
+    data |= rng.randrange(8) << DMA_MUX_LSB
+    data |= rng.randrange(8) << MODTYPE_LSB
+    return data.to_bytes(32, byteorder="little", signed=False)
+
+
+class TimeOrderingTester(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(1234)
+        self.words = [
+            random_word(rng, rng.choice([0, 1, 3, 7, 12])) for _ in range(2000)
+        ]
+        self.words.append(random_word(rng, -5))
+
+    def test_decode_words(self):
+        channel, mod_type, dur = decode_words(b"".join(self.words))
+        decoded = list(zip(channel.tolist(), mod_type.tolist(), dur.tolist()))
+        self.assertEqual(decoded, [decode_word(w) for w in self.words])
+        self.assertEqual(decoded[-1][2], -5)
+
+    def test_timesort_bytelist(self):
+        self.assertEqual(timesort_bytelist(self.words), reference_timesort(self.words))
+        self.assertEqual(timesort_bytelist([]), [])
+
+    def test_merge_word_streams(self):
+        streams = defaultdict(list)
+        for word in self.words:
+            chan, mod_type, _ = decode_word(word)
+            streams[chan, mod_type].append(word)
+        merged = merge_word_streams(iter(s) for s in streams.values())
+        self.assertEqual(list(merged), reference_timesort(self.words))
+
+    def test_bypass_data(self):
+        cc = CircuitCompiler(
+            file=Path("examples") / "DocumentationSamples" / "ex4.jaqal"
+        )
+        cc.binarize_circuit(bypass=True)
+        bytelist = flatten([w for ch in range(8) for w in cc.binary_data[ch]])
+        self.assertEqual(timesort_bytelist(bytelist), reference_timesort(bytelist))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+from itertools import zip_longest
+from pathlib import Path
+
+import numpy as np
+
+from jaqalpaw.bytecode.binary_conversion import int_to_bytes
+from jaqalpaw.bytecode.lut_programming import program_GLUT
+from jaqalpaw.bytecode.word_buffer import WordBuffer
+from jaqalpaw.compiler.jaqal_compiler import CircuitCompiler
+
+examples = [
+    Path("examples") / "test_std",
+    Path("examples") / "DocumentationSamples" / "ex4",
+    Path("examples") / "ModulatedMS" / "Exemplar_ModulatedMS",
+]
+
+
+class WordBufferTester(unittest.TestCase):
+    def test_append_and_grow(self):
+        buf = WordBuffer(1)
+        words = [int_to_bytes(n * 0x1234567 << (7 * n)) for n in range(5)]
+        buf.append(words[0])
+        buf.extend_ints(int.from_bytes(w, "little") for w in words[1:])
+        self.assertEqual(len(buf), 5)
+        self.assertGreaterEqual(buf.capacity, 5)
+        self.assertEqual(bytes(buf.view()), b"".join(words))
+        arr = buf.as_array()
+        self.assertEqual(arr.shape, (5, 32))
+        self.assertEqual(arr.dtype, np.uint8)
+        self.assertEqual(arr[3].tobytes(), words[3])
+        with self.assertRaises(ValueError):
+            buf.append(b"\x00" * 31)
+
+    def test_integer_words(self):
+        words = [(1 << 256) - 1, 0, 1 << 255, 0xABCDEF << 61, 0x1234 << 190]
+        buf = WordBuffer()
+        for intdata in words:
+            buf.append_int(intdata)
+        buf.extend_ints(iter(words))
+        buf.extend_ints([])
+        self.assertEqual(bytes(buf.view()), b"".join(map(int_to_bytes, words * 2)))
+
+    def test_extend_interleaved(self):
+        arrays = [
+            np.arange(n * 32, dtype=np.uint8).reshape(n, 32) + 7 * n for n in (3, 0, 5)
+        ]
+        buf = WordBuffer()
+        buf.extend_interleaved(arrays)
+        expected = [w for ws in zip_longest(*arrays) for w in ws if w is not None]
+        self.assertEqual(bytes(buf.view()), b"".join(w.tobytes() for w in expected))
+
+    def test_program_into_buffer(self):
+        # Tables below and above MIN_BULK_ENTRIES
+        for n in (14, 300):
+            glut = {n: (2 * n, 2 * n + 1) for n in range(n)}
+            buf = program_GLUT(glut, 3, out=WordBuffer(2))
+            self.assertEqual(bytes(buf.view()), b"".join(program_GLUT(glut, 3)))
+
+
+class BytecodeBufferTester(unittest.TestCase):
+    def test_buffers_match_waveform(self):
+        for example in examples:
+            cc = CircuitCompiler(file=example.with_suffix(".jaqal"))
+            programming, sequence = cc.bytecode_buffers(0xFF)
+            self.assertTrue(all(isinstance(v, memoryview) for v in programming))
+            code = b"".join(programming) + b"".join(sequence)
+            self.assertEqual(code, example.with_suffix(".wvf").read_bytes())
+
+    def test_buffers_match_bytecode(self):
+        cc = CircuitCompiler(file=examples[1].with_suffix(".jaqal"))
+        cc.compile()
+        for mask in (0xFF, 0b100, 0b10101):
+            programming, sequence = cc.bytecode(mask)
+            programming_buffers, sequence_buffers = cc.bytecode_buffers(mask)
+            for words, buf in zip(programming, programming_buffers):
+                self.assertEqual(bytes(buf), b"".join(words))
+            for words, buf in zip(sequence, sequence_buffers):
+                self.assertEqual(bytes(buf), b"".join(words))
+
+    def test_bytecode_after_buffers(self):
+        example = examples[1].with_suffix(".jaqal")
+        expected = CircuitCompiler(file=example).bytecode(0xFF)
+        cc = CircuitCompiler(file=example)
+        cc.bytecode_buffers(0b1010)
+        self.assertEqual(cc.bytecode(0xFF), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+import itertools
+import unittest
+
+import numpy as np
+
+from jaqalpaw.bytecode.binary_conversion import map_to_bytes, pack_words
+from jaqalpaw.bytecode.encoding_parameters import (
+    AMPMOD0,
+    FRMROT0,
+    FRMROT1,
+    FRQMOD1,
+    PHSMOD0,
+)
+from jaqalpaw.bytecode.pulse_binarization import (
+    MIN_PACKED_SEGMENTS,
+    apply_metadata,
+    generate_bytes,
+    generate_pulse_bytes,
+)
+
+# Segment counts for parameters that are packed word by word and as arrays
+segment_counts = [1, 3, MIN_PACKED_SEGMENTS - 1, MIN_PACKED_SEGMENTS, 45]
+
+flags = dict(
+    bypass=False,
+    waittrig=True,
+    sync_mask=0b11,
+    enable_mask=0b01,
+    fb_enable_mask=0b10,
+    channel=5,
+    apply_at_end_mask=0b11,
+    rst_frame_mask=0b01,
+    fwd_frame0_mask=0b10,
+    fwd_frame1_mask=0b11,
+    inv_frame0_mask=0b01,
+    inv_frame1_mask=0b10,
+)
+
+
+def reference_generate_bytes(coeffs, xdata, wait, modtype=0, shift_len=0, **kwargs):
+    """Pack each segment separately with map_to_bytes and apply_metadata"""
+    final_data = []
+    for n, x in enumerate(xdata):
+        if modtype & (FRMROT0 | FRMROT1) and n != 0:
+            v0 = 0
+        else:
+            v0 = int(coeffs[3, n])
+        v4 = int(wait) if not isinstance(wait, list) else int(wait[n])
+        shift_bits = shift_len if not isinstance(shift_len, list) else shift_len[n]
+        bytelist = map_to_bytes(
+            [v0, int(coeffs[2, n]), int(coeffs[1, n]), int(coeffs[0, n]), v4]
+        )
+        final_data.append(
+            apply_metadata(
+                bytelist, modtype=modtype, shift_len=shift_bits, ind=n, **kwargs
+            )
+        )
+    return b"".join(final_data), final_data
+
+
+def reference_generate_pulse_bytes(coeffs, xdata, wait, modtype=0, **kwargs):
+    final_data = []
+    for n, x in enumerate(xdata):
+        v4 = int(wait) if not isinstance(wait, list) else int(wait[n])
+        bytelist = map_to_bytes([int(coeffs[n]), 0, 0, 0, v4])
+        final_data.append(apply_metadata(bytelist, modtype=modtype, ind=n, **kwargs))
+    return b"".join(final_data), final_data
+
+
+class WordPackingTester(unittest.TestCase):
+    def setUp(self):
+        self.rng = np.random.default_rng(4321)
+
+    def random_coeffs(self, nsegments):
+        coeffs = self.rng.uniform(-(2.0**39), 2.0**39, (4, nsegments))
+        coeffs[:, ::3] = np.trunc(coeffs[:, ::3])
+        return coeffs
+
+    def test_spline_words_match_scalar_packing(self):
+        for modtype in (AMPMOD0, FRQMOD1, PHSMOD0, FRMROT0, FRMROT1):
+            for bypass, nsegments in itertools.product((False, True), segment_counts):
+                coeffs = self.random_coeffs(nsegments)
+                xdata = list(range(1, nsegments + 1))
+                wait = [float(w) for w in self.rng.integers(4, 1 << 30, nsegments)]
+                shift_len = [int(s) for s in self.rng.integers(0, 32, nsegments)]
+                kwargs = dict(flags, bypass=bypass, modtype=modtype)
+                self.assertEqual(
+                    generate_bytes(coeffs, xdata, wait, shift_len=shift_len, **kwargs),
+                    reference_generate_bytes(
+                        coeffs, xdata, wait, shift_len=shift_len, **kwargs
+                    ),
+                )
+                self.assertEqual(
+                    generate_bytes(coeffs, xdata, 1000, shift_len=7, **kwargs),
+                    reference_generate_bytes(
+                        coeffs, xdata, 1000, shift_len=7, **kwargs
+                    ),
+                )
+
+    def test_discrete_words_match_scalar_packing(self):
+        for modtype, nsegments in itertools.product(
+            (AMPMOD0, PHSMOD0, FRMROT1), segment_counts
+        ):
+            coeffs = np.array(
+                [int(c) for c in self.rng.integers(-(1 << 39), 1 << 39, nsegments)]
+            )
+            xdata = list(range(nsegments))
+            wait = [float(w) for w in self.rng.integers(4, 1 << 30, nsegments)]
+            kwargs = dict(flags, modtype=modtype)
+            self.assertEqual(
+                generate_pulse_bytes(coeffs, xdata, wait, **kwargs),
+                reference_generate_pulse_bytes(coeffs, xdata, wait, **kwargs),
+            )
+
+    def test_field_overflow(self):
+        fields = np.zeros((3, 5))
+        fields[1, 2] = 2.0**39
+        with self.assertRaises(OverflowError):
+            pack_words(fields, np.zeros(3, dtype=np.uint64))
+        fields[1, 2] = -(2.0**39)
+        words = pack_words(fields, np.zeros(3, dtype=np.uint64))
+        self.assertEqual(words.shape, (3, 32))
+        self.assertEqual(words.dtype, np.uint8)
+        self.assertEqual(
+            bytes(words[1]), map_to_bytes([0, 0, -(1 << 39), 0, 0]) + bytes(7)
+        )
+        with self.assertRaises(OverflowError):
+            pack_words(np.zeros((1, 5)), [1 << 56])
+
+    def test_no_segments(self):
+        self.assertEqual(
+            generate_bytes(np.zeros((4, 0)), [], [], modtype=AMPMOD0), (b"", [])
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()